@@ -0,0 +1,323 @@
+"""
+Benchmark IncludePy with synthetic workloads.
+
+Run these benchmarks from the repository root:
+
+    python benchmarks/bench.py run --output results.json
+    python benchmarks/bench.py compare baseline.json results.json
+    python benchmarks/bench.py complexity
+
+The ``run`` command measures throughput (directives per second) with cold
+and warm caches, the latency of individual directives, and peak memory, for
+a synthetic corpus (see ``corpus.py``).
+The ``compare`` command reports metrics that are worse than a saved
+baseline by more than a threshold, and exits with a non-zero status if there
+are any regressions.
+The ``complexity`` command checks that the time to render each directive
+does not depend on the number of directives or on the size of the modules,
+by fitting a power law to the time per directive over a wide range of sizes.
+"""
+
+import argparse
+import gc
+import json
+import math
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from collections.abc import Callable, Sequence
+from dataclasses import asdict, fields
+from pathlib import Path
+from typing import Any
+
+from corpus import Corpus, CorpusSpec, generate
+
+from includepy import IncludePyProc, ModuleCache, SnippetCache
+
+# The number of times to repeat each timed measurement; the fastest time is
+# reported.
+REPEATS = 5
+
+# The maximum number of directives for which latency is measured.
+LATENCY_SAMPLE = 2000
+
+# The number of times to repeat each timed measurement for the complexity
+# checks, which compare smaller differences than the throughput benchmarks.
+COMPLEXITY_REPEATS = 15
+
+# The largest acceptable exponent for the complexity checks, where the time
+# per directive is fitted to ``size ** exponent``; the expected exponent is
+# zero, and 0.2 corresponds to a 1.7-fold increase in the time per directive
+# over a 16-fold increase in size. Fitting every size means that timing noise
+# at a single size does not fail the check.
+MAX_EXPONENT = 0.2
+
+
+def processor(snippet_cache_size: int = 1024) -> IncludePyProc:
+    """
+    Return a preprocessor with its own (empty) caches.
+    """
+    proc = IncludePyProc(config={}, md=None)
+    proc.cache = ModuleCache(max_entries=1024, max_bytes=2**30)
+    proc.snippets = SnippetCache(max_entries=snippet_cache_size)
+    return proc
+
+
+def best_time(
+    func: Callable[[], Any],
+    setup: Callable[[], Any],
+    repeats: int = REPEATS,
+) -> float:
+    """
+    Return the fastest time (in seconds) to call a function, calling the
+    setup function before each repeat.
+    """
+    times = []
+    for _ in range(repeats):
+        setup()
+        gc.collect()
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def process_pages(proc: IncludePyProc, corpus: Corpus) -> None:
+    """
+    Process every document in a corpus.
+    """
+    for lines in corpus.pages:
+        proc.run(lines)
+
+
+def measure(corpus: Corpus) -> dict[str, float]:
+    """
+    Measure throughput, latency, and peak memory for a corpus.
+    """
+    n = corpus.n_directives
+    metrics = {}
+
+    # Cold caches: every module is read and parsed.
+    proc = processor()
+
+    def clear() -> None:
+        proc.cache.clear()
+        proc.snippets.clear()
+
+    cold = best_time(lambda: process_pages(proc, corpus), clear)
+    metrics["cold_directives_per_s"] = n / cold
+
+    # Warm caches: every module and block has been cached.
+    warm = best_time(lambda: process_pages(proc, corpus), lambda: None)
+    metrics["warm_directives_per_s"] = n / warm
+
+    # Warm module cache, but every block is rendered.
+    proc = processor(snippet_cache_size=0)
+    process_pages(proc, corpus)
+    render = best_time(lambda: process_pages(proc, corpus), lambda: None)
+    metrics["render_directives_per_s"] = n / render
+
+    # The latency of individual directives, which are rendered in full.
+    blocks = []
+    for lines in corpus.pages:
+        for ix, line in enumerate(lines):
+            if line.startswith("-->includepy<--"):
+                block = [line]
+                for option in lines[ix + 1 :]:
+                    if not option.startswith("-->"):
+                        break
+                    block.append(option)
+                blocks.append(block)
+    latencies = []
+    for block in blocks[:LATENCY_SAMPLE]:
+        start = time.perf_counter()
+        proc.run(block)
+        latencies.append(time.perf_counter() - start)
+    quantiles = statistics.quantiles(latencies, n=100)
+    metrics["latency_p50_us"] = 1e6 * quantiles[49]
+    metrics["latency_p90_us"] = 1e6 * quantiles[89]
+    metrics["latency_p99_us"] = 1e6 * quantiles[98]
+
+    # Peak memory with cold caches.
+    proc = processor()
+    tracemalloc.start()
+    process_pages(proc, corpus)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    metrics["peak_memory_mib"] = peak / 2**20
+
+    return metrics
+
+
+def render_time_per_directive(spec: CorpusSpec) -> float:
+    """
+    Return the time (in seconds) to render each directive in a single
+    document, when the modules have been cached.
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        corpus = generate(spec, Path(tmp_dir))
+        proc = processor(snippet_cache_size=0)
+        process_pages(proc, corpus)
+        elapsed = best_time(
+            lambda: process_pages(proc, corpus),
+            lambda: None,
+            repeats=COMPLEXITY_REPEATS,
+        )
+    return elapsed / corpus.n_directives
+
+
+def fitted_exponent(times: dict[int, float]) -> float:
+    """
+    Return the exponent of the power law ``size ** exponent`` that best fits
+    the time per directive for each size (the slope of a least-squares fit
+    on a log-log scale).
+    """
+    slope, _ = statistics.linear_regression(
+        [math.log(size) for size in times],
+        [math.log(value) for value in times.values()],
+    )
+    return slope
+
+
+def complexity() -> dict[str, Any]:
+    """
+    Check that the time to render each directive does not depend on the
+    number of directives, or on the size of the modules.
+    """
+    # NOTE: the first measurements in a process are slower (e.g., because
+    # of memory allocation), so discard one measurement before the checks.
+    render_time_per_directive(CorpusSpec(pages=1, directives=1000, units=100))
+    results: dict[str, Any] = {}
+    by_count = {
+        count: render_time_per_directive(
+            CorpusSpec(pages=1, directives=count, units=100)
+        )
+        for count in (500, 1000, 2000, 4000, 8000)
+    }
+    by_size = {
+        units: render_time_per_directive(
+            CorpusSpec(pages=1, directives=2000, units=units)
+        )
+        for units in (10, 100, 1000)
+    }
+    for name, times in [("directives", by_count), ("units", by_size)]:
+        exponent = fitted_exponent(times)
+        results[name] = {
+            "time_per_directive_us": {
+                str(key): 1e6 * value for key, value in times.items()
+            },
+            "exponent": exponent,
+            "passed": exponent < MAX_EXPONENT,
+        }
+    return results
+
+
+def compare(
+    baseline: dict[str, Any], current: dict[str, Any], threshold: float
+) -> list[str]:
+    """
+    Return a description of each metric that is worse than the baseline by
+    more than the threshold (as a fraction of the baseline value).
+    """
+    regressions = []
+    for name, base_value in baseline["metrics"].items():
+        value = current["metrics"].get(name)
+        if value is None:
+            continue
+        # NOTE: throughput should increase, all other metrics should not.
+        if name.endswith("_per_s"):
+            change = (base_value - value) / base_value
+        else:
+            change = (value - base_value) / base_value
+        status = "REGRESSION" if change > threshold else "ok"
+        line = f"{name:26} {base_value:12.2f} {value:12.2f} {status}"
+        print(line)
+        if change > threshold:
+            regressions.append(line)
+    return regressions
+
+
+def parser() -> argparse.ArgumentParser:
+    """
+    Return the command-line argument parser.
+    """
+    p = argparse.ArgumentParser(description="Benchmark IncludePy")
+    commands = p.add_subparsers(dest="command", required=True)
+
+    p_run = commands.add_parser("run", help="Benchmark a synthetic corpus")
+    for field in fields(CorpusSpec):
+        p_run.add_argument(
+            f"--{field.name.replace('_', '-')}",
+            type=type(field.default),
+            default=field.default,
+        )
+    p_run.add_argument("--output", help="Save the results as JSON")
+
+    p_compare = commands.add_parser(
+        "compare", help="Compare results to a baseline"
+    )
+    p_compare.add_argument("baseline", help="The baseline results")
+    p_compare.add_argument("current", help="The current results")
+    p_compare.add_argument(
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="The largest acceptable change (default: 0.1)",
+    )
+
+    p_complexity = commands.add_parser(
+        "complexity", help="Check how render time scales"
+    )
+    p_complexity.add_argument("--output", help="Save the results as JSON")
+    return p
+
+
+def main(args: Sequence[str] | None = None) -> int:
+    opts = parser().parse_args(args)
+    if opts.command == "compare":
+        baseline = json.loads(Path(opts.baseline).read_text())
+        current = json.loads(Path(opts.current).read_text())
+        regressions = compare(baseline, current, opts.threshold)
+        print(f"{len(regressions)} regressions")
+        return 1 if regressions else 0
+
+    if opts.command == "complexity":
+        results = complexity()
+        passed = all(result["passed"] for result in results.values())
+        for name, result in results.items():
+            status = "ok" if result["passed"] else "FAILED"
+            print(
+                f"Scaling with {name}: exponent {result['exponent']:.2f} "
+                f"{status}"
+            )
+            for key, value in result["time_per_directive_us"].items():
+                print(f"  {key:>6}: {value:8.2f} us per directive")
+        output = {"complexity": results}
+    else:
+        spec = CorpusSpec(
+            **{
+                field.name: getattr(opts, field.name)
+                for field in fields(CorpusSpec)
+            }
+        )
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            corpus = generate(spec, Path(tmp_dir))
+            metrics = measure(corpus)
+        for name, value in metrics.items():
+            print(f"{name:26} {value:12.2f}")
+        output = {"spec": asdict(spec), "metrics": metrics}
+        passed = True
+
+    if opts.output:
+        output["python"] = platform.python_version()
+        output["time"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+        Path(opts.output).write_text(json.dumps(output, indent=2) + "\n")
+    return 0 if passed else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,132 @@
+"""
+Generate synthetic workloads for benchmarking IncludePy.
+
+A corpus contains ``modules`` Python files and ``pages`` Markdown documents,
+each of which contains ``directives`` IncludePy blocks that include randomly
+chosen objects from the Python files.
+Each Python file contains ``units`` top-level classes, and each class
+contains nested classes down to ``depth`` levels, so that objects have
+qualified names such as ``Unit_3.Inner_1.Inner_2.method_0``.
+"""
+
+import random
+
+from dataclasses import dataclass
+from pathlib import Path
+
+
+@dataclass
+class CorpusSpec:
+    """
+    The size and shape of a synthetic corpus.
+    """
+
+    pages: int = 20
+    """The number of Markdown documents."""
+    directives: int = 50
+    """The number of IncludePy blocks in each document."""
+    modules: int = 5
+    """The number of Python files."""
+    units: int = 100
+    """The number of top-level classes in each Python file."""
+    depth: int = 3
+    """The number of nested classes inside each top-level class."""
+    methods: int = 3
+    """The number of methods in each class."""
+    body_lines: int = 8
+    """The number of lines in the body of each method."""
+    only_lines: float = 0.5
+    """The fraction of blocks that select lines with ``only_lines``."""
+    seed: int = 12345
+    """The seed for the random number generator."""
+
+
+@dataclass
+class Corpus:
+    """
+    A synthetic corpus, written to a directory.
+    """
+
+    spec: CorpusSpec
+    root: Path
+    modules: list[Path]
+    pages: list[list[str]]
+    names: list[str]
+
+    @property
+    def n_directives(self) -> int:
+        """
+        The total number of IncludePy blocks in every document.
+        """
+        return self.spec.pages * self.spec.directives
+
+
+def module_source(spec: CorpusSpec) -> tuple[str, list[str]]:
+    """
+    Return the source code for a Python file, and the qualified name of
+    every object that it defines.
+    """
+    lines = ['"""A synthetic module."""', ""]
+    names = []
+
+    def add_class(name: str, qualname: str, level: int) -> None:
+        indent = "    " * level
+        lines.append(f"{indent}class {name}:")
+        lines.append(f'{indent}    """The {qualname} class."""')
+        names.append(qualname)
+        for m in range(spec.methods):
+            lines.append("")
+            lines.append(f"{indent}    def method_{m}(self, x):")
+            for b in range(spec.body_lines):
+                lines.append(f"{indent}        x = x * {b + 2} + {m}  # {b}")
+            lines.append(f"{indent}        return x")
+            names.append(f"{qualname}.method_{m}")
+        if level < spec.depth:
+            lines.append("")
+            inner = f"Inner_{level + 1}"
+            add_class(inner, f"{qualname}.{inner}", level + 1)
+
+    for u in range(spec.units):
+        add_class(f"Unit_{u}", f"Unit_{u}", 0)
+        lines.extend(["", ""])
+    return "\n".join(lines) + "\n", names
+
+
+def generate(spec: CorpusSpec, root: Path) -> Corpus:
+    """
+    Write the Python files for a synthetic corpus, and return the corpus.
+
+    Parameters
+    ----------
+    spec : CorpusSpec
+        The size and shape of the corpus.
+    root : Path
+        The directory in which to write the Python files.
+    """
+    rng = random.Random(spec.seed)
+    root.mkdir(parents=True, exist_ok=True)
+    source, names = module_source(spec)
+    modules = []
+    for k in range(spec.modules):
+        path = root / f"module_{k}.py"
+        path.write_text(source)
+        modules.append(path)
+
+    pages = []
+    for _ in range(spec.pages):
+        lines = ["# A synthetic page", ""]
+        for d in range(spec.directives):
+            lines.extend(
+                [
+                    f"Paragraph {d} of text that precedes a code block.",
+                    "",
+                    "```py",
+                    f"-->includepy<-- {rng.choice(modules)}",
+                    f"-->pyobject<-- {rng.choice(names)}",
+                ]
+            )
+            if rng.random() < spec.only_lines:
+                lines.append("-->only_lines<-- 1-2,4,6-")
+            lines.extend(["```", ""])
+        pages.append(lines)
+    return Corpus(spec, root, modules, pages, names)
@@ -0,0 +1,118 @@
+"""
+Measure how many times each Python file is parsed when several worker
+processes build the same site at once, with each storage backend for the
+persistent index.
+
+Each worker process converts every page of a synthetic corpus (see
+``corpus.py``) with its own Markdown processor, and all of the workers share
+a single cache directory.
+With the ``files`` backend, workers that start at the same time may each
+parse the same file before any of them has recorded it.
+With the ``sqlite`` backend, the first worker to load a file parses it and
+the other workers wait for its entry, so each file should be parsed once.
+
+Run this benchmark from the repository root:
+
+    python benchmarks/shared_cache.py --workers 4
+"""
+
+import argparse
+import multiprocessing
+import sys
+import tempfile
+import time
+
+from pathlib import Path
+
+from corpus import Corpus, CorpusSpec, generate
+
+from includepy import IncludePyProc, ModuleCache, SnippetCache
+from includepy.stats import STATS
+
+
+def worker(
+    corpus: Corpus,
+    config: dict[str, str],
+    barrier: "multiprocessing.synchronize.Barrier",
+    results: "multiprocessing.Queue[int]",
+) -> None:
+    """
+    Convert every page, and report the number of files that were parsed.
+    """
+    STATS.reset()
+    STATS.enabled = True
+    proc = IncludePyProc(config=config, md=None)
+    proc.cache = ModuleCache(max_entries=1024, max_bytes=2**30)
+    proc.cache.configure(
+        cache_dir=config["cache_dir"], cache_backend=config["cache_backend"]
+    )
+    proc.snippets = SnippetCache()
+    barrier.wait()
+    for lines in corpus.pages:
+        proc.run(lines)
+    results.put(STATS.snapshot().counts["parses"])
+
+
+def build(
+    corpus: Corpus, backend: str, cache_dir: Path, workers: int
+) -> tuple[int, float]:
+    """
+    Build the site with several worker processes, and return the total
+    number of files parsed and the elapsed time (in seconds).
+    """
+    ctx = multiprocessing.get_context("fork")
+    barrier = ctx.Barrier(workers + 1)
+    results: multiprocessing.Queue[int] = ctx.Queue()
+    config = {
+        "cache_dir": str(cache_dir),
+        "cache_backend": backend,
+        "executor": "none",
+    }
+    processes = [
+        ctx.Process(target=worker, args=(corpus, config, barrier, results))
+        for _ in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    barrier.wait()
+    start = time.perf_counter()
+    parses = sum(results.get() for _ in processes)
+    elapsed = time.perf_counter() - start
+    for process in processes:
+        process.join()
+    return parses, elapsed
+
+
+def main() -> int:
+    p = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    p.add_argument("--workers", type=int, default=4)
+    p.add_argument("--modules", type=int, default=8)
+    p.add_argument("--pages", type=int, default=10)
+    args = p.parse_args()
+
+    spec = CorpusSpec(pages=args.pages, modules=args.modules)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        corpus = generate(spec, Path(tmp_dir) / "src")
+        for k, module in enumerate(corpus.modules):
+            # NOTE: ensure that each module has different contents, so that
+            # it has its own index entry.
+            with open(module, "a") as f:
+                f.write(f"# Module {k}\n")
+
+        status = 0
+        print(f"{args.workers} workers, {args.modules} modules")
+        for backend in ("files", "sqlite"):
+            cache_dir = Path(tmp_dir) / f"cache-{backend}"
+            parses, elapsed = build(corpus, backend, cache_dir, args.workers)
+            print(
+                f"{backend:>6}: {parses:3d} parses"
+                f" ({parses / args.modules:.2f} per module)"
+                f" in {elapsed:.2f}s"
+            )
+            if backend == "sqlite" and parses != args.modules:
+                status = 1
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,89 @@
+"""
+Measure the overhead of the build statistics when they are disabled.
+
+Each directive passes through a small number of instrumented operations.
+When statistics are disabled, each of these operations only checks a flag,
+so this benchmark measures the cost of these checks and compares it to the
+time required to render a directive (with the snippet cache disabled, so
+that every directive is rendered in full).
+
+Run this benchmark from the repository root:
+
+    python benchmarks/stats_overhead.py
+"""
+
+import sys
+import tempfile
+import timeit
+
+from pathlib import Path
+
+from includepy import IncludePyProc, ModuleCache, SnippetCache
+from includepy.stats import STATS
+
+# The number of functions in the generated module.
+N_FUNCTIONS = 500
+
+# The number of flag checks for each directive, which is an upper bound on
+# the number of instrumented operations.
+N_SITES = 8
+
+# The maximum acceptable overhead, as a fraction of the rendering time.
+MAX_OVERHEAD = 0.01
+
+
+def render_time(proc: IncludePyProc, lines: list[str], number: int) -> float:
+    """
+    Return the minimum time (in seconds) to process a document.
+    """
+    return min(
+        timeit.repeat(lambda: proc.run(lines), number=number, repeat=5)
+    )
+
+
+def main() -> int:
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        py_file = Path(tmp_dir) / "module.py"
+        py_file.write_text(
+            "".join(
+                f"def func_{i}(x):\n    y = x + {i}\n    return y * 2\n\n\n"
+                for i in range(N_FUNCTIONS)
+            )
+        )
+        lines = []
+        for i in range(N_FUNCTIONS):
+            lines.extend(
+                [f"-->includepy<-- {py_file}", f"-->pyobject<-- func_{i}"]
+            )
+
+        proc = IncludePyProc(config={}, md=None)
+        proc.cache = ModuleCache()
+        proc.snippets = SnippetCache(max_entries=0)
+        proc.run(lines)
+
+        STATS.enabled = False
+        disabled = render_time(proc, lines, 10) / (10 * N_FUNCTIONS)
+        STATS.enabled = True
+        enabled = render_time(proc, lines, 10) / (10 * N_FUNCTIONS)
+        STATS.enabled = False
+
+    site = min(
+        timeit.repeat(
+            'if STATS.enabled:\n    STATS.count("directives")',
+            globals={"STATS": STATS},
+            number=100_000,
+            repeat=5,
+        )
+    )
+    site = site / 100_000
+    overhead = N_SITES * site / disabled
+
+    print(f"Render time per directive (disabled): {1e6 * disabled:.2f} us")
+    print(f"Render time per directive (enabled):  {1e6 * enabled:.2f} us")
+    print(f"Cost of each disabled site:          {1e9 * site:.1f} ns")
+    print(f"Overhead when disabled:              {100 * overhead:.3f}%")
+    return 0 if overhead < MAX_OVERHEAD else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
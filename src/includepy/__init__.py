@@ -3,14 +3,42 @@ A Markdown extension that inserts code for Python objects (such as functions
 and classes).
 """
 
+import array
 import ast
+import asyncio
+import atexit
+import io
+import json
+import logging
+import os
 import re
 import textwrap
-
+import threading
+import tokenize
+
+from collections import OrderedDict
+from collections.abc import Hashable, Iterable, Iterator
+from concurrent.futures import (
+    Executor,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    as_completed,
+)
+from itertools import accumulate
 from markdown import Extension, Markdown
 from markdown.preprocessors import Preprocessor
 from pathlib import Path
-from typing import Any
+from typing import Any, NamedTuple
+
+from .atomic import atomic_write
+from .diskindex import DiskIndex, content_digest
+from .gitblob import git_reader
+from .modindex import ModuleIndex, module_index
+from .scanner import Scanner
+from .sqlindex import SqliteIndex
+from .stats import STATS, StatsSnapshot
+from .trace import TRACE_ENV, TRACER
+from .watch import shared_watcher
 
 # The groups are:
 # 1. Indentation
@@ -21,15 +49,38 @@ RE_OPTION = re.compile(
     r"^([ \t]*)(;*)-->([a-zA-Z0-9-_]+)<--[ \t]*(\S+)[ \t]*$"
 )
 
+# The storage backends for the persistent index.
+INDEX_BACKENDS: dict[str, type[DiskIndex]] = {
+    "files": DiskIndex,
+    "sqlite": SqliteIndex,
+}
+
+# Every option line contains this marker.
+OPTION_MARKER = "-->"
+
+# The options that begin an IncludePy block: ``includepy`` takes the path of
+# a Python file, and ``pymodule`` takes a dotted module name.
+BLOCK_OPTIONS = {"includepy", "pymodule"}
+
 # Match any of "m-n", "m-", "-n", "n".
 RE_LINERANGE = re.compile(r"^([0-9]+-[0-9+]|[0-9]+-|-[0-9]+|[0-9])+$")
 
+# The version of the dependency manifest format.
+MANIFEST_VERSION = 1
+
+# The number of locks that ensure each source file is only loaded by one
+# thread at a time.
+LOCK_STRIPES = 64
+
+# The approximate memory (in bytes) occupied by each symbol table entry.
+SYMBOL_SIZE = 200
+
 
 def valid_options() -> set[str]:
     """
     Returns the valid option names.
     """
-    return set(default_options()) | {"pyobject"}
+    return set(default_options()) | {"pyobject", "ref"}
 
 
 def default_options() -> dict[str, str]:
@@ -65,6 +116,79 @@ def find_object(name: str | None, node: ast.AST) -> ast.AST:
     return node
 
 
+class Location(NamedTuple):
+    """
+    The location of a named object in a Python source file.
+    """
+
+    lineno: int
+    end_lineno: int
+    col_offset: int
+
+
+# A symbol table maps the qualified name of every object ("Class.method")
+# to the locations of all objects that have this name.
+SymbolTable = dict[str, list[Location]]
+
+
+def index_symbols(node: ast.AST) -> SymbolTable:
+    """
+    Record the location of every named object in a syntax tree.
+
+    This traverses the syntax tree once, so that objects can be found without
+    retaining the syntax tree, and records every object that shares the same
+    qualified name so that :func:`lookup_symbol` can report duplicates.
+
+    Parameters
+    ----------
+    node : ast.AST
+        The syntax tree.
+
+    Returns
+    -------
+    SymbolTable
+        The locations of each named object.
+    """
+    symbols: SymbolTable = {}
+    pending: list[tuple[str, ast.AST]] = [("", node)]
+    while pending:
+        prefix, parent = pending.pop()
+        for child in getattr(parent, "body", []):
+            name = getattr(child, "name", None)
+            if not isinstance(name, str):
+                continue
+            qualname = prefix + name
+            end_lineno = child.end_lineno
+            if end_lineno is None:
+                raise IncludePyError(f"No end line number for {qualname}")
+            loc = Location(child.lineno, end_lineno, child.col_offset)
+            symbols.setdefault(qualname, []).append(loc)
+            pending.append((qualname + ".", child))
+    return symbols
+
+
+def lookup_symbol(name: str | None, symbols: SymbolTable) -> Location:
+    """
+    Find a named object (e.g., function or class) in a symbol table.
+
+    This behaves identically to :func:`find_object`, but only requires one
+    dictionary lookup for each component of a nested name ("a.b.c").
+    """
+    if name is None:
+        raise IncludePyError("No Python object specified")
+
+    start = 0
+    while True:
+        ix = name.find(".", start)
+        frag = name if ix < 0 else name[:ix]
+        matches = symbols.get(frag, [])
+        if len(matches) != 1:
+            raise IncludePyError(f"Found {len(matches)} matches for {frag}")
+        if ix < 0:
+            return matches[0]
+        start = ix + 1
+
+
 def selected_lines(input_lines: list[str], only_lines: str) -> list[str]:
     """
     Return only selected lines from a code block.
@@ -94,7 +218,7 @@ def selected_lines(input_lines: list[str], only_lines: str) -> list[str]:
 
     for lr in lr_matches:
         if lr is None:
-            raise IncludePyError("Invalid only_lines: {only_lines}")
+            raise IncludePyError(f"Invalid only_lines: {only_lines}")
 
         bounds = tuple(lr.group(0).split("-"))
         try:
@@ -120,6 +244,1467 @@ def selected_lines(input_lines: list[str], only_lines: str) -> list[str]:
     return output_lines
 
 
+class SourceModule:
+    """
+    A Python source file that has been read and parsed.
+
+    Parameters
+    ----------
+    path : Path
+        The resolved path of the source file.
+    size : int
+        The size of the source file (in bytes) when it was read.
+    mtime_ns : int
+        The modification time of the source file (in nanoseconds) when it
+        was read.
+    digest : str
+        The content hash of the source file.
+    encoding : str
+        The character encoding of the source file.
+    symbols : SymbolTable
+        The locations of each named object in the source code.
+    offsets : array.array
+        The byte offset at which each line begins, followed by the size of
+        the source file.
+    data : bytes | None
+        The contents of the source file, or ``None`` if lines should be read
+        from the source file when they are required.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        size: int,
+        mtime_ns: int,
+        digest: str,
+        encoding: str,
+        symbols: SymbolTable,
+        offsets: "array.array[int]",
+        data: bytes | None = None,
+    ):
+        self.path = path
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.digest = digest
+        self.encoding = encoding
+        self.symbols = symbols
+        self.offsets = offsets
+        self.data = data
+        # NOTE: large files are only indexed one top-level object at a time.
+        self.scanner: Scanner | None = None
+        self.scanned: set[str] = set()
+        # NOTE: the scanner is not thread-safe.
+        self._lock = threading.RLock()
+        # Record the approximate memory occupied by this module.
+        self.nbytes = (
+            (0 if data is None else len(data))
+            + offsets.itemsize * len(offsets)
+            + SYMBOL_SIZE * len(symbols)
+        )
+
+    @classmethod
+    def parse(
+        cls, path: Path, data: bytes, mtime_ns: int, scan_threshold: int = 0
+    ) -> "SourceModule":
+        """
+        Parse the contents of a Python source file, and index its named
+        objects.
+
+        Parameters
+        ----------
+        path : Path
+            The resolved path of the source file.
+        data : bytes
+            The contents of the source file.
+        mtime_ns : int
+            The modification time of the source file (in nanoseconds).
+        scan_threshold : int
+            The size (in bytes) above which objects are located on demand by
+            a :class:`~includepy.scanner.Scanner`, rather than by parsing the
+            entire file; set to zero to always parse the entire file.
+
+        Returns
+        -------
+        SourceModule
+            The parsed source file.
+        """
+        encoding, _ = tokenize.detect_encoding(io.BytesIO(data).readline)
+        # NOTE: this splits lines in the same way as universal newlines mode.
+        line_lengths = map(len, data.splitlines(keepends=True))
+        offsets = array.array("q", accumulate(line_lengths, initial=0))
+        scan = 0 < scan_threshold < len(data)
+        if scan and Scanner.supports(data, encoding):
+            symbols: SymbolTable = {}
+        else:
+            # NOTE: the syntax tree is discarded once it has been indexed.
+            with (
+                STATS.timer("parse"),
+                TRACER.span("parse", "file", path=str(path)),
+            ):
+                symbols = index_symbols(ast.parse(data))
+            if STATS.enabled:
+                STATS.count("parses")
+            scan = False
+        module = cls(
+            path,
+            len(data),
+            mtime_ns,
+            content_digest(data),
+            encoding,
+            symbols,
+            offsets,
+            data,
+        )
+        if scan:
+            module.scanner = Scanner(data, offsets, encoding)
+        return module
+
+    @classmethod
+    def load(
+        cls,
+        path: Path,
+        index: DiskIndex | None = None,
+        scan_threshold: int = 0,
+    ) -> "SourceModule":
+        """
+        Read and parse a Python source file, and index its named objects.
+
+        Parameters
+        ----------
+        path : Path
+            The resolved path of the source file.
+        index : DiskIndex | None
+            An optional persistent index, which is used in preference to
+            parsing the source file, and is updated if the source file is
+            parsed.
+        scan_threshold : int
+            The size (in bytes) above which objects are located on demand;
+            see :meth:`parse`.
+
+        Returns
+        -------
+        SourceModule
+            The parsed source file.
+        """
+        if index is not None:
+            stat = os.stat(path)
+            path_entry = index.load_path(path)
+            if path_entry is not None:
+                entry = index.load_module(path_entry["digest"])
+                unchanged = (
+                    path_entry["size"] == stat.st_size
+                    and path_entry["mtime_ns"] == stat.st_mtime_ns
+                )
+                if entry is not None and unchanged:
+                    # NOTE: lines will be read from the file when required.
+                    try:
+                        return cls.from_entry(
+                            path, stat.st_size, stat.st_mtime_ns, entry
+                        )
+                    except (TypeError, ValueError):
+                        pass
+
+        with (
+            STATS.timer("read"),
+            TRACER.span("read", "file", path=str(path)),
+            open(path, "rb") as f,
+        ):
+            stat = os.fstat(f.fileno())
+            data = f.read()
+        if STATS.enabled:
+            STATS.count("files_opened")
+            STATS.count("bytes_read", len(data))
+
+        if index is None:
+            return cls.parse(path, data, stat.st_mtime_ns, scan_threshold)
+
+        # NOTE: reuse the symbol table if the contents have not changed.
+        digest = content_digest(data)
+        entry = index.load_module(digest)
+        claimed = False
+        if entry is None and not 0 < scan_threshold < len(data):
+            # NOTE: if another process is parsing this file, wait for it to
+            # record the symbol table rather than parsing the file again.
+            claimed = index.claim(digest)
+            if claimed:
+                entry = index.load_module(digest)
+            else:
+                entry = index.wait_module(digest)
+        try:
+            try:
+                if entry is None:
+                    raise ValueError("No index entry")
+                module = cls.from_entry(
+                    path, stat.st_size, stat.st_mtime_ns, entry, data
+                )
+            except (TypeError, ValueError):
+                module = cls.parse(
+                    path, data, stat.st_mtime_ns, scan_threshold
+                )
+                if module.scanner is not None:
+                    # NOTE: only complete symbol tables are recorded.
+                    return module
+                index.store_module(module.entry())
+        finally:
+            if claimed:
+                index.release(digest)
+        index.store_path(path, module.size, module.mtime_ns, module.digest)
+        return module
+
+    @classmethod
+    def from_entry(
+        cls,
+        path: Path,
+        size: int,
+        mtime_ns: int,
+        entry: dict[str, Any],
+        data: bytes | None = None,
+    ) -> "SourceModule":
+        """
+        Construct a module from a :class:`~includepy.diskindex.DiskIndex`
+        entry.
+
+        Raises
+        ------
+        TypeError
+            If the entry contains values of the wrong type.
+        ValueError
+            If the entry is inconsistent with the source file.
+        """
+        symbols = {
+            name: [Location(*map(int, loc)) for loc in locs]
+            for name, locs in entry["symbols"].items()
+        }
+        offsets = array.array("q", entry["offsets"])
+        if not offsets or offsets[0] != 0 or offsets[-1] != size:
+            raise ValueError(f"Invalid line offsets for {path}")
+        return cls(
+            path,
+            size,
+            mtime_ns,
+            entry["digest"],
+            entry["encoding"],
+            symbols,
+            offsets,
+            data,
+        )
+
+    def entry(self) -> dict[str, Any]:
+        """
+        Return the :class:`~includepy.diskindex.DiskIndex` entry for this
+        module.
+        """
+        return {
+            "digest": self.digest,
+            "encoding": self.encoding,
+            "symbols": self.symbols,
+            "offsets": self.offsets.tolist(),
+        }
+
+    @property
+    def nlines(self) -> int:
+        """
+        The number of lines in the source file.
+        """
+        return len(self.offsets) - 1
+
+    def text(self, start_ix: int, end_ix: int) -> str:
+        """
+        Return a range of lines from the source file as a single string.
+
+        Parameters
+        ----------
+        start_ix : int
+            The (zero-based) index of the first line.
+        end_ix : int
+            The (zero-based) index after the final line.
+
+        Returns
+        -------
+        str
+            The selected lines, where each line ends with a newline
+            character (except, possibly, the final line of the file).
+        """
+        start = self.offsets[start_ix]
+        end = self.offsets[end_ix]
+        chunk: bytes | memoryview
+        if self.data is not None:
+            # NOTE: decode the lines without copying them from the buffer.
+            chunk = memoryview(self.data)[start:end]
+        else:
+            with open(self.path, "rb") as f:
+                if not self.is_fresh(os.fstat(f.fileno())):
+                    raise IncludePyError(f"{self.path} changed while reading")
+                f.seek(start)
+                chunk = f.read(end - start)
+            if STATS.enabled:
+                STATS.count("files_opened")
+                STATS.count("bytes_read", len(chunk))
+        text = str(chunk, self.encoding)
+        if "\r" in text:
+            text = text.replace("\r\n", "\n").replace("\r", "\n")
+        return text
+
+    def lookup(self, name: str | None) -> Location:
+        """
+        Return the location of a named object in this module.
+        """
+        if self.scanner is not None and name is not None:
+            top_name = name.split(".", 1)[0]
+            with self._lock:
+                scanner = self.scanner
+                if scanner is not None and top_name not in self.scanned:
+                    if STATS.enabled:
+                        STATS.count("scans")
+                    with TRACER.span(
+                        "scan", "file", path=str(self.path), pyobject=top_name
+                    ):
+                        found = scanner.scan(top_name)
+                    if found is None:
+                        # NOTE: fall back to parsing the entire file.
+                        self.index_all()
+                    else:
+                        for qualname, locs in found.items():
+                            self.symbols[qualname] = [
+                                Location(*loc) for loc in locs
+                            ]
+                        self.scanned.add(top_name)
+        return lookup_symbol(name, self.symbols)
+
+    def index_all(self) -> None:
+        """
+        Parse the entire source file and index every named object, if this
+        has not already been done.
+        """
+        with self._lock:
+            if self.scanner is None:
+                return
+            data = self.data
+            if data is None:  # pragma: no cover
+                raise IncludePyError(f"No contents for {self.path}")
+            with (
+                STATS.timer("parse"),
+                TRACER.span("parse", "file", path=str(self.path)),
+            ):
+                self.symbols = index_symbols(ast.parse(data))
+            if STATS.enabled:
+                STATS.count("parses")
+            self.scanner = None
+
+    def is_fresh(self, stat: os.stat_result) -> bool:
+        """
+        Return whether this module is consistent with the current file
+        status, as reported by :func:`os.stat`.
+        """
+        return stat.st_size == self.size and stat.st_mtime_ns == self.mtime_ns
+
+
+class CacheInfo(NamedTuple):
+    """
+    Summary statistics for a :class:`ModuleCache`.
+    """
+
+    hits: int
+    misses: int
+    loads: int
+    entries: int
+    nbytes: int
+    max_entries: int
+    max_bytes: int
+
+
+class ModuleCache:
+    """
+    A least-recently-used cache of parsed Python source files.
+
+    Entries are keyed by resolved path, and are discarded when the size or
+    modification time of the source file changes.
+    The cache is bounded by the number of entries and by the approximate
+    memory that they occupy.
+
+    The cache is safe to use from multiple threads.
+    When several threads request a source file that is not in the cache,
+    only one thread loads the file and the other threads wait for it to be
+    loaded.
+
+    Parameters
+    ----------
+    max_entries : int
+        The maximum number of source files to retain.
+    max_bytes : int
+        The approximate memory limit (in bytes) for all retained entries.
+    index : DiskIndex | None
+        An optional persistent index, which is used in preference to parsing
+        source files that are not in the cache.
+    scan_threshold : int
+        The size (in bytes) above which objects are located on demand, rather
+        than by parsing the entire file; see :meth:`SourceModule.parse`.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 128,
+        max_bytes: int = 64 * 2**20,
+        index: DiskIndex | None = None,
+        scan_threshold: int = 2**20,
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.index = index
+        self.cache_backend = (
+            "sqlite" if isinstance(index, SqliteIndex) else "files"
+        )
+        self.scan_threshold = scan_threshold
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+        self._nbytes = 0
+        # NOTE: source files from git revisions are keyed by their blob
+        # hash, so that a file that is unchanged between revisions is only
+        # parsed once.
+        self._entries: OrderedDict[Path | str, SourceModule] = OrderedDict()
+        self._lock = threading.Lock()
+        # NOTE: source files are assigned to locks by their hash, so that
+        # different files can be loaded concurrently.
+        self._load_locks = [threading.Lock() for _ in range(LOCK_STRIPES)]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def configure(
+        self,
+        max_entries: int | None = None,
+        max_bytes: int | None = None,
+        cache_dir: Path | str | None = None,
+        scan_threshold: int | None = None,
+        cache_backend: str | None = None,
+    ) -> None:
+        """
+        Change the cache settings, evicting entries as required.
+
+        Parameters
+        ----------
+        max_entries : int | None
+            The maximum number of source files to retain (if not ``None``).
+        max_bytes : int | None
+            The approximate memory limit (if not ``None``).
+        cache_dir : Path | str | None
+            The directory for the persistent index (if not ``None``); an empty
+            string disables the persistent index.
+        scan_threshold : int | None
+            The size above which objects are located on demand (if not
+            ``None``).
+        cache_backend : str | None
+            How to store the persistent index (if not ``None``): ``"files"``
+            (a JSON file for each entry) or ``"sqlite"`` (a SQLite database
+            that coordinates concurrent processes).
+        """
+        if cache_backend is not None and cache_backend not in INDEX_BACKENDS:
+            raise IncludePyError(f"Invalid cache backend {cache_backend}")
+        with self._lock:
+            if max_entries is not None:
+                self.max_entries = int(max_entries)
+            if max_bytes is not None:
+                self.max_bytes = int(max_bytes)
+            if cache_backend is not None:
+                self.cache_backend = cache_backend
+                if cache_dir is None and self.index is not None:
+                    cache_dir = self.index.cache_dir
+            index_cls = INDEX_BACKENDS[self.cache_backend]
+            if cache_dir is not None:
+                if not cache_dir:
+                    self.index = None
+                elif type(
+                    self.index
+                ) is not index_cls or self.index.cache_dir != Path(cache_dir):
+                    self.index = index_cls(cache_dir)
+            if scan_threshold is not None:
+                self.scan_threshold = int(scan_threshold)
+            self._evict()
+
+    def get(self, path: Path | str) -> SourceModule:
+        """
+        Return the parsed contents of a Python source file, reading and
+        parsing the file only if there is no up-to-date cache entry.
+
+        Parameters
+        ----------
+        path : Path | str
+            The path of the source file.
+
+        Returns
+        -------
+        SourceModule
+            The parsed source file.
+        """
+        stat = os.stat(path)
+        key = Path(path).resolve()
+        module = self._lookup(key, stat)
+        if module is None:
+            module = self._load(key)
+        return module
+
+    def get_blob(self, path: Path | str, ref: str) -> SourceModule:
+        """
+        Return the parsed contents of a Python source file in a revision of
+        the git repository that contains it, reading and parsing the file
+        only if there is no cache entry for its blob.
+
+        Parameters
+        ----------
+        path : Path | str
+            The path of the source file in the working tree.
+        ref : str
+            The revision (e.g., a tag or a commit hash).
+
+        Returns
+        -------
+        SourceModule
+            The parsed source file.
+
+        Raises
+        ------
+        ~includepy.gitblob.GitError
+            If the revision does not contain the source file.
+        """
+        reader, relpath = git_reader(path)
+        sha = reader.lookup(ref, relpath)
+        key = f"git:{sha}"
+        with self._lock:
+            module = self._entries.get(key)
+            if module is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                if STATS.enabled:
+                    STATS.count("module_hits")
+                return module
+            self.misses += 1
+            if STATS.enabled:
+                STATS.count("module_misses")
+        with self._load_locks[hash(key) % LOCK_STRIPES]:
+            with self._lock:
+                module = self._entries.get(key)
+            if module is not None:
+                return module
+            with (
+                STATS.timer("read"),
+                TRACER.span("read", "file", path=f"{ref}:{relpath}"),
+            ):
+                data = reader.read(sha)
+            if STATS.enabled:
+                STATS.count("bytes_read", len(data))
+            module = SourceModule.parse(
+                reader.repo / relpath, data, 0, self.scan_threshold
+            )
+            with self._lock:
+                self.loads += 1
+            self.insert(module, key)
+            return module
+
+    def prefetch(
+        self, paths: Iterable[Path | str], executor: Executor | None = None
+    ) -> None:
+        """
+        Read and parse every source file that is not in the cache, using an
+        executor to load the files in parallel.
+
+        Errors are ignored, so that they are raised when each source file is
+        retrieved with :meth:`get`.
+
+        Parameters
+        ----------
+        paths : Iterable[Path | str]
+            The paths of the source files.
+        executor : Executor | None
+            The thread or process pool in which to load the source files; if
+            this is ``None``, the source files will be loaded when they are
+            retrieved.
+        """
+        if executor is None:
+            return
+        pending: dict[Path, None] = {}
+        for path in paths:
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            key = Path(path).resolve()
+            if key in pending:
+                continue
+            with self._lock:
+                module = self._entries.get(key)
+                if module is not None and module.is_fresh(stat):
+                    continue
+            pending[key] = None
+        # NOTE: there is no benefit in loading a single file in advance.
+        if len(pending) < 2:
+            return
+        with self._lock:
+            self.misses += len(pending)
+        if STATS.enabled:
+            STATS.count("module_misses", len(pending))
+
+        if isinstance(executor, ProcessPoolExecutor):
+            futures = {
+                executor.submit(
+                    load_entry, key, self.index, self.scan_threshold
+                ): key
+                for key in pending
+            }
+            for future in as_completed(futures):
+                if future.exception() is not None:
+                    continue
+                result = future.result()
+                if result is not None:
+                    size, mtime_ns, entry, data = result
+                    key = futures[future]
+                    module = SourceModule.from_entry(
+                        key, size, mtime_ns, entry, data
+                    )
+                    with self._lock:
+                        self.loads += 1
+                    self.insert(module)
+        else:
+            thread_futures = [
+                executor.submit(self._load, key) for key in pending
+            ]
+            # NOTE: wait for every file to be loaded, and ignore errors.
+            for _ in as_completed(thread_futures):
+                pass
+
+    def paths(self) -> list[Path]:
+        """
+        Return the resolved paths of the cached source files, from least to
+        most recently used.
+        """
+        with self._lock:
+            return [key for key in self._entries if isinstance(key, Path)]
+
+    def refresh(self, path: Path | str) -> bool:
+        """
+        Reload a cached source file if it has changed, without updating the
+        hit and miss counters.
+
+        The new version replaces the cached version once it has been read
+        and parsed, and every top-level object that was located by scanning
+        the previous version is located again.
+        Files that are not cached are ignored.
+
+        Parameters
+        ----------
+        path : Path | str
+            The path of the source file.
+
+        Returns
+        -------
+        bool
+            Whether the source file was reloaded.
+        """
+        stat = os.stat(path)
+        key = Path(path).resolve()
+        with self._lock:
+            prev = self._entries.get(key)
+        if prev is None or prev.is_fresh(stat):
+            return False
+        module = self._load(key)
+        for name in sorted(prev.scanned):
+            try:
+                module.lookup(name)
+            except (SyntaxError, ValueError, IncludePyError):
+                # NOTE: report errors when the object is included.
+                pass
+        return True
+
+    def _load(self, key: Path) -> SourceModule:
+        """
+        Load a source file and add it to the cache, unless another thread
+        loaded the current version of the file while this thread was
+        waiting.
+        """
+        with self._load_locks[hash(key) % LOCK_STRIPES]:
+            stat = os.stat(key)
+            with self._lock:
+                module = self._entries.get(key)
+                if module is not None and module.is_fresh(stat):
+                    self._entries.move_to_end(key)
+                    return module
+            module = SourceModule.load(key, self.index, self.scan_threshold)
+            with self._lock:
+                self.loads += 1
+            self.insert(module)
+            return module
+
+    def _lookup(self, key: Path, stat: os.stat_result) -> SourceModule | None:
+        """
+        Return the up-to-date cache entry for a resolved path, if any, and
+        update the hit and miss counters.
+        """
+        with self._lock:
+            module = self._entries.get(key)
+            if module is not None and module.is_fresh(stat):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                if STATS.enabled:
+                    STATS.count("module_hits")
+                return module
+            self.misses += 1
+            if STATS.enabled:
+                STATS.count("module_misses")
+            return None
+
+    def insert(self, module: SourceModule, key: str | None = None) -> None:
+        """
+        Add a parsed source file to the cache, replacing any existing entry
+        for the same file (or, if ``key`` is given, the same blob).
+        """
+        entry_key = module.path if key is None else key
+        with self._lock:
+            prev = self._entries.pop(entry_key, None)
+            if prev is not None:
+                self._nbytes -= prev.nbytes
+            if module.nbytes > self.max_bytes:
+                # NOTE: never retain an entry that exceeds the memory limit.
+                return
+            self._entries[entry_key] = module
+            self._nbytes += module.nbytes
+            self._evict()
+
+    def clear(self) -> None:
+        """
+        Remove all entries and reset the hit, miss, and load counters.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._nbytes = 0
+            self.hits = 0
+            self.misses = 0
+            self.loads = 0
+
+    def cache_info(self) -> CacheInfo:
+        """
+        Return summary statistics for this cache.
+        """
+        with self._lock:
+            return CacheInfo(
+                hits=self.hits,
+                misses=self.misses,
+                loads=self.loads,
+                entries=len(self._entries),
+                nbytes=self._nbytes,
+                max_entries=self.max_entries,
+                max_bytes=self.max_bytes,
+            )
+
+    def _evict(self) -> None:
+        # NOTE: the caller must hold the lock.
+        while self._entries and (
+            len(self._entries) > self.max_entries
+            or self._nbytes > self.max_bytes
+        ):
+            _, module = self._entries.popitem(last=False)
+            self._nbytes -= module.nbytes
+
+
+# The cache of parsed source files that is shared by every IncludePy
+# preprocessor in this process.
+MODULE_CACHE = ModuleCache()
+
+
+def load_entry(
+    path: Path, index: DiskIndex | None, scan_threshold: int
+) -> tuple[int, int, dict[str, Any], bytes | None] | None:
+    """
+    Read and parse a source file, and return its size, modification time,
+    :class:`~includepy.diskindex.DiskIndex` entry, and contents (or
+    ``None`` if the entry was loaded from the index without reading the
+    file), so that the file is not read again when it is rendered.
+
+    This is used to parse source files in worker processes.
+    Returns ``None`` if the source file is large enough to be scanned on
+    demand, rather than parsed.
+    """
+    module = SourceModule.load(path, index, scan_threshold)
+    if module.scanner is not None:
+        return None
+    return (module.size, module.mtime_ns, module.entry(), module.data)
+
+
+# The executors for loading source files in parallel, indexed by kind and
+# number of workers.
+_EXECUTORS: dict[tuple[str, int], Executor] = {}
+_EXECUTORS_LOCK = threading.Lock()
+
+
+def shared_executor(kind: str, workers: int) -> Executor | None:
+    """
+    Return a shared thread or process pool for loading source files.
+
+    Parameters
+    ----------
+    kind : str
+        The kind of executor: ``"thread"``, ``"process"``, or ``"none"``.
+    workers : int
+        The number of worker threads or processes; if this is zero, the number
+        of CPUs is used.
+
+    Returns
+    -------
+    Executor | None
+        The shared executor, or ``None`` if source files should be loaded
+        one at a time.
+    """
+    if workers <= 0:
+        workers = os.cpu_count() or 1
+    if kind == "none" or workers == 1:
+        return None
+    if kind not in ("thread", "process"):
+        raise IncludePyError(f"Invalid executor {kind}")
+    with _EXECUTORS_LOCK:
+        executor = _EXECUTORS.get((kind, workers))
+        if executor is None:
+            if kind == "thread":
+                executor = ThreadPoolExecutor(
+                    max_workers=workers, thread_name_prefix="includepy"
+                )
+            else:
+                executor = ProcessPoolExecutor(max_workers=workers)
+            _EXECUTORS[(kind, workers)] = executor
+        return executor
+
+
+def parse_count(options: dict[str, str], name: str) -> int:
+    """
+    Return the value of a non-negative integer option.
+    """
+    try:
+        value = int(options[name])
+    except ValueError:
+        raise IncludePyError(f"{name} must be a valid integer") from None
+    if value < 0:
+        raise IncludePyError(f"{name} cannot be negative")
+    return value
+
+
+def dedent_lines(lines: list[str], def_ix: int, col_offset: int) -> list[str]:
+    """
+    Remove any common leading whitespace from lines of source code.
+
+    The result is identical to :func:`textwrap.dedent`, except that lines
+    which only contain whitespace may retain some of this whitespace.
+    Because the indentation of the object definition is known, this only
+    needs to check that every other line begins with the same indentation,
+    and falls back to :func:`textwrap.dedent` otherwise.
+
+    Parameters
+    ----------
+    lines : list[str]
+        The lines of source code, without newline characters.
+    def_ix : int
+        The index of the line on which the object is defined.
+    col_offset : int
+        The column at which the object definition begins.
+    """
+    def_line = lines[def_ix]
+    margin = def_line[:col_offset]
+    known_margin = (
+        len(def_line) > col_offset
+        and def_line[col_offset] not in " \t"
+        and not margin.strip(" \t")
+    )
+    if known_margin and all(
+        line.startswith(margin) or not line.strip(" \t") for line in lines
+    ):
+        if not margin:
+            return lines
+        return [line[col_offset:] for line in lines]
+    return textwrap.dedent("\n".join(lines)).split("\n")
+
+
+def render_snippet(
+    module: SourceModule, options: dict[str, str], indent_str: str
+) -> list[str]:
+    """
+    Return the lines of source code for an IncludePy block.
+
+    Parameters
+    ----------
+    module : SourceModule
+        The parsed source file.
+    options : dict[str, str]
+        The block options, including default values.
+    indent_str : str
+        The indentation of the block.
+
+    Returns
+    -------
+    list[str]
+        The indented lines of source code.
+    """
+    # NOTE: this is only timed when statistics are enabled.
+    watch = STATS.stopwatch() if STATS.enabled else None
+    obj_name = options.get("pyobject")
+    lineno, end_lineno, col_offset = module.lookup(obj_name)
+    if watch is not None:
+        watch.lap("lookup")
+
+    n_back = parse_count(options, "lines_before")
+    n_fwd = parse_count(options, "lines_after")
+    n_indent = parse_count(options, "extra_indent")
+
+    if n_indent > 0:
+        indent_str = indent_str + n_indent * " "
+
+    start_ix = max(0, lineno - 1 - n_back)
+    end_ix = min(module.nlines, end_lineno + n_fwd)
+
+    # NOTE: remove any code indentation (e.g., class methods).
+    obj_lines = dedent_lines(
+        module.text(start_ix, end_ix).split("\n"),
+        lineno - 1 - start_ix,
+        col_offset,
+    )
+    # Remove the trailing empty line after the final newline.
+    obj_lines = obj_lines[:-1]
+    if watch is not None:
+        watch.lap("slice")
+
+    # Retain only selected lines if "only_lines" is defined.
+    only_lines = options["only_lines"]
+    if only_lines:
+        obj_lines = selected_lines(obj_lines, only_lines)
+
+    # NOTE: we need to indent and strip newlines.
+    code_lines = [indent_str + obj_line.rstrip() for obj_line in obj_lines]
+    if watch is not None:
+        watch.lap("format")
+    return code_lines
+
+
+# The canonical form of the options for an IncludePy block: the object name,
+# the number of lines before and after, the extra indentation, and the line
+# selection.
+SnippetOptions = tuple[str | None, int, int, int, str]
+
+
+def normalise_options(options: dict[str, str]) -> SnippetOptions | None:
+    """
+    Return the options for an IncludePy block in canonical form, so that
+    equivalent options (e.g., "4" and "04") are treated as identical, or
+    ``None`` if any option value is invalid.
+    """
+    try:
+        counts = [
+            int(options[name])
+            for name in ("lines_before", "lines_after", "extra_indent")
+        ]
+    except ValueError:
+        return None
+    if min(counts) < 0:
+        return None
+    n_back, n_fwd, n_indent = counts
+    return (
+        options.get("pyobject"),
+        n_back,
+        n_fwd,
+        n_indent,
+        options["only_lines"],
+    )
+
+
+def cached_snippet(
+    module: SourceModule,
+    options: dict[str, str],
+    canonical: SnippetOptions | None,
+    indent_str: str,
+    snippets: "SnippetCache",
+    index: DiskIndex | None = None,
+) -> list[str]:
+    """
+    Return the lines of source code for an IncludePy block, using the cached
+    lines if this block has already been rendered (by this process or, if
+    there is a persistent index, by an earlier build).
+
+    Parameters
+    ----------
+    module : SourceModule
+        The parsed source file.
+    options : dict[str, str]
+        The block options, including default values.
+    canonical : SnippetOptions | None
+        The block options in canonical form (see :func:`normalise_options`).
+    indent_str : str
+        The indentation of the block.
+    snippets : SnippetCache
+        The cache of rendered code blocks.
+    index : DiskIndex | None
+        An optional persistent index, which is used in preference to
+        rendering the block, and is updated if the block is rendered.
+
+    Returns
+    -------
+    list[str]
+        The indented lines of source code, which must not be modified.
+    """
+    if canonical is None:
+        # NOTE: render the block to raise the appropriate exception.
+        return render_snippet(module, options, indent_str)
+
+    snippet_key = (module.digest, canonical, indent_str)
+    code_lines = snippets.get(snippet_key)
+    if code_lines is not None:
+        return code_lines
+    if index is not None:
+        code_lines = index.load_snippet(snippet_key)
+    if code_lines is None:
+        code_lines = render_snippet(module, options, indent_str)
+        if index is not None:
+            index.store_snippet(snippet_key, code_lines)
+    snippets.put(snippet_key, code_lines)
+    return code_lines
+
+
+class Directive(NamedTuple):
+    """
+    An IncludePy block, whose option names have been validated.
+
+    Directives are immutable and hashable, so that identical blocks can be
+    identified.
+    """
+
+    python_file: Path
+    indent_str: str
+    options: tuple[tuple[str, str], ...]
+    canonical: SnippetOptions | None
+
+    @classmethod
+    def from_block(
+        cls, python_file: Path, options: dict[str, str], indent_str: str
+    ) -> "Directive":
+        """
+        Construct a directive from the options for an IncludePy block.
+
+        Parameters
+        ----------
+        python_file : Path
+            The path of the source file.
+        options : dict[str, str]
+            The block options, including default values.
+        indent_str : str
+            The indentation of the block.
+        """
+        return cls(
+            python_file,
+            indent_str,
+            tuple(sorted(options.items())),
+            normalise_options(options),
+        )
+
+    @property
+    def ref(self) -> str | None:
+        """
+        The git revision from which to read the source file, if any.
+        """
+        return dict(self.options).get("ref")
+
+
+class SnippetCacheInfo(NamedTuple):
+    """
+    Summary statistics for a :class:`SnippetCache`.
+    """
+
+    hits: int
+    misses: int
+    entries: int
+    max_entries: int
+
+
+class SnippetCache:
+    """
+    A least-recently-used cache of rendered IncludePy blocks.
+
+    Entries are keyed by the content hash of the source file, the canonical
+    block options, and the block indentation, so entries for modified source
+    files are never used.
+
+    Parameters
+    ----------
+    max_entries : int
+        The maximum number of rendered blocks to retain.
+    """
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[Hashable, list[str]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def configure(self, max_entries: int | None = None) -> None:
+        """
+        Change the maximum number of rendered blocks to retain (if not
+        ``None``), evicting entries as required.
+        """
+        with self._lock:
+            if max_entries is not None:
+                self.max_entries = int(max_entries)
+            self._evict()
+
+    def get(self, key: Hashable) -> list[str] | None:
+        """
+        Return the cached lines for a rendered block, or ``None`` if there is
+        no cache entry.
+        The returned list must not be modified.
+        """
+        with self._lock:
+            lines = self._entries.get(key)
+            if lines is None:
+                self.misses += 1
+            else:
+                self._entries.move_to_end(key)
+                self.hits += 1
+        if STATS.enabled:
+            STATS.count("snippet_misses" if lines is None else "snippet_hits")
+        return lines
+
+    def put(self, key: Hashable, lines: list[str]) -> None:
+        """
+        Record the lines for a rendered block.
+        """
+        with self._lock:
+            self._entries[key] = lines
+            self._entries.move_to_end(key)
+            self._evict()
+
+    def clear(self) -> None:
+        """
+        Remove all entries and reset the hit and miss counters.
+        """
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def cache_info(self) -> SnippetCacheInfo:
+        """
+        Return summary statistics for this cache.
+        """
+        with self._lock:
+            return SnippetCacheInfo(
+                hits=self.hits,
+                misses=self.misses,
+                entries=len(self._entries),
+                max_entries=self.max_entries,
+            )
+
+    def _evict(self) -> None:
+        # NOTE: the caller must hold the lock.
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+# The cache of rendered IncludePy blocks that is shared by every IncludePy
+# preprocessor in this process.
+SNIPPET_CACHE = SnippetCache()
+
+
+class Renderer:
+    """
+    Render the source code for the IncludePy blocks in a single document.
+
+    Identical blocks in the same document are only rendered once, and
+    rendered blocks are shared between documents via a :class:`SnippetCache`.
+
+    Parameters
+    ----------
+    cache : ModuleCache | None
+        The cache of parsed source files (default: :data:`MODULE_CACHE`).
+    snippets : SnippetCache | None
+        The cache of rendered blocks (default: :data:`SNIPPET_CACHE`).
+    memo : bool
+        Whether to retain every rendered block for the rest of the document;
+        if this is ``False``, identical blocks are only shared via the
+        :class:`SnippetCache`.
+    """
+
+    def __init__(
+        self,
+        cache: ModuleCache | None = None,
+        snippets: SnippetCache | None = None,
+        memo: bool = True,
+    ):
+        self.cache = MODULE_CACHE if cache is None else cache
+        self.snippets = SNIPPET_CACHE if snippets is None else snippets
+        self.memo = memo
+        # NOTE: the name of the document, if known, for tracing.
+        self.page: str | None = None
+        # NOTE: the index used to resolve the module names in ``pymodule``
+        # blocks, if any source roots are configured.
+        self.module_index: ModuleIndex | None = None
+        self.rendered: dict[Directive, list[str]] = {}
+        # NOTE: every directive that was rendered, including directives that
+        # raised an exception, in the order that they were first rendered.
+        # When rendered blocks are not retained, this also records the
+        # content hash of each rendered block.
+        self.used: dict[Directive, str | None] = {}
+        # NOTE: when this is a list, directives are recorded here and are
+        # not rendered.
+        self.deferred: list[Directive] | None = None
+
+    def emit(self, directive: Directive, output_lines: list[str]) -> None:
+        """
+        Add the lines of source code for an IncludePy block to the output,
+        or record the directive if rendering is deferred.
+        """
+        if self.deferred is not None:
+            self.deferred.append(directive)
+        else:
+            output_lines.extend(self.render(directive))
+
+    def render(self, directive: Directive) -> list[str]:
+        """
+        Return the lines of source code for an IncludePy block.
+
+        Parameters
+        ----------
+        directive : Directive
+            The IncludePy block.
+
+        Returns
+        -------
+        list[str]
+            The indented lines of source code, which must not be modified.
+        """
+        code_lines = self.rendered.get(directive)
+        if code_lines is not None:
+            return code_lines
+        if TRACER.enabled:
+            with TRACER.span(
+                "directive",
+                "directive",
+                page=self.page,
+                path=str(directive.python_file),
+                pyobject=dict(directive.options).get("pyobject"),
+            ):
+                return self._render(directive)
+        return self._render(directive)
+
+    def _render(self, directive: Directive) -> list[str]:
+        self.used[directive] = None
+        options = dict(directive.options)
+        ref = options.get("ref")
+        if ref is None:
+            module = self.cache.get(directive.python_file)
+        else:
+            module = self.cache.get_blob(directive.python_file, ref)
+        code_lines = cached_snippet(
+            module,
+            options,
+            directive.canonical,
+            directive.indent_str,
+            self.snippets,
+            self.cache.index,
+        )
+        if self.memo:
+            self.rendered[directive] = code_lines
+        else:
+            self.used[directive] = snippet_digest(code_lines)
+        return code_lines
+
+    def dependencies(self) -> list["Dependency"]:
+        """
+        Return the dependencies of the rendered IncludePy blocks.
+        """
+        return [
+            Dependency(
+                directive,
+                snippet_digest(self.rendered[directive])
+                if directive in self.rendered
+                else digest,
+            )
+            for directive, digest in self.used.items()
+        ]
+
+
+def snippet_digest(code_lines: list[str] | None) -> str | None:
+    """
+    Return the content hash for the rendered lines of an IncludePy block, or
+    ``None`` if the block could not be rendered.
+    """
+    if code_lines is None:
+        return None
+    return content_digest("\n".join(code_lines).encode())
+
+
+class Dependency(NamedTuple):
+    """
+    The dependency of a document on the source code for an IncludePy block.
+    """
+
+    directive: Directive
+    """The IncludePy block."""
+    digest: str | None
+    """The content hash of the rendered block, or ``None`` if the block could
+    not be rendered."""
+
+
+class DependencyManifest:
+    """
+    Record the IncludePy blocks in each document, so that documents only need
+    to be rebuilt when the source code for one of their blocks changes.
+
+    Each document is identified by a name (e.g., its path), and depends on the
+    Python file, the object, and the content hash of the rendered source code
+    for each of its blocks.
+    Because the dependencies are recorded for each object, changing one
+    object in a Python file does not affect documents that include different
+    objects from that file.
+
+    Parameters
+    ----------
+    path : Path | str | None
+        The file in which the manifest is saved; if this file exists, the
+        manifest is loaded from it.
+    """
+
+    def __init__(self, path: Path | str | None = None):
+        self.path = None if path is None else Path(path)
+        self.pages: dict[str, list[Dependency]] = {}
+        self._lock = threading.Lock()
+        if self.path is not None:
+            self.load(self.path)
+
+    def record(self, page: str, dependencies: Iterable[Dependency]) -> None:
+        """
+        Record the dependencies of a document, replacing any previously
+        recorded dependencies.
+        """
+        with self._lock:
+            self.pages[page] = list(dependencies)
+
+    def forget(self, page: str) -> None:
+        """
+        Remove the dependencies of a document, if any.
+        """
+        with self._lock:
+            self.pages.pop(page, None)
+
+    def python_files(self, page: str) -> set[Path]:
+        """
+        Return the resolved paths of the Python files that a document
+        includes.
+        """
+        with self._lock:
+            dependencies = self.pages.get(page, [])
+        return {dep.directive.python_file.resolve() for dep in dependencies}
+
+    def stale_pages(
+        self,
+        changed_files: Iterable[Path | str],
+        cache: ModuleCache | None = None,
+    ) -> list[str]:
+        """
+        Return the documents whose rendered IncludePy blocks have changed.
+
+        Only blocks that include code from one of the changed Python files are
+        rendered again.
+
+        Parameters
+        ----------
+        changed_files : Iterable[Path | str]
+            The Python files that have changed (or have been deleted).
+        cache : ModuleCache | None
+            The cache of parsed source files (default: :data:`MODULE_CACHE`).
+
+        Returns
+        -------
+        list[str]
+            The names of the documents that should be rebuilt, in the order
+            that they were recorded.
+        """
+        changed = {Path(path).resolve() for path in changed_files}
+        renderer = Renderer(cache)
+        digests: dict[Directive, str | None] = {}
+        with self._lock:
+            pages = list(self.pages.items())
+
+        stale = []
+        for page, dependencies in pages:
+            for directive, digest in dependencies:
+                if directive.python_file.resolve() not in changed:
+                    continue
+                if directive not in digests:
+                    try:
+                        code_lines = renderer.render(directive)
+                    except (OSError, SyntaxError, ValueError, IncludePyError):
+                        code_lines = None
+                    digests[directive] = snippet_digest(code_lines)
+                if digests[directive] != digest:
+                    stale.append(page)
+                    break
+        return stale
+
+    def save(self, path: Path | str | None = None) -> None:
+        """
+        Save the manifest to a JSON file, which is written to a temporary
+        file and then atomically renamed.
+
+        Parameters
+        ----------
+        path : Path | str | None
+            The destination (default: the path given to the constructor).
+        """
+        path = self.path if path is None else Path(path)
+        if path is None:
+            raise ValueError("No path for the dependency manifest")
+        with self._lock:
+            pages = {
+                page: [
+                    {
+                        "file": str(directive.python_file),
+                        "indent": directive.indent_str,
+                        "options": dict(directive.options),
+                        "digest": digest,
+                    }
+                    for directive, digest in dependencies
+                ]
+                for page, dependencies in self.pages.items()
+            }
+        contents = {"format": MANIFEST_VERSION, "pages": pages}
+        atomic_write(path, json.dumps(contents, separators=(",", ":")))
+
+    def load(self, path: Path | str) -> None:
+        """
+        Load the manifest from a JSON file, if it exists and is valid.
+        Otherwise, the manifest is left empty.
+        """
+        try:
+            with open(path, "rb") as f:
+                contents = json.load(f)
+            if contents["format"] != MANIFEST_VERSION:
+                return
+            pages = {
+                page: [
+                    Dependency(
+                        Directive.from_block(
+                            Path(dep["file"]), dep["options"], dep["indent"]
+                        ),
+                        dep["digest"],
+                    )
+                    for dep in dependencies
+                ]
+                for page, dependencies in contents["pages"].items()
+            }
+        except (OSError, ValueError, TypeError, KeyError, AttributeError):
+            # NOTE: a missing or invalid manifest causes every document to be
+            # rebuilt, so it is not an error.
+            return
+        with self._lock:
+            self.pages = pages
+
+
 class ProcessorState:
     """
     Define an interface for processing Markdown lines.
@@ -149,8 +1734,16 @@ class ProcessorState:
 class EchoLines(ProcessorState):
     """
     Preserve existing Markdown content.
+
+    Parameters
+    ----------
+    renderer : Renderer | None
+        The renderer for IncludePy blocks (default: a new renderer).
     """
 
+    def __init__(self, renderer: "Renderer | None" = None):
+        self.renderer = Renderer() if renderer is None else renderer
+
     def read_line(
         self, input_line: str | None, output_lines: list[str]
     ) -> ProcessorState:
@@ -164,15 +1757,25 @@ class EchoLines(ProcessorState):
             output_lines.append(input_line.replace(";", "", 1))
             return self
         else:
-            return ParseBlock(re_match)
+            return ParseBlock(re_match, self.renderer)
 
 
 class ParseBlock(ProcessorState):
     """
     Parse an IncludePy block and add the specified Python code to the output.
+
+    Parameters
+    ----------
+    re_match : re.Match[str]
+        The match for the ``includepy`` (or ``pymodule``) line that starts
+        this block.
+    renderer : Renderer | None
+        The renderer for IncludePy blocks (default: a new renderer).
     """
 
-    def __init__(self, re_match: re.Match[str]):
+    def __init__(
+        self, re_match: re.Match[str], renderer: "Renderer | None" = None
+    ):
         # 1. Indentation
         # 2. Escaping
         # 3. Option name
@@ -181,12 +1784,16 @@ class ParseBlock(ProcessorState):
         if escaping:
             raise IncludePyError("Should not parse an escaped line")
         opt_name = re_match.group(3)
-        if opt_name != "includepy":
+        if opt_name not in BLOCK_OPTIONS:
             raise IncludePyError(
-                f"Expected 'includepy' but found '{opt_name}'"
+                f"Expected 'includepy' or 'pymodule' but found '{opt_name}'"
             )
         self.indent_str = re_match.group(1)
-        self.python_file = Path(re_match.group(4))
+        self.renderer = Renderer() if renderer is None else renderer
+        if opt_name == "pymodule":
+            self.python_file = self.resolve_module(re_match.group(4))
+        else:
+            self.python_file = Path(re_match.group(4))
         self.defaults = default_options()
         self.options: dict[str, str] = {}
 
@@ -202,13 +1809,13 @@ class ParseBlock(ProcessorState):
             # Extract the source code and add to `output_lines`, and then
             # process the current input line.
             self.add_code_lines(output_lines)
-            next_state = EchoLines()
+            next_state = EchoLines(self.renderer)
             return next_state.read_line(input_line, output_lines)
-        elif re_match and re_match.group(3) == "includepy":
+        elif re_match and re_match.group(3) in BLOCK_OPTIONS:
             # Extract the source code and add to `output_lines`, then start
             # parsing the next block.
             self.add_code_lines(output_lines)
-            return ParseBlock(re_match)
+            return ParseBlock(re_match, self.renderer)
 
         # Continue parsing the option lines.
         escaping = re_match.group(2)
@@ -224,80 +1831,29 @@ class ParseBlock(ProcessorState):
 
         return self
 
-    def add_code_lines(self, output_lines: list[str]) -> None:
-        options = self.defaults | self.options
-
-        with open(self.python_file) as f:
-            source_lines = f.readlines()
-            module: ast.AST = ast.parse("".join(source_lines))
-
-        obj_name = options.get("pyobject")
-        obj = find_object(obj_name, module)
-
-        if hasattr(obj, "lineno"):
-            lineno = obj.lineno
-        else:
-            raise IncludePyError("No line number in syntax tree")
-        if hasattr(obj, "end_lineno"):
-            end_lineno = obj.end_lineno
-            if end_lineno is None:
-                raise IncludePyError(
-                    f"no end line for {obj_name} in {self.python_file}"
-                )
-        else:
-            raise IncludePyError("No end line number in syntax tree")
-
-        try:
-            n_back = int(options["lines_before"])
-        except ValueError:
-            raise IncludePyError(
-                "lines_before must be a valid integer"
-            ) from None
-        if n_back < 0:
-            raise IncludePyError("lines_before cannot be negative")
-
-        try:
-            n_fwd = int(options["lines_after"])
-        except ValueError:
+    def resolve_module(self, name: str) -> Path:
+        """
+        Return the source file for a module name, using the renderer's
+        module index.
+        """
+        index = self.renderer.module_index
+        if index is None:
             raise IncludePyError(
-                "lines_after must be a valid integer"
-            ) from None
-        if n_fwd < 0:
-            raise IncludePyError("lines_after cannot be negative")
+                f"Cannot include module {name} without any source roots"
+            )
+        path = index.resolve(name)
+        if path is None:
+            raise IncludePyError(f"Could not find module {name}")
+        return path
 
-        try:
-            n_indent = int(options["extra_indent"])
-        except ValueError:
-            raise IncludePyError(
-                "extra_indent must be a valid integer"
-            ) from None
-        if n_indent < 0:
-            raise IncludePyError("extra_indent cannot be negative")
-
-        indent_str = self.indent_str
-        if n_indent > 0:
-            indent_str = self.indent_str + n_indent * " "
-
-        start_ix = max(0, lineno - 1 - n_back)
-        end_ix = min(len(source_lines), end_lineno + n_fwd)
-        obj_lines = source_lines[start_ix:end_ix]
-
-        # NOTE: remove any code indentation (e.g., class methods).
-        obj_lines = textwrap.dedent("".join(obj_lines)).split("\n")
-        # Remove the trailing empty line after the final newline.
-        obj_lines = obj_lines[:-1]
-
-        # Retain only selected lines if "only_lines" is defined.
-        only_lines = options["only_lines"]
-        if only_lines:
-            obj_lines = selected_lines(obj_lines, only_lines)
-
-        # Add the source lines to the document.
-        # NOTE: we need to indent and strip newlines.
-        code_lines = [
-            indent_str + obj_line.rstrip() for obj_line in obj_lines
-        ]
-        output_lines.extend(code_lines)
+    def add_code_lines(self, output_lines: list[str]) -> None:
+        options = self.defaults | self.options
+        directive = Directive.from_block(
+            self.python_file, options, self.indent_str
+        )
+        if STATS.enabled:
+            STATS.count("directives")
+        self.renderer.emit(directive, output_lines)
 
 
 class IncludePyError(Exception):
@@ -310,10 +1866,58 @@ class IncludePyError(Exception):
 class IncludePyProc(Preprocessor):
     """The IncludePy preprocessor."""
 
-    def __init__(self, config: dict[str, Any], md: Markdown):
+    def __init__(self, config: dict[str, Any], md: Markdown | None = None):
         # NOTE: refer to the Extensions API for configuration settings:
         # https://python-markdown.github.io/extensions/api/#configsettings
         super().__init__()
+        # NOTE: the cache is shared by all preprocessors, because MkDocs
+        # creates a new Markdown instance for every page.
+        self.cache = MODULE_CACHE
+        self.cache.configure(
+            max_entries=config.get("cache_max_entries"),
+            max_bytes=config.get("cache_max_bytes"),
+            cache_dir=config.get("cache_dir"),
+            scan_threshold=config.get("scan_threshold"),
+            cache_backend=config.get("cache_backend"),
+        )
+        self.snippets = SNIPPET_CACHE
+        self.snippets.configure(max_entries=config.get("snippet_cache_size"))
+        self.executor = shared_executor(
+            config.get("executor", "none"), int(config.get("workers", 1))
+        )
+        self.async_limit = int(config.get("async_limit", 8))
+        if config.get("stats") or config.get("log_stats"):
+            STATS.enabled = True
+        if config.get("log_stats"):
+            log_stats_at_exit()
+        trace_file = config.get("trace_file") or os.environ.get(TRACE_ENV)
+        if trace_file:
+            TRACER.start(trace_file)
+        self.manifest: DependencyManifest | None = (
+            config.get("manifest") or None
+        )
+        if config.get("watch"):
+            shared_watcher(
+                self.cache,
+                interval=float(config.get("watch_interval", 1.0)),
+                max_cpu=float(config.get("watch_max_cpu", 0.05)),
+            )
+        source_roots = config.get("source_roots") or []
+        self.module_index = (
+            module_index(source_roots) if source_roots else None
+        )
+        # NOTE: the dependencies of each document are only recorded when the
+        # document has a name.
+        self.page: str | None = None
+
+    def renderer(self) -> Renderer:
+        """
+        Return a new renderer for the IncludePy blocks in a document.
+        """
+        renderer = Renderer(self.cache, self.snippets)
+        renderer.page = self.page
+        renderer.module_index = self.module_index
+        return renderer
 
     def run(self, lines: list[str]) -> list[str]:
         """
@@ -331,14 +1935,331 @@ class IncludePyProc(Preprocessor):
             The processed lines of text, with Python source code lines added
             as directed.
         """
-        output_lines: list[str] = []
-        state: ProcessorState = EchoLines()
+        with TRACER.span("run", "document", page=self.page):
+            # NOTE: most documents do not contain any IncludePy directives.
+            if not has_options(lines):
+                if STATS.enabled:
+                    STATS.count("documents")
+                self.record_dependencies(self.renderer())
+                return lines
+            self.prefetch(lines)
+            return list(self.iter_process(lines, self.renderer()))
+
+    def run_loaded(self, lines: list[str]) -> list[str]:
+        """
+        Process the input Markdown content, without loading the included
+        source files in parallel first (e.g., because they have already been
+        loaded by :meth:`aprefetch`).
+
+        Parameters
+        ----------
+        lines : list[str]
+            A list of text lines.
+
+        Returns
+        -------
+        list[str]
+            The processed lines of text, with Python source code lines added
+            as directed.
+        """
+        with TRACER.span("run", "document", page=self.page):
+            return list(self.iter_process(lines, self.renderer()))
+
+    def iter_process(
+        self, lines: Iterable[str], renderer: Renderer | None = None
+    ) -> Iterator[str]:
+        """
+        Process Markdown content one line at a time, and yield the processed
+        lines as soon as they are available.
+
+        Lines that are not part of an IncludePy block are yielded immediately,
+        and the source code for each block is yielded once the end of the
+        block is reached, so only the current block is held in memory.
+
+        Parameters
+        ----------
+        lines : Iterable[str]
+            The lines of text.
+        renderer : Renderer | None
+            The renderer for the IncludePy blocks in this document (default:
+            a new renderer that does not retain the rendered blocks).
+
+        Yields
+        ------
+        str
+            The processed lines of text, with Python source code lines added
+            as directed.
+        """
+        if renderer is None:
+            renderer = Renderer(self.cache, self.snippets, memo=False)
+        if STATS.enabled:
+            STATS.count("documents")
+        try:
+            yield from process_lines(lines, renderer)
+        finally:
+            self.record_dependencies(renderer)
+
+    async def arun(self, lines: list[str]) -> list[str]:
+        """
+        Process the input Markdown content without blocking the event loop.
 
-        for line in lines:
-            state = state.read_line(line, output_lines)
-        state.read_line(None, output_lines)
+        The distinct source files included by the document are loaded
+        concurrently in the event loop's default executor, and the document
+        is then processed in the executor.
+        The output is identical to :meth:`run`.
 
-        return output_lines
+        Parameters
+        ----------
+        lines : list[str]
+            A list of text lines.
+
+        Returns
+        -------
+        list[str]
+            The processed lines of text, with Python source code lines added
+            as directed.
+        """
+        if not has_options(lines):
+            if STATS.enabled:
+                STATS.count("documents")
+            self.record_dependencies(self.renderer())
+            return lines
+        await self.aprefetch(lines)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.run_loaded, lines)
+
+    async def aprefetch(self, lines: Iterable[str]) -> None:
+        """
+        Load each distinct source file that is included by a document,
+        without blocking the event loop.
+
+        At most ``async_limit`` source files are loaded at once, and errors
+        are ignored so that they are raised when the document is processed.
+
+        Parameters
+        ----------
+        lines : Iterable[str]
+            The lines of the Markdown document.
+        """
+        loop = asyncio.get_running_loop()
+        semaphore = asyncio.Semaphore(self.async_limit)
+
+        async def load(python_file: Path) -> None:
+            async with semaphore:
+                try:
+                    await loop.run_in_executor(
+                        None, self.cache.get, python_file
+                    )
+                except (OSError, SyntaxError, ValueError, IncludePyError):
+                    pass
+
+        python_files = dict.fromkeys(
+            directive.python_file
+            for directive in collect_directives(lines, self.module_index)
+            if directive.ref is None
+        )
+        await asyncio.gather(*(load(path) for path in python_files))
+
+    def prefetch(self, lines: Iterable[str]) -> None:
+        """
+        Load each distinct source file that is included by a document, in
+        parallel.
+
+        Errors are ignored, so that they are raised when the document is
+        processed.
+
+        Parameters
+        ----------
+        lines : Iterable[str]
+            The lines of the Markdown document.
+        """
+        if self.executor is None:
+            return
+        directives = collect_directives(lines, self.module_index)
+        self.cache.prefetch(
+            (
+                directive.python_file
+                for directive in directives
+                if directive.ref is None
+            ),
+            self.executor,
+        )
+
+    def record_dependencies(self, renderer: Renderer) -> None:
+        """
+        Record the blocks that were rendered for the current document in the
+        dependency manifest, if the document has a name.
+        """
+        if self.manifest is not None and self.page is not None:
+            self.manifest.record(self.page, renderer.dependencies())
+
+
+def has_options(lines: Iterable[str]) -> bool:
+    """
+    Return whether any line of a Markdown document contains an option
+    marker, without joining the lines into a single string.
+    """
+    return any(OPTION_MARKER in line for line in lines)
+
+
+def process_lines(lines: Iterable[str], renderer: Renderer) -> Iterator[str]:
+    """
+    Pass each line of a Markdown document to the IncludePy state machine,
+    and yield the processed lines as soon as they are available.
+
+    Parameters
+    ----------
+    lines : Iterable[str]
+        The lines of text.
+    renderer : Renderer
+        The renderer for the IncludePy blocks in this document.
+
+    Yields
+    ------
+    str
+        The processed lines of text.
+    """
+    state: ProcessorState = EchoLines(renderer)
+    output_lines: list[str] = []
+    for line in lines:
+        # NOTE: lines without an option marker are copied unchanged, unless
+        # they end an IncludePy block.
+        if OPTION_MARKER not in line and type(state) is EchoLines:
+            yield line
+            continue
+        state = state.read_line(line, output_lines)
+        yield from output_lines
+        output_lines.clear()
+    state.read_line(None, output_lines)
+    yield from output_lines
+
+
+def collect_directives(
+    lines: Iterable[str], module_index: ModuleIndex | None = None
+) -> list[Directive]:
+    """
+    Return the IncludePy blocks in a Markdown document, up to the first
+    invalid block (if any).
+
+    Parameters
+    ----------
+    lines : Iterable[str]
+        The lines of the Markdown document.
+    module_index : ModuleIndex | None
+        The index used to resolve module names in ``pymodule`` blocks.
+    """
+    renderer = Renderer()
+    renderer.deferred = []
+    renderer.module_index = module_index
+    try:
+        for _ in process_lines(lines, renderer):
+            pass
+    except IncludePyError:
+        pass
+    return renderer.deferred
+
+
+def extract_objects(
+    path: Path | str,
+    names: Iterable[str],
+    cache: ModuleCache | None = None,
+    snippets: SnippetCache | None = None,
+    **options: str | int,
+) -> dict[str, list[str]]:
+    """
+    Return the source code for many objects in a Python file, as it would be
+    included by IncludePy blocks with the same options.
+
+    The file is loaded once, and shares the cache of parsed files and the
+    cache of rendered code blocks with the IncludePy extension.
+    If the file is large enough to be scanned (see the ``scan_threshold``
+    option) and several objects are requested, the entire file is parsed
+    once instead of being scanned for each object.
+
+    Parameters
+    ----------
+    path : Path | str
+        The Python file.
+    names : Iterable[str]
+        The names of the objects (e.g., ``"MyClass.method"``).
+    cache : ModuleCache | None
+        The cache of parsed files (default: :data:`MODULE_CACHE`).
+    snippets : SnippetCache | None
+        The cache of rendered code blocks (default: :data:`SNIPPET_CACHE`).
+    **options : str | int
+        The options for every object (e.g., ``lines_before=1``); the
+        ``pyobject`` option is not allowed.
+
+    Returns
+    -------
+    dict[str, list[str]]
+        The lines of source code for each object, in the order of ``names``.
+
+    Raises
+    ------
+    IncludePyError
+        If an option is invalid or an object cannot be found.
+    """
+    if cache is None:
+        cache = MODULE_CACHE
+    if snippets is None:
+        snippets = SNIPPET_CACHE
+    defaults = default_options()
+    for opt_name in options:
+        if opt_name not in defaults:
+            raise IncludePyError(f"Invalid option {opt_name}")
+    defaults.update((key, str(value)) for key, value in options.items())
+
+    names = list(dict.fromkeys(names))
+    module = cache.get(Path(path))
+    if module.scanner is not None and len(names) > 1:
+        # NOTE: one parse is cheaper than scanning the file for each object.
+        module.index_all()
+    objects = {}
+    for name in names:
+        block_options = defaults | {"pyobject": name}
+        code_lines = cached_snippet(
+            module,
+            block_options,
+            normalise_options(block_options),
+            "",
+            snippets,
+            cache.index,
+        )
+        objects[name] = list(code_lines)
+    return objects
+
+
+# Whether the build statistics will be logged when the process exits.
+_LOG_STATS_AT_EXIT = False
+
+
+def log_stats_at_exit() -> None:
+    """
+    Log a summary of the build statistics when the process exits.
+    """
+    global _LOG_STATS_AT_EXIT
+    if not _LOG_STATS_AT_EXIT:
+        _LOG_STATS_AT_EXIT = True
+        atexit.register(log_stats)
+
+
+def log_stats(logger: logging.Logger | None = None) -> None:
+    """
+    Log a summary of the build statistics, unless nothing has been recorded
+    since they were last reset.
+
+    Parameters
+    ----------
+    logger : logging.Logger, optional
+        The logger to use (default: the ``includepy`` logger).
+    """
+    snapshot = STATS.snapshot()
+    if not any(snapshot.counts.values()):
+        return
+    if logger is None:
+        logger = logging.getLogger(__name__)
+    logger.info(snapshot.summary())
 
 
 class IncludePy(Extension):
@@ -348,9 +2269,100 @@ class IncludePy(Extension):
         # Define the default configuration settings.
         self.config = {
             "priority": [100, "Default priority for IncludePy"],
+            "cache_max_entries": [
+                128,
+                "Maximum number of parsed Python files to cache",
+            ],
+            "cache_max_bytes": [
+                64 * 2**20,
+                "Approximate memory limit (in bytes) for cached Python files",
+            ],
+            "cache_dir": [
+                "",
+                "Directory for a persistent index of parsed Python files",
+            ],
+            "cache_backend": [
+                "files",
+                "How to store the persistent index: 'files' or 'sqlite'",
+            ],
+            "snippet_cache_size": [
+                1024,
+                "Maximum number of rendered code blocks to cache",
+            ],
+            "executor": [
+                "none",
+                "Load Python files in parallel with a 'thread' pool, a "
+                "'process' pool, or 'none'",
+            ],
+            "workers": [
+                1,
+                "Number of threads or processes for loading Python files "
+                "(0: one per CPU)",
+            ],
+            "async_limit": [
+                8,
+                "Maximum number of Python files to load at once when "
+                "processing documents asynchronously",
+            ],
+            "stats": [
+                False,
+                "Collect build statistics, which are returned by "
+                "IncludePy.stats()",
+            ],
+            "log_stats": [
+                False,
+                "Collect build statistics and log a summary when the process "
+                "exits",
+            ],
+            "trace_file": [
+                "",
+                "Write a Chrome trace-event file to this path when the "
+                "process exits",
+            ],
+            # NOTE: Markdown converts the values of options whose default is
+            # None to booleans, so an empty string means "no manifest".
+            "manifest": [
+                "",
+                "A DependencyManifest in which to record the IncludePy "
+                "blocks in each named document",
+            ],
+            "scan_threshold": [
+                2**20,
+                "File size (in bytes) above which objects are located by "
+                "scanning, rather than parsing, the Python file",
+            ],
+            "source_roots": [
+                [],
+                "Directories against which to resolve the module names in "
+                "pymodule blocks",
+            ],
+            "watch": [
+                False,
+                "Reload cached Python files in a background thread when they "
+                "change",
+            ],
+            "watch_interval": [
+                1.0,
+                "Seconds between checks for changed Python files",
+            ],
+            "watch_max_cpu": [
+                0.05,
+                "Maximum fraction of one CPU used to reload changed Python "
+                "files",
+            ],
         }
         super().__init__(**kwargs)
 
+    @staticmethod
+    def stats() -> StatsSnapshot:
+        """
+        Return the build statistics for this process.
+
+        Statistics are only collected when the ``stats`` or ``log_stats``
+        option is enabled.
+        """
+        return STATS.snapshot()
+
     def extendMarkdown(self, md: Markdown) -> None:
         """
         Register this extension with a Markdown processor.
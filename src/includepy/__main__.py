@@ -0,0 +1,364 @@
+"""
+Command-line tools for IncludePy.
+
+Run ``python -m includepy --help`` for a list of commands.
+"""
+
+import argparse
+import sys
+import tarfile
+
+from collections.abc import Sequence
+from pathlib import Path
+
+from . import (
+    INDEX_BACKENDS,
+    MODULE_CACHE,
+    IncludePyError,
+    atomic,
+    check,
+    expand,
+    pool,
+    prewarm,
+)
+
+
+def parser() -> argparse.ArgumentParser:
+    """
+    Return the command-line argument parser.
+    """
+    p = argparse.ArgumentParser(
+        prog="python -m includepy",
+        description="Include Python source code in Markdown files",
+    )
+    commands = p.add_subparsers(dest="command", required=True)
+
+    p_prewarm = commands.add_parser(
+        "prewarm",
+        help="Parse the Python files included by Markdown files",
+        description=(
+            "Parse every Python file that is included by the Markdown files,"
+            " and record them in the persistent index."
+        ),
+    )
+    p_prewarm.add_argument(
+        "paths",
+        nargs="+",
+        metavar="PATH",
+        help="Markdown files, or directories that contain Markdown files",
+    )
+    p_prewarm.add_argument(
+        "--cache-dir",
+        required=True,
+        help="The directory for the persistent index",
+    )
+    add_cache_backend_argument(p_prewarm)
+    add_loading_arguments(p_prewarm)
+    add_source_root_argument(p_prewarm)
+    p_prewarm.set_defaults(func=run_prewarm)
+
+    p_expand = commands.add_parser(
+        "expand",
+        help="Expand the IncludePy blocks in Markdown files",
+        description=(
+            "Expand the IncludePy blocks in a Markdown file, or in every"
+            " Markdown file in a directory. If no input is given, read from"
+            " standard input."
+        ),
+    )
+    p_expand.add_argument(
+        "input",
+        nargs="?",
+        default="-",
+        metavar="INPUT",
+        help="A Markdown file, or a directory that contains Markdown files",
+    )
+    p_expand.add_argument(
+        "-o",
+        "--output",
+        metavar="OUTPUT",
+        help="The output file or directory (default: standard output)",
+    )
+    p_expand.add_argument(
+        "--cache-dir",
+        default="",
+        help="The directory for the persistent index",
+    )
+    add_cache_backend_argument(p_expand)
+    p_expand.add_argument(
+        "--workers",
+        type=int,
+        default=0,
+        help="The number of processes (default: one per CPU)",
+    )
+    p_expand.add_argument(
+        "--scan-threshold",
+        type=int,
+        default=2**20,
+        help="Locate objects in Python files larger than this by scanning",
+    )
+    add_source_root_argument(p_expand)
+    p_expand.set_defaults(func=run_expand)
+
+    p_check = commands.add_parser(
+        "check",
+        help="Check the IncludePy blocks in Markdown files",
+        description=(
+            "Check every IncludePy block in the Markdown files, in parallel,"
+            " and report every problem without rendering any HTML."
+        ),
+    )
+    p_check.add_argument(
+        "paths",
+        nargs="+",
+        metavar="PATH",
+        help="Markdown files, or directories that contain Markdown files",
+    )
+    p_check.add_argument(
+        "--cache-dir",
+        default="",
+        help="The directory for the persistent index",
+    )
+    add_cache_backend_argument(p_check)
+    p_check.add_argument(
+        "--workers",
+        type=int,
+        default=0,
+        help="The number of processes (default: one per CPU)",
+    )
+    p_check.add_argument(
+        "--scan-threshold",
+        type=int,
+        default=2**20,
+        help="Locate objects in Python files larger than this by scanning",
+    )
+    add_source_root_argument(p_check)
+    p_check.set_defaults(func=run_check)
+
+    p_cache = commands.add_parser(
+        "cache",
+        help="Export or import the persistent index",
+        description=(
+            "Export the parsed Python files and rendered blocks in the"
+            " persistent index to an archive, or import them from an archive"
+            " (e.g., to share the index between CI runners)."
+        ),
+    )
+    cache_commands = p_cache.add_subparsers(
+        dest="cache_command", required=True
+    )
+    for name, func, help_text in [
+        ("export", run_cache_export, "Write the index to an archive"),
+        ("import", run_cache_import, "Add the entries in an archive"),
+    ]:
+        p_cache_cmd = cache_commands.add_parser(
+            name, help=help_text, description=f"{help_text}."
+        )
+        p_cache_cmd.add_argument(
+            "archive", metavar="ARCHIVE", help="The archive file (.tar.gz)"
+        )
+        p_cache_cmd.add_argument(
+            "--cache-dir",
+            required=True,
+            help="The directory for the persistent index",
+        )
+        add_cache_backend_argument(p_cache_cmd)
+        p_cache_cmd.set_defaults(func=func)
+
+    return p
+
+
+def add_loading_arguments(p: argparse.ArgumentParser) -> None:
+    """
+    Add arguments that control how Python files are loaded.
+    """
+    p.add_argument(
+        "--executor",
+        choices=["thread", "process", "none"],
+        default="process",
+        help="Load Python files in parallel with threads or processes",
+    )
+    p.add_argument(
+        "--workers",
+        type=int,
+        default=0,
+        help="The number of threads or processes (default: one per CPU)",
+    )
+    p.add_argument(
+        "--scan-threshold",
+        type=int,
+        default=None,
+        help="Locate objects in Python files larger than this by scanning",
+    )
+
+
+def add_cache_backend_argument(p: argparse.ArgumentParser) -> None:
+    """
+    Add an argument for the storage backend of the persistent index.
+    """
+    p.add_argument(
+        "--cache-backend",
+        choices=sorted(INDEX_BACKENDS),
+        default="files",
+        help="How to store the persistent index (default: files)",
+    )
+
+
+def add_source_root_argument(p: argparse.ArgumentParser) -> None:
+    """
+    Add an argument for the source roots of ``pymodule`` blocks.
+    """
+    p.add_argument(
+        "--source-root",
+        action="append",
+        default=[],
+        dest="source_roots",
+        metavar="DIR",
+        help="Resolve pymodule blocks against this directory (repeatable)",
+    )
+
+
+def run_prewarm(args: argparse.Namespace) -> int:
+    """
+    Parse the Python files included by Markdown files.
+    """
+    MODULE_CACHE.configure(
+        cache_dir=args.cache_dir,
+        scan_threshold=args.scan_threshold,
+        cache_backend=args.cache_backend,
+    )
+    result = prewarm.prewarm(
+        args.paths,
+        executor=args.executor,
+        workers=args.workers,
+        source_roots=args.source_roots,
+    )
+    print(
+        f"Warmed {result.python_files} Python files and {result.objects}"
+        f" objects from {result.markdown_files} Markdown files"
+        f" in {result.elapsed:.2f}s"
+    )
+    if result.errors:
+        print(f"Could not load {result.errors} Python files or objects")
+    return 0
+
+
+def run_expand(args: argparse.Namespace) -> int:
+    """
+    Expand the IncludePy blocks in Markdown files.
+    """
+    config = pool.default_config(
+        cache_dir=args.cache_dir,
+        cache_backend=args.cache_backend,
+        scan_threshold=args.scan_threshold,
+        source_roots=args.source_roots,
+    )
+    input_path = Path(args.input)
+    if args.input != "-" and input_path.is_dir():
+        if args.output is None:
+            print("An output directory is required", file=sys.stderr)
+            return 2
+        result = expand.expand_tree(
+            input_path, Path(args.output), config, args.workers
+        )
+        for md_file, error in result.failed:
+            print(f"{md_file}: {error}", file=sys.stderr)
+        print(
+            f"Expanded {len(result.expanded)} files, skipped"
+            f" {len(result.skipped)} up-to-date files, and failed to expand"
+            f" {len(result.failed)} files",
+            file=sys.stderr,
+        )
+        return 1 if result.failed else 0
+
+    pool.configure(config)
+    try:
+        if args.output is None:
+            # NOTE: write each line to standard output as soon as it is
+            # available.
+            if args.input == "-":
+                expand.expand_stream(sys.stdin, sys.stdout)
+            else:
+                with open(input_path, encoding="utf-8") as f:
+                    expand.expand_stream(f, sys.stdout)
+        elif args.input == "-":
+            expanded = expand.expand_text(sys.stdin.read())
+            atomic.atomic_write(Path(args.output), expanded)
+        else:
+            expand.expand_file(input_path, Path(args.output))
+    except (OSError, SyntaxError, IncludePyError) as e:
+        print(f"{args.input}: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+def run_check(args: argparse.Namespace) -> int:
+    """
+    Check the IncludePy blocks in Markdown files.
+    """
+    config = pool.default_config(
+        cache_dir=args.cache_dir,
+        cache_backend=args.cache_backend,
+        scan_threshold=args.scan_threshold,
+        source_roots=args.source_roots,
+    )
+    result = check.check_tree(args.paths, config, args.workers)
+    for problem in result.problems:
+        print(f"{problem.path}:{problem.line}: {problem.message}")
+    print(
+        f"Checked {result.directives} blocks in {result.files} files, and"
+        f" found {len(result.problems)} problems",
+        file=sys.stderr,
+    )
+    return 1 if result.problems else 0
+
+
+def run_cache_export(args: argparse.Namespace) -> int:
+    """
+    Write the persistent index to an archive.
+    """
+    try:
+        index = INDEX_BACKENDS[args.cache_backend](args.cache_dir)
+        n_entries = index.export_archive(args.archive)
+    except OSError as e:
+        print(f"{args.archive}: {e}", file=sys.stderr)
+        return 1
+    print(f"Exported {n_entries} entries to {args.archive}")
+    return 0
+
+
+def run_cache_import(args: argparse.Namespace) -> int:
+    """
+    Add the entries in an archive to the persistent index.
+    """
+    try:
+        index = INDEX_BACKENDS[args.cache_backend](args.cache_dir)
+        n_entries = index.import_archive(args.archive)
+    except (OSError, tarfile.TarError) as e:
+        print(f"{args.archive}: {e}", file=sys.stderr)
+        return 1
+    print(f"Imported {n_entries} entries from {args.archive}")
+    return 0
+
+
+def main(args: Sequence[str] | None = None) -> int:
+    """
+    Run a command-line tool.
+
+    Parameters
+    ----------
+    args : Sequence[str] | None
+        The command-line arguments (default: ``sys.argv[1:]``).
+
+    Returns
+    -------
+    int
+        The exit status.
+    """
+    parsed = parser().parse_args(args)
+    status: int = parsed.func(parsed)
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,60 @@
+"""
+Write files atomically, so that readers (e.g., concurrent builds) never
+observe a partially-written file.
+
+Each file is written to a temporary file in the same directory, which then
+replaces the destination with :func:`os.replace`.
+If writing fails, the temporary file is removed and the destination is left
+unchanged.
+"""
+
+import os
+import tempfile
+
+from collections.abc import Iterator
+from contextlib import contextmanager, suppress
+from pathlib import Path
+from typing import BinaryIO
+
+
+@contextmanager
+def atomic_file(path: Path | str) -> Iterator[BinaryIO]:
+    """
+    Open a temporary file for writing in binary mode, which replaces
+    ``path`` if the context exits without an exception.
+
+    Parameters
+    ----------
+    path : Path | str
+        The destination; its parent directory is created if required.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(
+        dir=path.parent, prefix=f".{path.name}.", suffix=".tmp"
+    )
+    try:
+        with os.fdopen(fd, "wb") as f:
+            yield f
+        os.replace(tmp_name, path)
+    except BaseException:
+        with suppress(OSError):
+            os.unlink(tmp_name)
+        raise
+
+
+def atomic_write(path: Path | str, data: bytes | str) -> None:
+    """
+    Write the contents of a file atomically.
+
+    Parameters
+    ----------
+    path : Path | str
+        The destination; its parent directory is created if required.
+    data : bytes | str
+        The contents; text is encoded as UTF-8, without translating newlines.
+    """
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    with atomic_file(path) as f:
+        f.write(data)
@@ -0,0 +1,231 @@
+"""
+Check the IncludePy blocks in Markdown files without rendering them, so that
+broken blocks can be found (e.g., before merging a change) without building
+the entire site.
+
+Every block is parsed and its options are validated, and the code for each
+block is located and extracted, but no HTML is produced.
+Rather than stopping at the first invalid block, every problem is reported
+with the Markdown file and line on which it occurs.
+"""
+
+import re
+
+from pathlib import Path
+from typing import Any, NamedTuple
+
+from . import (
+    BLOCK_OPTIONS,
+    RE_OPTION,
+    Directive,
+    EchoLines,
+    IncludePyError,
+    ParseBlock,
+    ProcessorState,
+    Renderer,
+    default_options,
+    parse_count,
+)
+from .pool import processor, worker_count, worker_pool
+from .prewarm import markdown_files
+
+# The exceptions that indicate an invalid block.
+CHECK_ERRORS = (OSError, SyntaxError, ValueError, IncludePyError)
+
+
+class Problem(NamedTuple):
+    """
+    An invalid IncludePy block.
+    """
+
+    path: Path
+    """The Markdown file."""
+    line: int
+    """The line number (starting from 1) of the block or option."""
+    message: str
+    """A description of the problem."""
+
+
+class CheckResult(NamedTuple):
+    """
+    A summary of the Markdown files that were checked by :func:`check_tree`.
+    """
+
+    files: int
+    """The number of Markdown files that were checked."""
+    directives: int
+    """The number of IncludePy blocks that were checked."""
+    problems: list[Problem]
+    """The problems that were found, ordered by file and line."""
+
+
+class CheckingRenderer(Renderer):
+    """
+    A renderer that records the blocks that cannot be rendered, rather than
+    raising an exception, and does not produce any output.
+    """
+
+    def __init__(self, renderer: Renderer):
+        super().__init__(renderer.cache, renderer.snippets)
+        self.module_index = renderer.module_index
+        # NOTE: the line on which the current block begins.
+        self.block_line = 0
+        self.directives = 0
+        self.problems: list[tuple[int, str]] = []
+
+    def emit(self, directive: Directive, output_lines: list[str]) -> None:
+        self.directives += 1
+        try:
+            self.render(directive)
+        except CHECK_ERRORS as e:
+            self.problems.append((self.block_line, describe(e)))
+
+
+class InvalidBlock(ParseBlock):
+    """
+    A block that could not be started (e.g., because its module cannot be
+    found), whose options are checked but which cannot be rendered.
+    """
+
+    def __init__(self, re_match: re.Match[str], renderer: CheckingRenderer):
+        # NOTE: do not resolve the Python file, which raised an exception.
+        self.indent_str = re_match.group(1)
+        self.renderer = renderer
+        self.python_file = Path()
+        self.defaults = default_options()
+        self.options = {}
+
+    def add_code_lines(self, output_lines: list[str]) -> None:
+        assert isinstance(self.renderer, CheckingRenderer)
+        self.renderer.directives += 1
+        options = self.defaults | self.options
+        for name in ("lines_before", "lines_after", "extra_indent"):
+            try:
+                parse_count(options, name)
+            except IncludePyError as e:
+                self.renderer.problems.append(
+                    (self.renderer.block_line, describe(e))
+                )
+
+
+def describe(error: Exception) -> str:
+    """
+    Return a description of the problem that raised an exception.
+    """
+    return f"{type(error).__name__}: {error}"
+
+
+def check_lines(lines: list[str]) -> tuple[int, list[tuple[int, str]]]:
+    """
+    Check the IncludePy blocks in a Markdown document.
+
+    Parameters
+    ----------
+    lines : list[str]
+        The lines of the Markdown document.
+
+    Returns
+    -------
+    tuple[int, list[tuple[int, str]]]
+        The number of blocks, and the line number and description of each
+        problem.
+    """
+    renderer = CheckingRenderer(processor().renderer())
+    state: ProcessorState = EchoLines(renderer)
+    skipping = False
+    for line_no, line in enumerate([*lines, None], start=1):
+        if skipping and line is not None:
+            # NOTE: ignore the remaining options of an invalid block.
+            re_match = RE_OPTION.match(line)
+            if (
+                re_match
+                and not re_match.group(2)
+                and re_match.group(3) not in BLOCK_OPTIONS
+            ):
+                continue
+        skipping = False
+        try:
+            next_state = state.read_line(line, [])
+        except IncludePyError as e:
+            renderer.problems.append((line_no, describe(e)))
+            re_match = None if line is None else RE_OPTION.match(line)
+            if re_match is None or re_match.group(2):
+                state = EchoLines(renderer)
+            elif re_match.group(3) in BLOCK_OPTIONS:
+                # NOTE: count the block and check its options, even though
+                # it cannot be rendered.
+                state = InvalidBlock(re_match, renderer)
+                renderer.block_line = line_no
+            elif not isinstance(state, ParseBlock):
+                # NOTE: ignore the remaining options of an invalid block.
+                state = EchoLines(renderer)
+                skipping = True
+            # NOTE: otherwise, ignore this option and check the rest of the
+            # block.
+            continue
+        if isinstance(next_state, ParseBlock) and next_state is not state:
+            renderer.block_line = line_no
+        state = next_state
+    return renderer.directives, sorted(renderer.problems)
+
+
+def check_file(md_file: Path) -> tuple[int, list[tuple[int, str]]]:
+    """
+    Check the IncludePy blocks in a Markdown file, and return the number of
+    blocks and the line number and description of each problem.
+    """
+    try:
+        text = md_file.read_text(encoding="utf-8")
+    except (OSError, ValueError) as e:
+        return 0, [(0, describe(e))]
+    return check_lines(text.split("\n"))
+
+
+def check_tree(
+    paths: list[Path | str],
+    config: dict[str, Any] | None = None,
+    workers: int = 0,
+) -> CheckResult:
+    """
+    Check every IncludePy block in a collection of Markdown files, in
+    parallel (see :func:`includepy.pool.worker_pool`).
+    Each worker checks whole Markdown files, which are sent to the workers
+    in batches.
+
+    Parameters
+    ----------
+    paths : list[Path | str]
+        The Markdown files, and directories that contain Markdown files.
+    config : dict[str, Any] | None
+        The extension settings (default: the default settings).
+    workers : int
+        The number of worker processes; if this is zero, one per CPU is used,
+        and if this is one, the files are checked in this process.
+
+    Returns
+    -------
+    CheckResult
+        The number of files and blocks, and every problem that was found.
+    """
+    workers = worker_count(workers)
+    md_files = markdown_files(paths)
+
+    with worker_pool(config, workers if len(md_files) > 1 else 1) as executor:
+        if executor is None:
+            outcomes = [check_file(md_file) for md_file in md_files]
+        else:
+            chunksize = max(1, len(md_files) // (4 * workers))
+            outcomes = list(
+                executor.map(check_file, md_files, chunksize=chunksize)
+            )
+
+    directives = 0
+    problems: list[Problem] = []
+    for md_file, (n_directives, file_problems) in zip(
+        md_files, outcomes, strict=True
+    ):
+        directives += n_directives
+        problems.extend(
+            Problem(md_file, line, message) for line, message in file_problems
+        )
+    return CheckResult(len(md_files), directives, problems)
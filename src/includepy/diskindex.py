@@ -0,0 +1,334 @@
+"""
+A persistent index of Python source files, which allows parsed symbol tables
+to be reused across builds.
+
+The index contains three kinds of entries:
+
+- ``modules/<digest>.json`` records the symbol table and line offsets for a
+  source file with a specific content hash;
+- ``snippets/<key>.json`` records the rendered lines for an IncludePy block,
+  keyed by the content hash of the source file and the block options; and
+- ``paths/<key>.json`` records the size, modification time, and content hash
+  of a source file at a specific path, so that unchanged files can be matched
+  to their module entry without being read.
+
+Module and snippet entries only depend on the contents of each source file,
+so they can be exported to a single archive and imported into the index on
+another machine (e.g., a fresh CI runner), where the modification times of
+source files are different.
+Path entries are never exported.
+
+Entries are stored in a directory for each index format version and Python
+version, because the locations recorded in a syntax tree can differ between
+Python versions.
+Every entry is written to a temporary file and then atomically renamed, so
+that concurrent builds never observe partially-written entries, and any entry
+that cannot be read is ignored.
+"""
+
+import hashlib
+import io
+import json
+import re
+import sys
+import tarfile
+
+from pathlib import Path
+from typing import Any
+
+from .atomic import atomic_file, atomic_write
+
+# The version of the index format, which must be incremented whenever the
+# contents of an entry change.
+FORMAT_VERSION = 1
+
+# The Python version for which symbol tables are recorded.
+PYTHON_VERSION = "{}.{}".format(*sys.version_info[:2])
+
+# The names of the entries that are exported to, and imported from, archives.
+RE_ARCHIVE_ENTRY = re.compile(
+    r"v[0-9]+/py[0-9]+\.[0-9]+/(modules|snippets)/[0-9a-f]{32}\.json"
+)
+
+
+def content_digest(data: bytes) -> str:
+    """
+    Return the content hash for the contents of a source file.
+    """
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+class DiskIndex:
+    """
+    A persistent index of parsed Python source files.
+
+    Parameters
+    ----------
+    cache_dir : Path | str
+        The directory in which to store the index.
+    """
+
+    def __init__(self, cache_dir: Path | str):
+        self.cache_dir = Path(cache_dir)
+        self.prefix = f"v{FORMAT_VERSION}/py{PYTHON_VERSION}"
+        self.root = self.cache_dir / self.prefix
+
+    def load_path(self, path: Path) -> dict[str, Any] | None:
+        """
+        Return the recorded size, modification time, and content hash for a
+        source file, or ``None`` if there is no valid entry.
+        """
+        entry = self._read(self._path_entry(path))
+        if entry is None or entry.get("path") != str(path):
+            return None
+        if not all(
+            isinstance(entry.get(key), int) for key in ("size", "mtime_ns")
+        ):
+            return None
+        if not isinstance(entry.get("digest"), str):
+            return None
+        return entry
+
+    def load_module(self, digest: str) -> dict[str, Any] | None:
+        """
+        Return the recorded symbol table and line offsets for a source file
+        with the given content hash, or ``None`` if there is no valid entry.
+        """
+        entry = self._read(self._module_entry(digest))
+        if entry is None or entry.get("digest") != digest:
+            return None
+        if not isinstance(entry.get("symbols"), dict):
+            return None
+        if not isinstance(entry.get("offsets"), list):
+            return None
+        if not isinstance(entry.get("encoding"), str):
+            return None
+        return entry
+
+    def store_module(self, module: dict[str, Any]) -> None:
+        """
+        Record the symbol table and line offsets for a source file.
+
+        Parameters
+        ----------
+        module : dict[str, Any]
+            The module entry, which must contain the content hash
+            (``"digest"``), the source encoding (``"encoding"``), the symbol
+            table (``"symbols"``), and the line offsets (``"offsets"``).
+        """
+        self._write(self._module_entry(module["digest"]), module)
+
+    def store_path(
+        self, path: Path, size: int, mtime_ns: int, digest: str
+    ) -> None:
+        """
+        Record the size, modification time, and content hash for a source
+        file.
+        """
+        path_entry = {
+            "path": str(path),
+            "size": size,
+            "mtime_ns": mtime_ns,
+            "digest": digest,
+        }
+        self._write(self._path_entry(path), path_entry)
+
+    def load_snippet(self, key: tuple[Any, ...]) -> list[str] | None:
+        """
+        Return the recorded lines for an IncludePy block, or ``None`` if
+        there is no valid entry.
+
+        Parameters
+        ----------
+        key : tuple[Any, ...]
+            The content hash of the source file, followed by the block
+            options; every value must be serialisable as JSON.
+        """
+        entry = self._read(self._snippet_entry(key))
+        if entry is None or entry.get("key") != json.loads(json.dumps(key)):
+            return None
+        lines = entry.get("lines")
+        if not isinstance(lines, list):
+            return None
+        if not all(isinstance(line, str) for line in lines):
+            return None
+        return lines
+
+    def store_snippet(self, key: tuple[Any, ...], lines: list[str]) -> None:
+        """
+        Record the lines for an IncludePy block.
+        """
+        self._write(self._snippet_entry(key), {"key": key, "lines": lines})
+
+    def export_archive(self, archive: Path | str) -> int:
+        """
+        Write every module and snippet entry to a compressed archive.
+
+        Parameters
+        ----------
+        archive : Path | str
+            The path of the archive, which is written atomically.
+
+        Returns
+        -------
+        int
+            The number of entries in the archive.
+        """
+        archive = Path(archive)
+        names = sorted(
+            name
+            for name in self._entry_names()
+            if RE_ARCHIVE_ENTRY.fullmatch(name)
+        )
+        n_entries = 0
+        # NOTE: the archive is streamed to the temporary file, rather than
+        # being held in memory.
+        with (
+            atomic_file(archive) as f,
+            tarfile.open(fileobj=f, mode="w:gz") as tar,
+        ):
+            for name in names:
+                data = self._read_bytes(name)
+                if data is None:
+                    continue
+                info = tarfile.TarInfo(name)
+                info.size = len(data)
+                tar.addfile(info, io.BytesIO(data))
+                n_entries += 1
+        return n_entries
+
+    def import_archive(self, archive: Path | str) -> int:
+        """
+        Add the module and snippet entries in an archive to this index.
+
+        Entries that already exist are not replaced, and archive members
+        that are not module or snippet entries are ignored.
+
+        Parameters
+        ----------
+        archive : Path | str
+            The path of an archive created by :meth:`export_archive`.
+
+        Returns
+        -------
+        int
+            The number of entries that were added.
+
+        Raises
+        ------
+        OSError
+            If the archive cannot be read.
+        tarfile.TarError
+            If the archive is invalid.
+        """
+        added = 0
+        with tarfile.open(archive, mode="r:gz") as tar:
+            for member in tar:
+                if not member.isfile():
+                    continue
+                if not RE_ARCHIVE_ENTRY.fullmatch(member.name):
+                    continue
+                f = tar.extractfile(member)
+                if f is None:  # pragma: no cover
+                    continue
+                if self._write_bytes(member.name, f.read(), replace=False):
+                    added += 1
+        return added
+
+    def claim(self, digest: str) -> bool:
+        """
+        Claim the right to parse a source file with the given content hash,
+        so that concurrent builds do not parse the same file.
+
+        This index does not coordinate concurrent builds, so every claim
+        succeeds.
+
+        Returns
+        -------
+        bool
+            ``True`` if the caller should parse the source file and record it
+            with :meth:`store_module`, or ``False`` if another process is
+            parsing it and the caller should call :meth:`wait_module`.
+        """
+        return True
+
+    def release(self, digest: str) -> None:
+        """
+        Release a claim made by :meth:`claim`.
+        """
+
+    def wait_module(self, digest: str) -> dict[str, Any] | None:
+        """
+        Wait for another process to record a source file that it has
+        claimed, and return its entry (or ``None`` if it was not recorded).
+        """
+        return self.load_module(digest)
+
+    def _path_entry(self, path: Path) -> str:
+        key = hashlib.blake2b(str(path).encode(), digest_size=16).hexdigest()
+        return f"{self.prefix}/paths/{key}.json"
+
+    def _module_entry(self, digest: str) -> str:
+        return f"{self.prefix}/modules/{digest}.json"
+
+    def _snippet_entry(self, key: tuple[Any, ...]) -> str:
+        text = json.dumps(key, separators=(",", ":"))
+        digest = hashlib.blake2b(text.encode(), digest_size=16).hexdigest()
+        return f"{self.prefix}/snippets/{digest}.json"
+
+    def _read(self, name: str) -> dict[str, Any] | None:
+        data = self._read_bytes(name)
+        if data is None:
+            return None
+        try:
+            contents = json.loads(data)
+        except ValueError:
+            # NOTE: treat corrupt entries as cache misses.
+            return None
+        if not isinstance(contents, dict):
+            return None
+        if contents.get("format") != FORMAT_VERSION:
+            return None
+        if contents.get("python") != PYTHON_VERSION:
+            return None
+        return contents
+
+    def _write(self, name: str, contents: dict[str, Any]) -> None:
+        contents = {
+            "format": FORMAT_VERSION,
+            "python": PYTHON_VERSION,
+        } | contents
+        data = json.dumps(contents, separators=(",", ":")).encode()
+        self._write_bytes(name, data)
+
+    # NOTE: the following methods define how entries are stored, and are
+    # overridden by other storage backends. Each entry is identified by its
+    # path relative to the cache directory.
+
+    def _entry_names(self) -> list[str]:
+        return [
+            entry.relative_to(self.cache_dir).as_posix()
+            for entry in self.cache_dir.glob("v*/py*/*/*.json")
+        ]
+
+    def _read_bytes(self, name: str) -> bytes | None:
+        try:
+            with open(self.cache_dir / name, "rb") as f:
+                return f.read()
+        except OSError:
+            # NOTE: treat missing entries as cache misses.
+            return None
+
+    def _write_bytes(
+        self, name: str, data: bytes, replace: bool = True
+    ) -> bool:
+        entry = self.cache_dir / name
+        if not replace and entry.exists():
+            return False
+        try:
+            atomic_write(entry, data)
+        except OSError:
+            # NOTE: the index is only a cache, so failing to write an entry
+            # is not an error.
+            return False
+        return True
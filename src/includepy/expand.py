@@ -0,0 +1,205 @@
+"""
+Expand the IncludePy blocks in Markdown files without rendering them, for
+pipelines that only need the expanded Markdown (e.g., Pandoc).
+
+The output for each Markdown file is identical to the output of
+:meth:`includepy.IncludePyProc.run`, joined by newlines.
+Outputs are written to a temporary file and then atomically renamed, and
+outputs that are newer than their input file and every Python file that they
+include are not rewritten.
+"""
+
+import os
+
+from collections.abc import Iterable, Iterator
+from pathlib import Path
+from typing import IO, Any, NamedTuple
+
+from . import collect_directives
+from .atomic import atomic_write
+from .pool import processor, worker_pool
+from .prewarm import markdown_files
+
+
+def expand_text(text: str) -> str:
+    """
+    Return a Markdown document with the code for each IncludePy block.
+
+    Parameters
+    ----------
+    text : str
+        The Markdown document.
+    """
+    return "\n".join(processor().run(text.split("\n")))
+
+
+def read_lines(input_file: Iterable[str]) -> Iterator[str]:
+    """
+    Yield the lines of a text file without their line endings, so that the
+    lines are identical to ``text.split("\\n")``.
+    """
+    line = ""
+    for line in input_file:
+        yield line.removesuffix("\n")
+    # NOTE: a final newline (or an empty file) is followed by an empty line.
+    if not line or line.endswith("\n"):
+        yield ""
+
+
+def expand_stream(input_file: Iterable[str], output_file: IO[str]) -> None:
+    """
+    Expand a Markdown document one line at a time, and write each processed
+    line as soon as it is available, so that only the current IncludePy
+    block is held in memory.
+
+    The output is identical to :func:`expand_text`.
+
+    Parameters
+    ----------
+    input_file : Iterable[str]
+        The input Markdown document (e.g., :data:`sys.stdin`).
+    output_file : IO[str]
+        The output stream (e.g., :data:`sys.stdout`).
+    """
+    lines = processor().iter_process(read_lines(input_file))
+    for ix, line in enumerate(lines):
+        if ix > 0:
+            output_file.write("\n")
+        output_file.write(line)
+
+
+def is_up_to_date(input_file: Path, output_file: Path, text: str) -> bool:
+    """
+    Return whether an output file is newer than its input file and every
+    Python file that the input file includes.
+
+    Parameters
+    ----------
+    input_file : Path
+        The input Markdown file.
+    output_file : Path
+        The output Markdown file.
+    text : str
+        The contents of the input Markdown file.
+    """
+    try:
+        output_mtime = output_file.stat().st_mtime_ns
+        sources = {input_file}
+        directives = collect_directives(
+            text.split("\n"), processor().module_index
+        )
+        # NOTE: files read from git revisions do not have modification times.
+        sources.update(d.python_file for d in directives if d.ref is None)
+        return all(
+            os.stat(source).st_mtime_ns <= output_mtime for source in sources
+        )
+    except OSError:
+        return False
+
+
+def expand_file(input_file: Path, output_file: Path) -> bool:
+    """
+    Expand a Markdown file, unless the output file is up to date.
+
+    Parameters
+    ----------
+    input_file : Path
+        The input Markdown file.
+    output_file : Path
+        The output Markdown file.
+
+    Returns
+    -------
+    bool
+        ``True`` if the output file was written, or ``False`` if it was up to
+        date.
+    """
+    text = input_file.read_text(encoding="utf-8")
+    if is_up_to_date(input_file, output_file, text):
+        return False
+    atomic_write(output_file, expand_text(text))
+    return True
+
+
+def expand_job(input_file: Path, output_file: Path) -> bool | str:
+    """
+    Expand a Markdown file in a worker process, and return the error message
+    (if any) rather than raising an exception.
+    """
+    try:
+        return expand_file(input_file, output_file)
+    except Exception as e:
+        return f"{type(e).__name__}: {e}"
+
+
+class ExpandResult(NamedTuple):
+    """
+    A summary of the Markdown files that were expanded by :func:`expand_tree`.
+    """
+
+    expanded: list[Path]
+    """The Markdown files that were expanded."""
+    skipped: list[Path]
+    """The Markdown files whose outputs were up to date."""
+    failed: list[tuple[Path, str]]
+    """The Markdown files that could not be expanded, and the errors."""
+
+
+def expand_tree(
+    input_dir: Path,
+    output_dir: Path,
+    config: dict[str, Any] | None = None,
+    workers: int = 0,
+) -> ExpandResult:
+    """
+    Expand every Markdown file in a directory, in parallel (see
+    :func:`includepy.pool.worker_pool`).
+
+    Parameters
+    ----------
+    input_dir : Path
+        The directory that contains the input Markdown files.
+    output_dir : Path
+        The directory in which to write the output Markdown files, with the
+        same relative paths as the input files.
+    config : dict[str, Any] | None
+        The extension settings (default: the default settings).
+    workers : int
+        The number of worker processes; if this is zero, one per CPU is used,
+        and if this is one, the files are expanded in this process.
+
+    Returns
+    -------
+    ExpandResult
+        The files that were expanded, skipped, or failed.
+    """
+    jobs = [
+        (md_file, output_dir / md_file.relative_to(input_dir))
+        for md_file in markdown_files([input_dir])
+    ]
+
+    result = ExpandResult([], [], [])
+    with worker_pool(config, workers if len(jobs) > 1 else 1) as executor:
+        if executor is None:
+            record(result, jobs, (expand_job(*job) for job in jobs))
+        else:
+            inputs, outputs = zip(*jobs, strict=True)
+            record(result, jobs, executor.map(expand_job, inputs, outputs))
+    return result
+
+
+def record(
+    result: ExpandResult,
+    jobs: list[tuple[Path, Path]],
+    outcomes: Iterable[bool | str],
+) -> None:
+    """
+    Record the outcome of each job.
+    """
+    for (input_file, _), outcome in zip(jobs, outcomes, strict=True):
+        if isinstance(outcome, str):
+            result.failed.append((input_file, outcome))
+        elif outcome:
+            result.expanded.append(input_file)
+        else:
+            result.skipped.append(input_file)
@@ -0,0 +1,197 @@
+"""
+Read Python source files from the revisions of a local git repository,
+without checking out these revisions.
+
+Each repository is read by a single long-lived ``git cat-file --batch``
+process, rather than by starting a new process for each file.
+The blob that a revision contains for a path is resolved once per process,
+so revisions should be tags or commits rather than branches that may move
+during a build.
+"""
+
+import atexit
+import subprocess
+import threading
+
+from pathlib import Path
+
+
+class GitError(OSError):
+    """
+    Raised when a file cannot be read from a git repository.
+    """
+
+
+class GitReader:
+    """
+    Read blobs from a git repository with a ``git cat-file --batch`` process.
+
+    Parameters
+    ----------
+    repo : Path
+        The top-level directory of the repository.
+    """
+
+    def __init__(self, repo: Path):
+        self.repo = repo
+        # NOTE: the blob for each object name (e.g., "v2.3:src/module.py").
+        self.blobs: dict[str, str] = {}
+        # NOTE: the most recent blob that was read, which is usually the
+        # next blob that is requested.
+        self._last: tuple[str, bytes] | None = None
+        self._process: subprocess.Popen[bytes] | None = None
+        self._lock = threading.Lock()
+
+    def lookup(self, ref: str, path: str) -> str:
+        """
+        Return the blob hash for a file in a revision.
+
+        Parameters
+        ----------
+        ref : str
+            The revision (e.g., a tag or a commit hash).
+        path : str
+            The path of the file, relative to the top-level directory.
+
+        Raises
+        ------
+        GitError
+            If the revision does not contain this file.
+        """
+        name = f"{ref}:{path}"
+        with self._lock:
+            sha = self.blobs.get(name)
+            if sha is None:
+                sha, data = self._request(name)
+                self.blobs[name] = sha
+                self._last = (sha, data)
+            return sha
+
+    def read(self, sha: str) -> bytes:
+        """
+        Return the contents of a blob.
+
+        Raises
+        ------
+        GitError
+            If the repository does not contain this blob.
+        """
+        with self._lock:
+            if self._last is not None and self._last[0] == sha:
+                return self._last[1]
+            _, data = self._request(sha)
+            return data
+
+    def close(self) -> None:
+        """
+        Stop the ``git cat-file`` process.
+        """
+        with self._lock:
+            self._stop()
+
+    def _request(self, name: str) -> tuple[str, bytes]:
+        # NOTE: the caller must hold the lock.
+        if self._process is None:
+            try:
+                self._process = subprocess.Popen(
+                    ["git", "cat-file", "--batch"],
+                    cwd=self.repo,
+                    stdin=subprocess.PIPE,
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.DEVNULL,
+                )
+            except OSError as e:
+                raise GitError(f"Could not run git: {e}") from None
+        process = self._process
+        assert process.stdin is not None
+        assert process.stdout is not None
+        try:
+            process.stdin.write(name.encode() + b"\n")
+            process.stdin.flush()
+            header = process.stdout.readline().rstrip(b"\n")
+            missing = header.endswith((b" missing", b" ambiguous"))
+            if not missing:
+                sha, obj_type, size = header.split()
+                data = process.stdout.read(int(size) + 1)[:-1]
+                if len(data) != int(size):
+                    raise ValueError("Truncated object")
+        except (OSError, ValueError) as e:
+            # NOTE: start a new process for the next request.
+            self._stop()
+            raise GitError(f"Could not read {name}: {e}") from None
+        if missing:
+            raise GitError(f"{name} does not exist in {self.repo}")
+        if obj_type != b"blob":
+            raise GitError(f"{name} is not a file")
+        return sha.decode(), data
+
+    def _stop(self) -> None:
+        process = self._process
+        self._process = None
+        if process is not None:
+            if process.stdin is not None:
+                process.stdin.close()
+            process.wait()
+            if process.stdout is not None:
+                process.stdout.close()
+
+
+# The reader for each repository, and the repository that contains each
+# directory.
+_READERS: dict[Path, GitReader] = {}
+_REPOS: dict[Path, Path] = {}
+_READERS_LOCK = threading.Lock()
+
+
+def git_reader(path: Path | str) -> tuple[GitReader, str]:
+    """
+    Return the shared reader for the repository that contains a path, and
+    the path relative to the top-level directory of this repository.
+
+    The path does not need to exist in the working tree, but its parent
+    directory (or one of its ancestors) must.
+
+    Raises
+    ------
+    GitError
+        If the path is not inside a git repository.
+    """
+    path = Path(path).resolve()
+    directory = path.parent
+    while not directory.is_dir() and directory != directory.parent:
+        directory = directory.parent
+    with _READERS_LOCK:
+        repo = _REPOS.get(directory)
+        if repo is None:
+            try:
+                result = subprocess.run(
+                    ["git", "rev-parse", "--show-toplevel"],
+                    cwd=directory,
+                    capture_output=True,
+                    check=True,
+                )
+            except (OSError, subprocess.CalledProcessError):
+                raise GitError(f"{path} is not in a git repository") from None
+            repo = Path(result.stdout.decode().strip()).resolve()
+            _REPOS[directory] = repo
+        reader = _READERS.get(repo)
+        if reader is None:
+            reader = GitReader(repo)
+            _READERS[repo] = reader
+    try:
+        relpath = path.relative_to(repo)
+    except ValueError:
+        raise GitError(f"{path} is not in a git repository") from None
+    return reader, relpath.as_posix()
+
+
+def close_readers() -> None:
+    """
+    Stop every ``git cat-file`` process.
+    """
+    with _READERS_LOCK:
+        for reader in _READERS.values():
+            reader.close()
+
+
+atexit.register(close_readers)
@@ -0,0 +1,161 @@
+"""
+Resolve dotted module names to Python source files, without importing them.
+
+A :class:`ModuleIndex` scans a list of source roots once, and records the
+source file for every module and package that it finds, so that resolving a
+module name only requires a dictionary lookup.
+It also records the modification time of each directory that it scans, so
+that names that cannot be found only cause another scan when a directory has
+changed.
+As for :data:`sys.path`, modules in earlier source roots take precedence over
+modules in later source roots, and packages take precedence over modules with
+the same name.
+"""
+
+import os
+import threading
+
+from collections.abc import Iterable
+from pathlib import Path
+
+
+class ModuleIndex:
+    """
+    An index of the Python modules in a list of source roots.
+
+    Parameters
+    ----------
+    roots : Iterable[Path | str]
+        The directories that contain top-level modules and packages.
+    """
+
+    def __init__(self, roots: Iterable[Path | str]):
+        self.roots = [Path(root).resolve() for root in roots]
+        self.modules: dict[str, Path] = {}
+        self.scans = 0
+        self._mtimes: dict[Path, int | None] = {}
+        self._lock = threading.Lock()
+
+    def resolve(self, name: str) -> Path | None:
+        """
+        Return the source file for a module or package, or ``None`` if it
+        cannot be found.
+
+        The source roots are scanned when this is first called, and again
+        when a module cannot be found and a directory in the source roots has
+        changed since the previous scan (e.g., because the module was added).
+
+        Parameters
+        ----------
+        name : str
+            The dotted module name (e.g., ``"package.module"``).
+        """
+        with self._lock:
+            if self.scans == 0:
+                self._scan()
+            path = self.modules.get(name)
+            if path is None and valid_name(name) and self._changed():
+                self._scan()
+                path = self.modules.get(name)
+            return path
+
+    def refresh(self) -> None:
+        """
+        Scan the source roots again.
+        """
+        with self._lock:
+            self._scan()
+
+    def _scan(self) -> None:
+        # NOTE: the caller must hold the lock.
+        modules: dict[str, Path] = {}
+        mtimes: dict[Path, int | None] = {}
+        for root in self.roots:
+            for name, path in scan_root(root, mtimes).items():
+                modules.setdefault(name, path)
+        self.modules = modules
+        self._mtimes = mtimes
+        self.scans += 1
+
+    def _changed(self) -> bool:
+        # NOTE: adding, removing, or renaming a module or package changes the
+        # modification time of its parent directory.
+        return any(
+            dir_mtime(directory) != mtime
+            for directory, mtime in self._mtimes.items()
+        )
+
+
+def valid_name(name: str) -> bool:
+    """
+    Return whether a string is a valid dotted module name.
+    """
+    return all(part.isidentifier() for part in name.split("."))
+
+
+def dir_mtime(directory: Path) -> int | None:
+    """
+    Return the modification time of a directory (in nanoseconds), or
+    ``None`` if it does not exist.
+    """
+    try:
+        return os.stat(directory).st_mtime_ns
+    except OSError:
+        return None
+
+
+def scan_root(
+    root: Path, mtimes: dict[Path, int | None] | None = None
+) -> dict[str, Path]:
+    """
+    Return the source file for every module and package in a source root.
+
+    Directories whose names are not valid identifiers, and symbolic links to
+    directories, are not searched.
+    If ``mtimes`` is not ``None``, the modification time of each directory
+    that is searched is recorded in it.
+    """
+    modules: dict[str, Path] = {}
+    pending = [(root, "")]
+    while pending:
+        directory, prefix = pending.pop()
+        if mtimes is not None:
+            # NOTE: record the time before listing the directory, so that
+            # any change while it is listed causes another scan.
+            mtimes[directory] = dir_mtime(directory)
+        try:
+            entries = list(os.scandir(directory))
+        except OSError:
+            continue
+        for entry in entries:
+            name = entry.name
+            if entry.is_dir(follow_symlinks=False):
+                if name.isidentifier():
+                    pending.append((Path(entry.path), f"{prefix}{name}."))
+            elif name.endswith(".py"):
+                stem = name[:-3]
+                if stem == "__init__" and prefix:
+                    # NOTE: packages take precedence over modules.
+                    modules[prefix[:-1]] = Path(entry.path)
+                elif stem.isidentifier():
+                    modules.setdefault(prefix + stem, Path(entry.path))
+    return modules
+
+
+# The module index for each list of source roots, which are shared by every
+# IncludePy preprocessor in this process.
+_INDEXES: dict[tuple[Path, ...], ModuleIndex] = {}
+_INDEXES_LOCK = threading.Lock()
+
+
+def module_index(roots: Iterable[Path | str]) -> ModuleIndex:
+    """
+    Return the shared module index for a list of source roots.
+    """
+    key = tuple(Path(root).resolve() for root in roots)
+    with _INDEXES_LOCK:
+        index = _INDEXES.get(key)
+        if index is None:
+            index = ModuleIndex(key)
+            _INDEXES[key] = index
+        return index
@@ -0,0 +1,204 @@
+"""
+Cache the expanded Markdown for entire documents, so that documents whose
+included code has not changed are not processed again when a site is
+rebuilt (e.g., by ``mkdocs serve``).
+
+Each entry is keyed by the content hash of the document, and records the
+content hash of the rendered code for every IncludePy block in the document.
+Before an entry is used, each block is rendered again (which is usually a
+lookup in the :class:`~includepy.SnippetCache`) and its content hash is
+compared to the recorded hash, so that an entry is never used after the code
+that it includes has changed.
+"""
+
+import threading
+
+from collections import OrderedDict
+from typing import NamedTuple
+
+from . import (
+    Dependency,
+    IncludePyError,
+    IncludePyProc,
+    has_options,
+    snippet_digest,
+)
+from .diskindex import content_digest
+from .trace import TRACER
+
+# The exceptions that indicate that a block can no longer be rendered.
+RENDER_ERRORS = (OSError, SyntaxError, ValueError, IncludePyError)
+
+
+class PageEntry(NamedTuple):
+    """
+    The expanded Markdown for a document.
+    """
+
+    lines: list[str]
+    """The processed lines of text."""
+    dependencies: tuple[Dependency, ...]
+    """The IncludePy blocks in the document."""
+
+
+class PageCacheInfo(NamedTuple):
+    """
+    Summary statistics for a :class:`PageCache`.
+    """
+
+    hits: int
+    misses: int
+    entries: int
+    max_entries: int
+
+
+class PageCache:
+    """
+    A least-recently-used cache of expanded Markdown documents.
+
+    Parameters
+    ----------
+    max_entries : int
+        The maximum number of documents to retain.
+    """
+
+    def __init__(self, max_entries: int = 4096):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[tuple[str, ...], PageEntry] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def configure(self, max_entries: int | None = None) -> None:
+        """
+        Change the maximum number of documents to retain (if not ``None``),
+        evicting entries as required.
+        """
+        with self._lock:
+            if max_entries is not None:
+                self.max_entries = int(max_entries)
+            self._evict()
+
+    def run(self, proc: IncludePyProc, lines: list[str]) -> list[str]:
+        """
+        Return the processed lines for a document, using the cached lines if
+        the document and the code for each of its blocks are unchanged.
+
+        Parameters
+        ----------
+        proc : IncludePyProc
+            The preprocessor with which to process the document.
+            If the preprocessor has a dependency manifest and a document
+            name, the blocks in the document are recorded in the manifest,
+            even when the cached lines are used.
+        lines : list[str]
+            The lines of text.
+
+        Returns
+        -------
+        list[str]
+            The processed lines of text.
+        """
+        output = self.lookup(proc, lines)
+        if output is None:
+            output = self.process(proc, lines)
+        return output
+
+    def lookup(
+        self, proc: IncludePyProc, lines: list[str]
+    ) -> list[str] | None:
+        """
+        Return the cached lines for a document, or ``None`` if the document
+        is not cached or the code for any of its blocks has changed.
+        """
+        key = self._key(proc, lines)
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None or not self._valid(proc, entry):
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+            self.hits += 1
+        if proc.manifest is not None and proc.page is not None:
+            proc.manifest.record(proc.page, entry.dependencies)
+        return list(entry.lines)
+
+    def process(self, proc: IncludePyProc, lines: list[str]) -> list[str]:
+        """
+        Process a document and cache the processed lines.
+        """
+        renderer = proc.renderer()
+        # NOTE: only the content hash of each block is needed, so rendered
+        # blocks are not retained for the rest of the document.
+        renderer.memo = False
+        with TRACER.span("run", "document", page=proc.page):
+            if has_options(lines):
+                proc.prefetch(lines)
+            output = list(proc.iter_process(lines, renderer))
+        entry = PageEntry(output, tuple(renderer.dependencies()))
+        key = self._key(proc, lines)
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            self._evict()
+        return list(output)
+
+    def clear(self) -> None:
+        """
+        Remove all entries and reset the hit and miss counters.
+        """
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def cache_info(self) -> PageCacheInfo:
+        """
+        Return summary statistics for this cache.
+        """
+        with self._lock:
+            return PageCacheInfo(
+                hits=self.hits,
+                misses=self.misses,
+                entries=len(self._entries),
+                max_entries=self.max_entries,
+            )
+
+    @staticmethod
+    def _key(proc: IncludePyProc, lines: list[str]) -> tuple[str, ...]:
+        key: tuple[str, ...] = (content_digest("\n".join(lines).encode()),)
+        if proc.module_index is not None:
+            # NOTE: module names may resolve to different files when the
+            # source roots change.
+            key += tuple(str(root) for root in proc.module_index.roots)
+        return key
+
+    @staticmethod
+    def _valid(proc: IncludePyProc, entry: PageEntry) -> bool:
+        renderer = proc.renderer()
+        renderer.memo = False
+        for dependency in entry.dependencies:
+            try:
+                code_lines = renderer.render(dependency.directive)
+            except RENDER_ERRORS:
+                return False
+            if snippet_digest(code_lines) != dependency.digest:
+                return False
+        return True
+
+    def _evict(self) -> None:
+        # NOTE: the caller must hold the lock.
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+# The cache of expanded documents that is shared by every MkDocs plugin
+# instance in this process, because MkDocs creates new plugin instances when
+# it reloads the configuration for each rebuild.
+PAGE_CACHE = PageCache()
@@ -0,0 +1,114 @@
+"""
+A MkDocs plugin that expands the IncludePy blocks in each page, and caches
+the expanded Markdown so that unchanged pages are not processed again when
+the site is rebuilt (e.g., by ``mkdocs serve``).
+
+Enable the plugin by adding ``includepy`` to ``plugins`` in ``mkdocs.yml``.
+The extension settings are read from the ``includepy`` entry in
+``markdown_extensions`` (if any), which is then removed so that pages are not
+processed twice.
+This module requires MkDocs, which is not a dependency of ``includepy``.
+"""
+
+import logging
+
+from mkdocs.config import base, config_options
+from mkdocs.config.defaults import MkDocsConfig
+from mkdocs.plugins import BasePlugin
+from mkdocs.structure.files import Files
+from mkdocs.structure.pages import Page
+
+from . import IncludePy, IncludePyProc, log_stats
+from .pages import PAGE_CACHE
+from .stats import STATS
+from .trace import TRACER
+
+logger = logging.getLogger("mkdocs.plugins.includepy")
+
+
+class IncludePyPluginConfig(base.Config):
+    """
+    The settings for :class:`IncludePyPlugin`.
+    """
+
+    page_cache_size = config_options.Type(int, default=4096)
+    """The maximum number of expanded pages to cache."""
+
+
+class IncludePyPlugin(BasePlugin[IncludePyPluginConfig]):
+    """
+    Expand the IncludePy blocks in each page, and skip pages whose source
+    and included code are unchanged since the previous build.
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.proc: IncludePyProc | None = None
+        self.pages = 0
+        self.skipped = 0
+        self.log_stats = False
+
+    def on_config(self, config: MkDocsConfig) -> MkDocsConfig:
+        """
+        Create the preprocessor from the ``includepy`` extension settings,
+        and remove the extension from ``markdown_extensions``.
+        """
+        settings = config.mdx_configs.pop("includepy", None) or {}
+        config.markdown_extensions = [
+            name for name in config.markdown_extensions if name != "includepy"
+        ]
+        configs = IncludePy(**settings).getConfigs()
+        self.proc = IncludePyProc(configs, md=None)
+        self.log_stats = bool(configs.get("log_stats"))
+        PAGE_CACHE.configure(max_entries=self.config.page_cache_size)
+        return config
+
+    def on_pre_build(self, *, config: MkDocsConfig) -> None:
+        """
+        Reset the page counts (and the build statistics, if they are logged)
+        for this build.
+        """
+        self.pages = 0
+        self.skipped = 0
+        if self.log_stats:
+            STATS.reset()
+
+    def on_page_markdown(
+        self,
+        markdown: str,
+        /,
+        *,
+        page: Page,
+        config: MkDocsConfig,
+        files: Files,
+    ) -> str:
+        """
+        Return the Markdown for a page with the code for each IncludePy
+        block, using the cached Markdown if the page is unchanged.
+        """
+        assert self.proc is not None
+        self.proc.page = page.file.src_uri
+        source = markdown.split("\n")
+        lines = PAGE_CACHE.lookup(self.proc, source)
+        self.pages += 1
+        if lines is None:
+            lines = PAGE_CACHE.process(self.proc, source)
+        else:
+            self.skipped += 1
+        return "\n".join(lines)
+
+    def on_post_build(self, *, config: MkDocsConfig) -> None:
+        """
+        Report the number of unchanged pages that were not processed, and
+        log and reset the build statistics (if enabled by ``log_stats``),
+        and write the trace for this build (if tracing is enabled).
+        """
+        logger.info(
+            "includepy: skipped %d unchanged pages out of %d",
+            self.skipped,
+            self.pages,
+        )
+        if self.log_stats:
+            log_stats(logger)
+            STATS.reset()
+        TRACER.flush()
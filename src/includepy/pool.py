@@ -0,0 +1,92 @@
+"""
+Process a tree of Markdown files in a pool of worker processes, each of
+which has its own preprocessor.
+
+Each worker process caches the Python files that it parses; configure a
+persistent index (see the ``cache_dir`` option) to share parsed Python files
+between processes and between runs.
+"""
+
+import os
+
+from collections.abc import Iterator
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from typing import Any
+
+from . import IncludePy, IncludePyProc
+
+# The preprocessor used by this process, which is created on first use.
+_PROCESSOR: IncludePyProc | None = None
+
+
+def default_config(**settings: Any) -> dict[str, Any]:
+    """
+    Return the default extension settings, updated with any given settings.
+    """
+    return IncludePy().getConfigs() | settings
+
+
+def processor() -> IncludePyProc:
+    """
+    Return the preprocessor used by this process.
+    """
+    global _PROCESSOR
+    if _PROCESSOR is None:
+        _PROCESSOR = IncludePyProc(default_config(), md=None)
+    return _PROCESSOR
+
+
+def configure(config: dict[str, Any]) -> None:
+    """
+    Create the preprocessor used by this process, with the given settings.
+    """
+    global _PROCESSOR
+    _PROCESSOR = IncludePyProc(config, md=None)
+
+
+def worker_count(workers: int) -> int:
+    """
+    Return the number of worker processes to use: one per CPU if
+    ``workers`` is zero (or negative), and otherwise ``workers``.
+    """
+    if workers <= 0:
+        return os.cpu_count() or 1
+    return workers
+
+
+@contextmanager
+def worker_pool(
+    config: dict[str, Any] | None, workers: int
+) -> Iterator[ProcessPoolExecutor | None]:
+    """
+    Create a pool of worker processes, each of which uses a preprocessor
+    with the given settings.
+
+    Parameters
+    ----------
+    config : dict[str, Any] | None
+        The extension settings (default: the default settings).
+    workers : int
+        The number of worker processes (see :func:`worker_count`).
+
+    Yields
+    ------
+    ProcessPoolExecutor | None
+        The pool of worker processes, or ``None`` if there is only one
+        worker, in which case the preprocessor for this process is
+        configured and the jobs should be run in this process.
+    """
+    if config is None:
+        config = default_config()
+    # NOTE: worker processes load Python files one at a time.
+    config = config | {"executor": "none"}
+    workers = worker_count(workers)
+    if workers == 1:
+        configure(config)
+        yield None
+        return
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=configure, initargs=(config,)
+    ) as executor:
+        yield executor
@@ -0,0 +1,137 @@
+"""
+Load every Python file and object that is included by a collection of
+Markdown files, before the Markdown files are rendered (e.g., to populate the
+persistent index in a CI job that runs before the documentation is built).
+
+Each Markdown file is read one line at a time, and only the IncludePy blocks
+are collected; the blocks are not rendered.
+"""
+
+import time
+
+from collections.abc import Iterable
+from pathlib import Path
+from typing import NamedTuple
+
+from . import (
+    MODULE_CACHE,
+    IncludePyError,
+    ModuleCache,
+    collect_directives,
+    shared_executor,
+)
+from .modindex import module_index
+
+
+def markdown_files(paths: Iterable[Path | str]) -> list[Path]:
+    """
+    Return the Markdown files in a collection of files and directories.
+
+    Directories are searched recursively for files with a ``.md`` suffix.
+    """
+    md_files = []
+    for path in map(Path, paths):
+        if path.is_dir():
+            md_files.extend(sorted(path.rglob("*.md")))
+        else:
+            md_files.append(path)
+    return md_files
+
+
+class PrewarmResult(NamedTuple):
+    """
+    A summary of the Python files that were loaded by :func:`prewarm`.
+    """
+
+    markdown_files: int
+    """The number of Markdown files that were scanned."""
+    python_files: int
+    """The number of Python files that were loaded."""
+    objects: int
+    """The number of distinct Python objects that were located."""
+    errors: int
+    """The number of Python files and objects that could not be loaded."""
+    elapsed: float
+    """The elapsed time (in seconds)."""
+
+
+def prewarm(
+    paths: Iterable[Path | str],
+    cache: ModuleCache | None = None,
+    executor: str = "process",
+    workers: int = 0,
+    source_roots: Iterable[Path | str] = (),
+) -> PrewarmResult:
+    """
+    Load every Python file and object that is included by a collection of
+    Markdown files, so that they are cached before the Markdown files are
+    rendered.
+
+    Relative Python file paths are resolved against the current directory,
+    as when rendering the Markdown files.
+    If the cache has a persistent index (see the ``cache_dir`` option), the
+    parsed Python files are also recorded in this index.
+
+    Parameters
+    ----------
+    paths : Iterable[Path | str]
+        The Markdown files, and directories that contain Markdown files.
+    cache : ModuleCache | None
+        The cache to populate (default: :data:`MODULE_CACHE`).
+    executor : str
+        Load Python files in parallel with a ``"thread"`` pool, a
+        ``"process"`` pool, or ``"none"``.
+    workers : int
+        The number of threads or processes (default: one per CPU).
+    source_roots : Iterable[Path | str]
+        The directories against which to resolve ``pymodule`` blocks.
+
+    Returns
+    -------
+    PrewarmResult
+        The number of Markdown files, Python files, and Python objects.
+    """
+    start = time.perf_counter()
+    if cache is None:
+        cache = MODULE_CACHE
+    md_files = markdown_files(paths)
+    roots = list(source_roots)
+    index = module_index(roots) if roots else None
+    objects: dict[Path, set[str]] = {}
+    for md_file in md_files:
+        with open(md_file, encoding="utf-8") as f:
+            lines = (line.removesuffix("\n") for line in f)
+            directives = collect_directives(lines, index)
+        for directive in directives:
+            if directive.ref is not None:
+                continue
+            names = objects.setdefault(directive.python_file, set())
+            name = dict(directive.options).get("pyobject")
+            if name is not None:
+                names.add(name)
+
+    cache.prefetch(objects, shared_executor(executor, workers))
+    python_files = 0
+    num_objects = 0
+    errors = 0
+    for python_file, names in objects.items():
+        try:
+            module = cache.get(python_file)
+        except (OSError, SyntaxError, ValueError, IncludePyError):
+            errors += 1
+            continue
+        python_files += 1
+        for name in names:
+            try:
+                module.lookup(name)
+                num_objects += 1
+            except (SyntaxError, ValueError, IncludePyError):
+                errors += 1
+
+    return PrewarmResult(
+        markdown_files=len(md_files),
+        python_files=python_files,
+        objects=num_objects,
+        errors=errors,
+        elapsed=time.perf_counter() - start,
+    )
@@ -0,0 +1,282 @@
+"""
+Locate named objects in a Python source file without parsing the entire
+file.
+
+The :class:`Scanner` class uses a regular expression to find the definition
+of a top-level function or class, checks that this definition is not inside
+a string literal, and then tokenizes only the lines of that definition to
+find its extent and the extent of every function and class nested inside it.
+This avoids building a syntax tree for the entire file, which dominates the
+time and memory required to include code from very large files.
+
+Whenever the scanner encounters something that it cannot interpret with
+certainty, it returns ``None`` and the caller should parse the entire file
+instead.
+"""
+
+import re
+import tokenize
+
+from bisect import bisect_right
+from collections.abc import Iterator, Sequence
+
+# Tokens that may begin a comment or a string literal.
+RE_LEXEME = re.compile(rb"#|'''|\"\"\"|'|\"")
+
+# Tokens that may end each kind of string literal.
+RE_CLOSE = {
+    b"'": re.compile(rb"\\.|'|\n", re.DOTALL),
+    b'"': re.compile(rb'\\.|"|\n', re.DOTALL),
+    b"'''": re.compile(rb"\\.|'''", re.DOTALL),
+    b'"""': re.compile(rb'\\.|"""', re.DOTALL),
+}
+
+# The keywords that begin a function or class definition.
+HEADERS = {("def",), ("class",), ("async", "def")}
+
+# The source encodings for which the scanner can search the raw contents.
+ENCODINGS = {"utf-8", "utf-8-sig"}
+
+# The locations of named objects, as (lineno, end_lineno, col_offset).
+Symbols = dict[str, list[tuple[int, int, int]]]
+
+
+class StringSpans:
+    """
+    Lazily locate the string literals that span multiple lines.
+
+    Parameters
+    ----------
+    data : bytes
+        The contents of the source file.
+    """
+
+    def __init__(self, data: bytes):
+        self.data = data
+        self.pos = 0
+        self.failed = False
+        self.starts: list[int] = []
+        self.ends: list[int] = []
+
+    def contains(self, offset: int) -> bool | None:
+        """
+        Return whether an offset lies inside a string literal, or ``None`` if
+        this cannot be determined.
+        """
+        data = self.data
+        while self.pos <= offset and not self.failed:
+            lexeme = RE_LEXEME.search(data, self.pos)
+            if lexeme is None:
+                self.pos = len(data) + 1
+                break
+            token = lexeme.group()
+            if token == b"#":
+                newline = data.find(b"\n", lexeme.end())
+                self.pos = len(data) + 1 if newline < 0 else newline
+                continue
+            closer = RE_CLOSE[token]
+            pos = lexeme.end()
+            while True:
+                close = closer.search(data, pos)
+                if close is None or close.group() == b"\n":
+                    # NOTE: an unterminated string is a syntax error.
+                    self.failed = True
+                    break
+                if close.group()[:1] == b"\\":
+                    pos = close.end()
+                    continue
+                break
+            if self.failed or close is None:
+                break
+            if data.find(b"\n", lexeme.start(), close.end()) >= 0:
+                self.starts.append(lexeme.start())
+                self.ends.append(close.end())
+            self.pos = close.end()
+
+        if self.failed:
+            return None
+        ix = bisect_right(self.starts, offset) - 1
+        return ix >= 0 and self.ends[ix] > offset
+
+
+class Scanner:
+    """
+    Locate named objects in a Python source file, one top-level object at a
+    time.
+
+    Parameters
+    ----------
+    data : bytes
+        The contents of the source file.
+    offsets : Sequence[int]
+        The byte offset at which each line begins, followed by the size of
+        the source file.
+    encoding : str
+        The character encoding of the source file.
+    """
+
+    def __init__(self, data: bytes, offsets: Sequence[int], encoding: str):
+        self.data = data
+        self.offsets = offsets
+        self.encoding = encoding
+        self.strings = StringSpans(data)
+
+    @staticmethod
+    def supports(data: bytes, encoding: str) -> bool:
+        """
+        Return whether the scanner can locate objects in a source file.
+        """
+        if encoding not in ENCODINGS:
+            return False
+        # NOTE: lines that end with a lone carriage return are not matched by
+        # the regular expression anchors.
+        return data.count(b"\r") == data.count(b"\r\n")
+
+    def scan(self, name: str) -> Symbols | None:
+        """
+        Locate a top-level object and every object nested inside it.
+
+        Parameters
+        ----------
+        name : str
+            The name of the top-level object.
+
+        Returns
+        -------
+        Symbols | None
+            The locations of the top-level object and every nested object,
+            indexed by qualified name, or ``None`` if the object could not be
+            located with certainty (e.g., there are multiple objects with this
+            name, or the object may be defined inside a string literal).
+        """
+        if not name.isidentifier():
+            return None
+        pattern = re.compile(
+            rb"^(?:async[ \t]+)?(?:def|class)[ \t]+"
+            + re.escape(name.encode(self.encoding))
+            + rb"\b",
+            re.MULTILINE,
+        )
+        candidates = []
+        for match in pattern.finditer(self.data):
+            in_string = self.strings.contains(match.start())
+            if in_string is None:
+                return None
+            if not in_string:
+                candidates.append(match.start())
+        if len(candidates) != 1:
+            return None
+
+        line_ix = bisect_right(self.offsets, candidates[0]) - 1
+        try:
+            return self._scan_block(name, line_ix)
+        except (tokenize.TokenError, SyntaxError):
+            return None
+
+    def _lines(self, line_ix: int) -> Iterator[str]:
+        offsets = self.offsets
+        for ix in range(line_ix, len(offsets) - 1):
+            line = self.data[offsets[ix] : offsets[ix + 1]]
+            yield line.decode(self.encoding)
+
+    def _scan_block(self, name: str, line_ix: int) -> Symbols | None:
+        """
+        Tokenize the definition of a top-level object that starts on the
+        given line, and record the location of each object that it contains.
+        """
+        lines = self._lines(line_ix)
+        tokens = tokenize.generate_tokens(lambda: next(lines, ""))
+
+        symbols: Symbols = {}
+        # The open definitions, as (qualified name, depth, lineno, col).
+        # Definitions that cannot be found by name have no qualified name.
+        scopes: list[tuple[str | None, int, int, int]] = []
+        depth = 0
+        line_start = True
+        header: list[tokenize.TokenInfo] = []
+        # The definition whose body follows the current logical line.
+        pending: tuple[str | None, int, int, int] | None = None
+        # Whether to check if the next token begins an indented body.
+        check_body = False
+        last_row = 0
+
+        def close(scope: tuple[str | None, int, int, int]) -> None:
+            qualname, _, lineno, col = scope
+            if qualname is not None:
+                loc = (line_ix + lineno, line_ix + last_row, col)
+                symbols.setdefault(qualname, []).append(loc)
+
+        for token in tokens:
+            tok_type = token.type
+            if tok_type in (tokenize.NL, tokenize.COMMENT):
+                continue
+
+            if check_body:
+                check_body = False
+                assert pending is not None
+                if tok_type == tokenize.INDENT:
+                    scopes.append(pending)
+                else:
+                    # NOTE: the body was on the same line as the header.
+                    close(pending)
+                    if not scopes:
+                        return symbols
+                pending = None
+
+            if tok_type == tokenize.INDENT:
+                depth += 1
+                continue
+            elif tok_type == tokenize.DEDENT:
+                depth -= 1
+                while scopes and scopes[-1][1] >= depth:
+                    close(scopes.pop())
+                if not scopes:
+                    return symbols
+                continue
+            elif tok_type == tokenize.NEWLINE:
+                last_row = token.start[0]
+                line_start = True
+                header = []
+                if pending is not None:
+                    check_body = True
+                continue
+            elif tok_type == tokenize.ENDMARKER:
+                if pending is not None:
+                    close(pending)
+                while scopes:
+                    close(scopes.pop())
+                return symbols
+
+            if line_start or header:
+                line_start = False
+                header.append(token)
+                keywords = tuple(tok.string for tok in header)
+                if keywords in HEADERS or keywords == ("async",):
+                    continue
+                if keywords[:-1] in HEADERS:
+                    obj_name = token.string
+                    first = header[0]
+                    if not scopes and pending is None:
+                        # NOTE: this must be the top-level object.
+                        if obj_name != name or first.start[1] != 0:
+                            return None
+                        qualname: str | None = name
+                    elif scopes and scopes[-1][1] == depth - 1:
+                        parent = scopes[-1][0]
+                        qualname = (
+                            None if parent is None else f"{parent}.{obj_name}"
+                        )
+                    else:
+                        qualname = None
+                    pending = (
+                        qualname,
+                        depth,
+                        first.start[0],
+                        first.start[1],
+                    )
+                elif not scopes and pending is None:
+                    # NOTE: the first line must define the top-level object.
+                    return None
+                header = []
+
+        return None  # pragma: no cover
@@ -0,0 +1,187 @@
+"""
+A persistent index that is stored in a single SQLite database, so that the
+worker processes of a parallel site build can share parsed source files.
+
+The database uses write-ahead logging, so that readers are never blocked by
+a writer.
+Entries are stored with the same names and contents as the entries of a
+:class:`~includepy.diskindex.DiskIndex`, and the database also records which
+process is parsing each source file: the first process to claim a content
+hash parses the file and records it, and other processes wait for this
+entry rather than parsing the file themselves.
+Claims that are not released within ``claim_timeout`` seconds (e.g., because
+the process was killed) are ignored.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+
+from pathlib import Path
+from typing import Any
+
+from .diskindex import DiskIndex
+
+# The name of the database file in the cache directory.
+DATABASE_NAME = "index.sqlite3"
+
+# The time (in seconds) after which a claim is considered to be abandoned.
+CLAIM_TIMEOUT = 30.0
+
+# The time (in seconds) between checks for an entry that has been claimed.
+POLL_INTERVAL = 0.005
+
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS entries"
+    " (name TEXT PRIMARY KEY, data BLOB NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS claims"
+    " (digest TEXT PRIMARY KEY, pid INTEGER NOT NULL, claimed REAL NOT NULL)",
+)
+
+
+class SqliteIndex(DiskIndex):
+    """
+    A persistent index of parsed Python source files, stored in a SQLite
+    database that can be shared by concurrent processes.
+
+    Parameters
+    ----------
+    cache_dir : Path | str
+        The directory in which to store the database.
+    claim_timeout : float
+        The time (in seconds) after which a claim is considered to be
+        abandoned.
+    """
+
+    def __init__(
+        self, cache_dir: Path | str, claim_timeout: float = CLAIM_TIMEOUT
+    ):
+        super().__init__(cache_dir)
+        self.path = self.cache_dir / DATABASE_NAME
+        self.claim_timeout = claim_timeout
+        # NOTE: each thread (and each process) needs its own connection.
+        self._local = threading.local()
+
+    def __getstate__(self) -> dict[str, Any]:
+        state = self.__dict__.copy()
+        del state["_local"]
+        return state
+
+    def __setstate__(self, state: dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self._local = threading.local()
+
+    def claim(self, digest: str) -> bool:
+        conn = self._connection()
+        if conn is None:
+            return True
+        pid = os.getpid()
+        now = time.time()
+        try:
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO claims VALUES (?, ?, ?)",
+                (digest, pid, now),
+            )
+            if cursor.rowcount == 1:
+                return True
+            # NOTE: take over an abandoned claim.
+            cursor = conn.execute(
+                "UPDATE claims SET pid = ?, claimed = ?"
+                " WHERE digest = ? AND claimed < ?",
+                (pid, now, digest, now - self.claim_timeout),
+            )
+            return cursor.rowcount == 1
+        except sqlite3.Error:
+            return True
+
+    def release(self, digest: str) -> None:
+        conn = self._connection()
+        if conn is None:
+            return
+        try:
+            conn.execute(
+                "DELETE FROM claims WHERE digest = ? AND pid = ?",
+                (digest, os.getpid()),
+            )
+        except sqlite3.Error:
+            pass
+
+    def wait_module(self, digest: str) -> dict[str, Any] | None:
+        conn = self._connection()
+        deadline = time.monotonic() + self.claim_timeout
+        while True:
+            entry = self.load_module(digest)
+            if entry is not None:
+                return entry
+            if conn is None or time.monotonic() > deadline:
+                return None
+            try:
+                claimed = conn.execute(
+                    "SELECT 1 FROM claims WHERE digest = ?", (digest,)
+                ).fetchone()
+            except sqlite3.Error:
+                return None
+            if claimed is None:
+                # NOTE: the claim was released, but the entry may have been
+                # recorded after it was last checked.
+                return self.load_module(digest)
+            time.sleep(POLL_INTERVAL)
+
+    def _connection(self) -> sqlite3.Connection | None:
+        conn: sqlite3.Connection | None = getattr(self._local, "conn", None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(
+                self.path, timeout=30, isolation_level=None
+            )
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            for statement in SCHEMA:
+                conn.execute(statement)
+        except (OSError, sqlite3.Error):
+            # NOTE: the index is only a cache, so failing to open the
+            # database is not an error.
+            return None
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    def _entry_names(self) -> list[str]:
+        conn = self._connection()
+        if conn is None:
+            return []
+        try:
+            rows = conn.execute("SELECT name FROM entries").fetchall()
+        except sqlite3.Error:
+            return []
+        return [name for (name,) in rows]
+
+    def _read_bytes(self, name: str) -> bytes | None:
+        conn = self._connection()
+        if conn is None:
+            return None
+        try:
+            row = conn.execute(
+                "SELECT data FROM entries WHERE name = ?", (name,)
+            ).fetchone()
+        except sqlite3.Error:
+            return None
+        return None if row is None else bytes(row[0])
+
+    def _write_bytes(
+        self, name: str, data: bytes, replace: bool = True
+    ) -> bool:
+        conn = self._connection()
+        if conn is None:
+            return False
+        verb = "INSERT OR REPLACE" if replace else "INSERT OR IGNORE"
+        try:
+            cursor = conn.execute(
+                f"{verb} INTO entries VALUES (?, ?)", (name, data)
+            )
+        except sqlite3.Error:
+            return False
+        return cursor.rowcount == 1
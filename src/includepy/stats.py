@@ -0,0 +1,153 @@
+"""
+Build statistics for IncludePy.
+
+Statistics are collected by a single :class:`Stats` object for each process,
+because MkDocs and Zensical create a new Markdown processor for each page.
+When statistics are disabled (the default), operations that occur for every
+directive only check a boolean flag, and operations that occur once for each
+source file enter a shared no-op context manager.
+"""
+
+import threading
+import time
+
+from collections.abc import Iterator
+from contextlib import AbstractContextManager, contextmanager, nullcontext
+from typing import NamedTuple
+
+# The events that are counted.
+COUNTERS = (
+    "documents",
+    "directives",
+    "files_opened",
+    "bytes_read",
+    "parses",
+    "scans",
+    "module_hits",
+    "module_misses",
+    "snippet_hits",
+    "snippet_misses",
+)
+
+# The operations that are timed.
+TIMERS = ("read", "parse", "lookup", "slice", "format")
+
+# The context manager that is returned when statistics are disabled.
+NULL_TIMER: AbstractContextManager[None] = nullcontext()
+
+
+class StatsSnapshot(NamedTuple):
+    """
+    A snapshot of the build statistics.
+    """
+
+    counts: dict[str, int]
+    """The number of times that each event occurred."""
+    times: dict[str, float]
+    """The cumulative time (in seconds) spent in each operation."""
+
+    def summary(self) -> str:
+        """
+        Return a one-line summary of the statistics.
+        """
+        counts = ", ".join(f"{name}={n}" for name, n in self.counts.items())
+        times = ", ".join(
+            f"{name}={t:.3f}s" for name, t in self.times.items()
+        )
+        return f"includepy: {counts}; {times}"
+
+
+class Stats:
+    """
+    Count events and time operations, if enabled.
+    """
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self._lock = threading.Lock()
+        self._counts = dict.fromkeys(COUNTERS, 0)
+        self._times = dict.fromkeys(TIMERS, 0.0)
+
+    def count(self, name: str, n: int = 1) -> None:
+        """
+        Record that an event occurred ``n`` times.
+
+        Callers should check :attr:`enabled` first, to avoid the cost of this
+        call when statistics are disabled.
+        """
+        with self._lock:
+            self._counts[name] += n
+
+    def add_time(self, name: str, seconds: float) -> None:
+        """
+        Record time spent in an operation.
+        """
+        with self._lock:
+            self._times[name] += seconds
+
+    def stopwatch(self) -> "Stopwatch":
+        """
+        Return a stopwatch that records the time spent in a sequence of
+        operations.
+        """
+        return Stopwatch(self)
+
+    def timer(self, name: str) -> AbstractContextManager[None]:
+        """
+        Return a context manager that records the time spent in an
+        operation.
+        """
+        if not self.enabled:
+            return NULL_TIMER
+        return self._timer(name)
+
+    @contextmanager
+    def _timer(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+
+    def snapshot(self) -> StatsSnapshot:
+        """
+        Return the current statistics.
+        """
+        with self._lock:
+            return StatsSnapshot(dict(self._counts), dict(self._times))
+
+    def reset(self) -> None:
+        """
+        Reset every count and time to zero.
+        """
+        with self._lock:
+            self._counts = dict.fromkeys(COUNTERS, 0)
+            self._times = dict.fromkeys(TIMERS, 0.0)
+
+
+class Stopwatch:
+    """
+    Record the time spent in a sequence of operations.
+
+    Parameters
+    ----------
+    stats : Stats
+        The statistics in which to record each operation.
+    """
+
+    def __init__(self, stats: Stats):
+        self.stats = stats
+        self.last = time.perf_counter()
+
+    def lap(self, name: str) -> None:
+        """
+        Record the time since the previous lap (or since this stopwatch was
+        created) as time spent in the named operation.
+        """
+        now = time.perf_counter()
+        self.stats.add_time(name, now - self.last)
+        self.last = now
+
+
+# The statistics for this process.
+STATS = Stats()
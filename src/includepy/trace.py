@@ -0,0 +1,180 @@
+"""
+Record trace events for IncludePy, in the Chrome trace-event format.
+
+The trace contains a span for each document that is processed, each
+directive that is rendered, and each source file that is read or parsed.
+The trace file can be loaded into a trace viewer such as Perfetto
+(https://ui.perfetto.dev/) or ``chrome://tracing``.
+
+Tracing is disabled by default, and is enabled by :meth:`Tracer.start`.
+When tracing is disabled, :meth:`Tracer.span` returns a shared no-op context
+manager, and callers on hot paths can check :attr:`Tracer.enabled` before
+creating a span.
+"""
+
+import atexit
+import json
+import os
+import threading
+import time
+
+from collections.abc import Iterator
+from contextlib import AbstractContextManager, contextmanager, nullcontext
+from pathlib import Path
+from typing import Any
+
+from .atomic import atomic_write
+
+# The context manager that is returned when tracing is disabled.
+NULL_SPAN: AbstractContextManager[None] = nullcontext()
+
+# The environment variable that enables tracing, by defining the path of the
+# trace file.
+TRACE_ENV = "INCLUDEPY_TRACE"
+
+
+class Tracer:
+    """
+    Record spans and write them to a trace file.
+    """
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self.path: Path | None = None
+        self.events: list[dict[str, Any]] = []
+        self._threads: dict[int, str] = {}
+        self._lock = threading.Lock()
+        self._at_exit = False
+
+    def start(self, path: Path | str) -> None:
+        """
+        Start recording spans, and write the trace file when the process
+        exits (unless the spans have already been written by :meth:`flush`).
+
+        Parameters
+        ----------
+        path : Path | str
+            The path of the trace file; any ``{pid}`` in the path is replaced
+            by the process ID, so that each process writes a separate file.
+        """
+        with self._lock:
+            self.path = Path(str(path).replace("{pid}", str(os.getpid())))
+            self.enabled = True
+            if not self._at_exit:
+                self._at_exit = True
+                atexit.register(self.flush)
+
+    def stop(self) -> None:
+        """
+        Stop recording spans, and discard the recorded spans.
+        """
+        with self._lock:
+            self.enabled = False
+            self.events = []
+            self._threads = {}
+
+    def span(
+        self, name: str, cat: str, **args: Any
+    ) -> AbstractContextManager[None]:
+        """
+        Return a context manager that records the time spent in an
+        operation, if tracing is enabled.
+
+        Parameters
+        ----------
+        name : str
+            The name of the span.
+        cat : str
+            The category of the span (e.g., ``"document"``).
+        **args
+            Values that describe the operation (e.g., the source file).
+        """
+        if not self.enabled:
+            return NULL_SPAN
+        return self._span(name, cat, args)
+
+    @contextmanager
+    def _span(
+        self, name: str, cat: str, args: dict[str, Any]
+    ) -> Iterator[None]:
+        thread = threading.current_thread()
+        tid = threading.get_native_id()
+        start = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            end = time.perf_counter_ns()
+            event = {
+                "name": name,
+                "cat": cat,
+                "ph": "X",
+                "ts": start / 1000,
+                "dur": (end - start) / 1000,
+                "pid": os.getpid(),
+                "tid": tid,
+                "args": args,
+            }
+            with self._lock:
+                self.events.append(event)
+                self._threads.setdefault(tid, thread.name)
+
+    def trace(self) -> dict[str, Any]:
+        """
+        Return the recorded spans as a Chrome trace-event document.
+        """
+        with self._lock:
+            return self._document(self.events)
+
+    def _document(self, events: list[dict[str, Any]]) -> dict[str, Any]:
+        # NOTE: the caller must hold the lock.
+        pid = os.getpid()
+        names = [
+            {
+                "name": "thread_name",
+                "ph": "M",
+                "pid": pid,
+                "tid": tid,
+                "args": {"name": name},
+            }
+            for tid, name in self._threads.items()
+        ]
+        return {"traceEvents": names + events, "displayTimeUnit": "ms"}
+
+    def write(self, path: Path | str | None = None) -> None:
+        """
+        Write the recorded spans to a trace file, which is written to a
+        temporary file and then atomically renamed.
+
+        Parameters
+        ----------
+        path : Path | str | None
+            The path of the trace file (default: the path given to
+            :meth:`start`).
+        """
+        dest = self.path if path is None else Path(path)
+        if dest is None or not self.enabled:
+            return
+        self._write(dest, self.trace())
+
+    def flush(self) -> None:
+        """
+        Write the spans recorded since the previous flush to the trace file
+        given to :meth:`start`, and discard them, so that each build (e.g.,
+        by ``mkdocs serve``) writes a separate trace.
+        Nothing is written if no spans have been recorded.
+        """
+        with self._lock:
+            if self.path is None or not self.enabled or not self.events:
+                return
+            dest = self.path
+            trace = self._document(self.events)
+            self.events = []
+        self._write(dest, trace)
+
+    @staticmethod
+    def _write(dest: Path, trace: dict[str, Any]) -> None:
+        atomic_write(dest, json.dumps(trace))
+
+
+# The tracer for this process.
+TRACER = Tracer()
@@ -0,0 +1,189 @@
+"""
+Reload cached Python source files in a background thread when they change,
+so that the next document to include them does not pay the cost of reading
+and parsing them (e.g., when ``mkdocs serve`` rebuilds a site).
+
+The watcher polls the status of each cached file with :func:`os.stat`, so it
+requires no additional dependencies and works on any filesystem.
+Each new version is read and parsed before it replaces the cached version,
+so documents never observe a partially-loaded file.
+To bound the CPU cost, the watcher waits longer between polls after polls
+that reload many (or large) files.
+"""
+
+import atexit
+import logging
+import os
+import threading
+import time
+
+from pathlib import Path
+from typing import Protocol
+
+logger = logging.getLogger(__name__)
+
+
+class WatchedCache(Protocol):
+    """
+    The cache methods that are used by a :class:`Watcher`.
+    """
+
+    def paths(self) -> list[Path]:
+        """Return the paths of the cached source files."""
+        ...  # pragma: no cover
+
+    def refresh(self, path: Path) -> bool:
+        """Reload a cached source file if it has changed."""
+        ...  # pragma: no cover
+
+
+class Watcher:
+    """
+    Reload changed source files in a background thread.
+
+    Parameters
+    ----------
+    cache : WatchedCache
+        The cache whose source files should be reloaded.
+    interval : float
+        The minimum time (in seconds) between polls.
+    max_cpu : float
+        The maximum fraction of one CPU that the watcher may use; after a
+        poll that used ``t`` seconds of CPU time, the watcher waits at least
+        ``t / max_cpu`` seconds before the next poll.
+    """
+
+    def __init__(
+        self,
+        cache: WatchedCache,
+        interval: float = 1.0,
+        max_cpu: float = 0.05,
+    ):
+        if interval <= 0:
+            raise ValueError("The watch interval must be positive")
+        if not 0 < max_cpu <= 1:
+            raise ValueError("The CPU fraction must be between 0 and 1")
+        self.cache = cache
+        self.interval = interval
+        self.max_cpu = max_cpu
+        self.polls = 0
+        self.reloads = 0
+        # NOTE: the version (size and modification time) of each file that
+        # could not be reloaded, so that it is not reloaded again until it
+        # changes.
+        self.failed: dict[Path, tuple[int, int]] = {}
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def running(self) -> bool:
+        """
+        Whether the background thread is running.
+        """
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        """
+        Start the background thread, if it is not already running.
+        """
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="includepy-watcher", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout: float | None = 5.0) -> None:
+        """
+        Stop the background thread and wait for it to finish.
+
+        Parameters
+        ----------
+        timeout : float | None
+            The maximum time (in seconds) to wait for the thread to finish
+            reloading the current file.
+        """
+        self._stop.set()
+        thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+        self._thread = None
+
+    def poll(self) -> list[Path]:
+        """
+        Reload every cached source file that has changed.
+
+        Returns
+        -------
+        list[Path]
+            The source files that were reloaded.
+        """
+        reloaded = []
+        for path in self.cache.paths():
+            if self._stop.is_set():
+                break
+            try:
+                stat = os.stat(path)
+            except OSError:
+                # NOTE: report missing files when they are included.
+                continue
+            version = (stat.st_size, stat.st_mtime_ns)
+            if self.failed.get(path) == version:
+                continue
+            try:
+                if self.cache.refresh(path):
+                    reloaded.append(path)
+                self.failed.pop(path, None)
+            except (OSError, SyntaxError, ValueError):
+                # NOTE: the file may be saved again shortly (e.g., while it
+                # is being edited), and errors are reported when the file is
+                # included.
+                self.failed[path] = version
+            except Exception:
+                # NOTE: any other error (e.g., a RecursionError) must not
+                # stop the thread, so that other files are still reloaded.
+                logger.warning("Could not reload %s", path, exc_info=True)
+                self.failed[path] = version
+        self.polls += 1
+        self.reloads += len(reloaded)
+        return reloaded
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            start = time.thread_time()
+            self.poll()
+            used = time.thread_time() - start
+            self._stop.wait(max(self.interval, used / self.max_cpu))
+
+    def __enter__(self) -> "Watcher":
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.stop()
+
+
+# The watcher for each cache, which are shared by every IncludePy
+# preprocessor in this process.
+_WATCHERS: dict[int, Watcher] = {}
+_WATCHERS_LOCK = threading.Lock()
+
+
+def shared_watcher(
+    cache: WatchedCache, interval: float = 1.0, max_cpu: float = 0.05
+) -> Watcher:
+    """
+    Return the running watcher for a cache, starting it if required.
+
+    The watcher is stopped when the process exits.
+    The interval and CPU fraction are only used when the watcher is created.
+    """
+    with _WATCHERS_LOCK:
+        watcher = _WATCHERS.get(id(cache))
+        if watcher is None:
+            watcher = Watcher(cache, interval=interval, max_cpu=max_cpu)
+            _WATCHERS[id(cache)] = watcher
+            atexit.register(watcher.stop)
+        watcher.start()
+        return watcher
@@ -0,0 +1,154 @@
+import json
+import os
+import pytest
+from includepy import EchoLines, Renderer
+
+
+@pytest.fixture
+def process_each_line():
+    """
+    Return a function that passes every line of a document to the IncludePy
+    state machine, without skipping any lines, to check the output of the
+    preprocessor.
+    """
+
+    def process(lines):
+        output_lines = []
+        state = EchoLines(Renderer())
+        for line in lines:
+            state = state.read_line(line, output_lines)
+        state.read_line(None, output_lines)
+        return output_lines
+
+    return process
+
+
+@pytest.fixture
+def write_source():
+    """
+    Return a function that writes a text file (e.g., a Python source file),
+    and ensures that its modification time changes if the file already
+    exists.
+    """
+
+    def write(path, text):
+        tmp_path = path.with_name(f".{path.name}.tmp")
+        tmp_path.write_text(text)
+        if path.exists():
+            # NOTE: ensure the modification time changes on coarse
+            # filesystems.
+            stat = os.stat(path)
+            os.utime(
+                tmp_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9)
+            )
+        # NOTE: replace the file atomically, so that a background thread
+        # never observes the new contents with the old modification time.
+        os.replace(tmp_path, path)
+        return path
+
+    return write
+
+
+@pytest.fixture
+def write_module(write_source):
+    """
+    Return a function that writes a Python source file with two classes,
+    where ``First().value()`` returns ``value``.
+    """
+
+    def write(path, value):
+        return write_source(
+            path,
+            "class First:\n"
+            "    def value(self):\n"
+            f"        return {value}\n"
+            "\n"
+            "\n"
+            "class Second:\n"
+            "    def value(self):\n"
+            "        return 2\n",
+        )
+
+    return write
+
+
+@pytest.fixture
+def write_modules(tmp_path, write_source):
+    """
+    Return a function that writes ``count`` Python source files, each of
+    which defines ``functions`` functions (``func_0``, ``func_1``, ...) whose
+    return values depend on ``value``, and returns their paths.
+    """
+
+    def write(count, functions=1, value=0):
+        return [
+            write_source(
+                tmp_path / f"module_{i}.py",
+                "".join(
+                    f"def func_{j}():\n    return {value} + {i} + {j}\n\n\n"
+                    for j in range(functions)
+                ),
+            )
+            for i in range(count)
+        ]
+
+    return write
+
+
+@pytest.fixture
+def include_document():
+    """
+    Return a function that returns a document with a fenced IncludePy block
+    for each object name (default: ``func_0``) and each source file.
+    """
+
+    def document(paths, names=("func_0",)):
+        lines = ["# Title", ""]
+        for name in names:
+            for path in paths:
+                lines.extend(
+                    [
+                        "```py",
+                        f"-->includepy<-- {path}",
+                        f"-->pyobject<-- {name}",
+                        "```",
+                        "",
+                    ]
+                )
+        return lines
+
+    return document
+
+
+@pytest.fixture
+def build_site(tmp_path):
+    """
+    Return a function that builds a MkDocs site with the IncludePy plugin,
+    from a dictionary of page names and lines and the settings for the
+    IncludePy extension, and returns the site directory.
+    Tests that use this fixture are skipped if MkDocs is not installed.
+    """
+    pytest.importorskip("mkdocs")
+    from mkdocs.commands.build import build
+    from mkdocs.config import load_config
+    from includepy.plugin import IncludePyPlugin
+
+    def build_pages(pages, **settings):
+        docs_dir = tmp_path / "docs"
+        docs_dir.mkdir(exist_ok=True)
+        for name, lines in pages.items():
+            (docs_dir / name).write_text("\n".join(lines))
+        config_file = tmp_path / "mkdocs.yml"
+        config_file.write_text(
+            "site_name: Test\n"
+            "markdown_extensions:\n"
+            f"  - includepy: {json.dumps(settings)}\n"
+        )
+        config = load_config(str(config_file))
+        plugin = IncludePyPlugin()
+        plugin.load_config({})
+        config.plugins["includepy"] = plugin
+        build(config)
+        return tmp_path / "site"
+
+    return build_pages
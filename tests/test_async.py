@@ -0,0 +1,109 @@
+import asyncio
+import includepy
+import pytest
+import threading
+import time
+from includepy import IncludePyError, IncludePyProc, ModuleCache
+
+
+class SlowCache(ModuleCache):
+    """
+    A cache that takes some time to load each source file, and records the
+    maximum number of concurrent loads.
+    """
+
+    def __init__(self, delay):
+        super().__init__()
+        self.delay = delay
+        self.active = 0
+        self.max_active = 0
+        self.counter_lock = threading.Lock()
+
+    def get(self, path):
+        with self.counter_lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        try:
+            time.sleep(self.delay)
+            return super().get(path)
+        finally:
+            with self.counter_lock:
+                self.active -= 1
+
+
+def test_arun_matches_run(write_modules, include_document):
+    """
+    Verify that asynchronous processing produces the same output as
+    :meth:`IncludePyProc.run`.
+    """
+    lines = include_document(write_modules(5))
+    proc = IncludePyProc(config={}, md=None)
+    proc.cache = ModuleCache()
+    assert asyncio.run(proc.arun(lines)) == proc.run(lines)
+    no_code = ["# Title", "Some text."]
+    assert asyncio.run(proc.arun(no_code)) is no_code
+
+
+def test_arun_collects_directives_once(
+    write_modules, include_document, monkeypatch
+):
+    """
+    Verify that the directives in a document are only collected once, when
+    the source files are loaded in the event loop.
+    """
+    lines = include_document(write_modules(3))
+    proc = IncludePyProc(config={"executor": "thread", "workers": 2}, md=None)
+    proc.cache = ModuleCache()
+    calls = []
+    collect = includepy.collect_directives
+
+    def counting_collect(lines, module_index=None):
+        calls.append(lines)
+        return collect(lines, module_index)
+
+    monkeypatch.setattr(includepy, "collect_directives", counting_collect)
+    expected = proc.run(lines)
+    assert len(calls) == 1
+    assert asyncio.run(proc.arun(lines)) == expected
+    assert len(calls) == 2
+
+
+def test_arun_does_not_block_loop(write_modules, include_document):
+    """
+    Verify that the event loop keeps running while source files are loaded,
+    and that the concurrency limit is respected.
+    """
+    lines = include_document(write_modules(6))
+    proc = IncludePyProc(config={"async_limit": 2}, md=None)
+    proc.cache = SlowCache(delay=0.05)
+
+    async def main():
+        ticks = 0
+        task = asyncio.create_task(proc.arun(lines))
+        while not task.done():
+            ticks += 1
+            await asyncio.sleep(0.005)
+        return ticks, task.result()
+
+    ticks, output = asyncio.run(main())
+    assert ticks > 10
+    assert proc.cache.max_active == 2
+    assert output == IncludePyProc(config={}, md=None).run(lines)
+
+
+def test_arun_raises_errors(tmp_path, write_modules, include_document):
+    """
+    Verify that errors are raised when the invalid block is processed.
+    """
+    paths = write_modules(2)
+    lines = [
+        *include_document(paths),
+        f"-->includepy<-- {tmp_path / 'missing.py'}",
+    ]
+    proc = IncludePyProc(config={}, md=None)
+    proc.cache = ModuleCache()
+    with pytest.raises(FileNotFoundError):
+        asyncio.run(proc.arun(lines))
+    lines[4] = "-->pyobject<-- nothing"
+    with pytest.raises(IncludePyError, match="Found 0 matches for nothing"):
+        asyncio.run(proc.arun(lines))
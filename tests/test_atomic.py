@@ -0,0 +1,34 @@
+import pytest
+from includepy.atomic import atomic_file, atomic_write
+
+
+def test_atomic_write(tmp_path):
+    """
+    Verify that text and bytes are written, and that missing directories are
+    created.
+    """
+    path = tmp_path / "nested" / "output.txt"
+    atomic_write(path, "First\r\nline ✓\n")
+    assert path.read_bytes() == "First\r\nline ✓\n".encode()
+    atomic_write(path, b"\x00\x01")
+    assert path.read_bytes() == b"\x00\x01"
+    assert [p.name for p in path.parent.iterdir()] == ["output.txt"]
+
+
+def test_atomic_file_error(tmp_path):
+    """
+    Verify that the destination is unchanged, and the temporary file is
+    removed, if writing fails.
+    """
+    path = tmp_path / "output.txt"
+    path.write_text("Original")
+
+    def write_partial():
+        with atomic_file(path) as f:
+            f.write(b"Partial")
+            raise RuntimeError("failed")
+
+    with pytest.raises(RuntimeError):
+        write_partial()
+    assert path.read_text() == "Original"
+    assert [p.name for p in tmp_path.iterdir()] == ["output.txt"]
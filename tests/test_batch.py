@@ -0,0 +1,90 @@
+import pytest
+from includepy import (
+    IncludePy,
+    IncludePyError,
+    IncludePyProc,
+    ModuleCache,
+    shared_executor,
+)
+
+
+@pytest.mark.parametrize("executor", ["none", "thread", "process"])
+def test_batch_matches_sequential(
+    executor, write_modules, include_document, process_each_line
+):
+    """
+    Verify that resolving directives in batches produces the same output as
+    the sequential state machine, and reads each source file only once.
+    """
+    paths = write_modules(4)
+    lines = include_document(paths + paths)
+    proc = IncludePyProc(config={"executor": executor, "workers": 2}, md=None)
+    proc.cache = ModuleCache()
+    output = proc.run(lines)
+    assert output == process_each_line(lines)
+
+    info = proc.cache.cache_info()
+    assert info.misses == len(paths)
+    assert info.entries == len(paths)
+    # NOTE: files loaded in worker processes are not read again.
+    assert all(proc.cache.get(path).data is not None for path in paths)
+
+
+def test_batch_disabled_by_default():
+    """
+    Verify that the extension does not load Python files in parallel unless
+    an executor is configured.
+    """
+    config = IncludePy().getConfigs()
+    assert config["executor"] == "none"
+    assert config["workers"] == 1
+    assert IncludePyProc(config, md=None).executor is None
+
+
+@pytest.mark.parametrize("executor", ["thread", "process"])
+def test_batch_preserves_error_order(
+    executor, write_modules, include_document
+):
+    """
+    Verify that the first error in the document is raised, regardless of
+    the order in which source files are loaded.
+    """
+    paths = write_modules(2)
+    lines = include_document(paths + paths)
+    # NOTE: the first block refers to a missing object, and a later block
+    # contains an invalid option.
+    lines[4] = "-->pyobject<-- missing"
+    lines.insert(len(lines) - 2, "-->unknown_option<-- value")
+    proc = IncludePyProc(config={"executor": executor, "workers": 2}, md=None)
+    proc.cache = ModuleCache()
+    with pytest.raises(IncludePyError, match="Found 0 matches for missing"):
+        proc.run(lines)
+
+    # NOTE: the invalid option is reported once the first block is fixed.
+    lines[4] = "-->pyobject<-- func_0"
+    with pytest.raises(IncludePyError, match="Invalid option unknown_option"):
+        proc.run(lines)
+
+
+def test_batch_missing_file(tmp_path, write_modules, include_document):
+    """
+    Verify that missing source files are reported when they are included.
+    """
+    paths = write_modules(2)
+    lines = include_document([*paths, tmp_path / "missing.py"])
+    proc = IncludePyProc(config={"executor": "thread", "workers": 2}, md=None)
+    proc.cache = ModuleCache()
+    with pytest.raises(FileNotFoundError):
+        proc.run(lines)
+
+
+def test_shared_executor():
+    """
+    Verify that executors are shared, and that invalid executors are
+    rejected.
+    """
+    assert shared_executor("none", 4) is None
+    assert shared_executor("thread", 1) is None
+    assert shared_executor("thread", 2) is shared_executor("thread", 2)
+    with pytest.raises(IncludePyError, match="Invalid executor"):
+        shared_executor("fibers", 2)
@@ -0,0 +1,83 @@
+import markdown
+import textwrap
+from includepy import IncludePy, IncludePyProc, ModuleCache, MODULE_CACHE
+
+
+def test_shared_cache_parses_once():
+    """
+    Verify that separate Markdown instances share parsed source files.
+    """
+    text = textwrap.dedent(
+        """
+        ```
+        -->includepy<-- example.py
+        -->pyobject<-- factorial
+        -->includepy<-- example.py
+        -->pyobject<-- hello
+        ```
+        """
+    )
+    MODULE_CACHE.clear()
+    html_1 = markdown.markdown(text, extensions=[IncludePy(), "fenced_code"])
+    html_2 = markdown.markdown(text, extensions=[IncludePy(), "fenced_code"])
+    assert html_1 == html_2
+
+    info = MODULE_CACHE.cache_info()
+    assert info.misses == 1
+    assert info.hits == 3
+    assert info.entries == 1
+
+
+def test_cache_detects_modified_files(tmp_path, write_source):
+    """
+    Verify that cache entries are discarded when the source file changes.
+    """
+    py_file = write_source(
+        tmp_path / "module.py", "def func():\n    return 1\n"
+    )
+    lines = [f"-->includepy<-- {py_file}", "-->pyobject<-- func"]
+    proc = IncludePyProc(config={}, md=None)
+    assert proc.run(lines) == ["def func():", "    return 1"]
+
+    write_source(py_file, "def func():\n    return 1 + 2\n")
+    assert proc.run(lines) == ["def func():", "    return 1 + 2"]
+
+
+def test_cache_evicts_least_recently_used(tmp_path, write_source):
+    """
+    Verify that the cache retains at most ``max_entries`` source files.
+    """
+    cache = ModuleCache(max_entries=2)
+    paths = [
+        write_source(tmp_path / f"mod_{i}.py", f"x = {i}\n") for i in range(3)
+    ]
+    cache.get(paths[0])
+    cache.get(paths[1])
+    cache.get(paths[0])
+    cache.get(paths[2])
+
+    info = cache.cache_info()
+    assert info.entries == 2
+    assert info.misses == 3
+    assert info.hits == 1
+
+    # The second module was the least-recently used, and was evicted.
+    cache.get(paths[0])
+    cache.get(paths[1])
+    assert cache.cache_info().misses == 4
+
+
+def test_cache_memory_limit(tmp_path, write_source):
+    """
+    Verify that the cache respects its approximate memory limit.
+    """
+    py_file = write_source(tmp_path / "module.py", "x = 1\n" * 100)
+    cache = ModuleCache()
+    module = cache.get(py_file)
+    assert cache.cache_info().nbytes == module.nbytes
+
+    cache.configure(max_bytes=module.nbytes - 1)
+    assert len(cache) == 0
+    cache.get(py_file)
+    assert len(cache) == 0
+    assert cache.cache_info().misses == 2
@@ -0,0 +1,131 @@
+import pytest
+from pathlib import Path
+from includepy.__main__ import main
+from includepy.check import check_lines, check_tree
+
+
+# A document with valid blocks and one invalid block of each kind, and the
+# line number and description of each problem.
+DOCUMENT = [
+    "# Valid blocks",
+    "-->includepy<-- example.py",
+    "-->pyobject<-- factorial",
+    "-->includepy<-- example.py",
+    "-->pyobject<-- MyClass.do_thing",
+    "-->only_lines<-- 1,3-",
+    "",
+    "# Invalid blocks",
+    "-->includepy<-- example.py",
+    "-->pyobject<-- notdefined",
+    "",
+    "-->includepy<-- missing.py",
+    "-->pyobject<-- factorial",
+    "",
+    "-->includepy<-- example.py",
+    "-->pyobject<-- factorial",
+    "-->unknown_option<-- value",
+    "-->lines_after<-- 1",
+    "",
+    "-->includepy<-- example.py",
+    "-->pyobject<-- factorial",
+    "-->pyobject<-- hello",
+    "",
+    "-->includepy<-- example.py",
+    "-->pyobject<-- factorial",
+    "-->lines_before<-- -1",
+    "-->includepy<-- example.py",
+    "-->pyobject<-- factorial",
+    "-->only_lines<-- 1-2-3",
+    "",
+    "-->pyobject<-- factorial",
+    "-->pymodule<-- package.module",
+    "-->pyobject<-- factorial",
+    "",
+    ";-->includepy<-- missing.py",
+    "-->includepy<-- example.py",
+    "",
+    "-->includepy<-- example.py",
+    "-->pyobject<-- factorial",
+    "-->unknown_option<-- value",
+    "-->lines_before<-- -2",
+    "",
+    "-->pymodule<-- package.module",
+    "-->lines_after<-- x",
+]
+PROBLEMS = [
+    (9, "Found 0 matches for notdefined"),
+    (12, "FileNotFoundError"),
+    (17, "Invalid option unknown_option"),
+    (22, "Duplicate option pyobject"),
+    (24, "lines_before cannot be negative"),
+    (27, "Invalid only_lines: 1-2-3"),
+    (31, "Expected 'includepy' or 'pymodule'"),
+    (32, "without any source roots"),
+    (36, "No Python object specified"),
+    (38, "lines_before cannot be negative"),
+    (40, "Invalid option unknown_option"),
+    (43, "without any source roots"),
+    (43, "lines_after must be a valid integer"),
+]
+
+
+def test_check_lines():
+    """
+    Verify that every invalid block is reported with its line number, and
+    that blocks with invalid options are counted and checked.
+    """
+    n_directives, problems = check_lines(DOCUMENT)
+    assert n_directives == 12
+    assert [line for line, _ in problems] == [line for line, _ in PROBLEMS]
+    for (_, message), (_, expected) in zip(problems, PROBLEMS, strict=True):
+        assert expected in message
+
+
+def test_check_valid_examples():
+    """
+    Verify that the example documents contain no problems.
+    """
+    for example in Path("examples").glob("*.in"):
+        lines = example.read_text().split("\n")
+        n_directives, problems = check_lines(lines)
+        assert n_directives > 0
+        assert problems == []
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_check_tree(tmp_path, workers):
+    """
+    Verify that every Markdown file in a directory is checked, and that the
+    problems are ordered by file and line.
+    """
+    docs = tmp_path / "docs"
+    (docs / "nested").mkdir(parents=True)
+    (docs / "valid.md").write_text("\n".join(DOCUMENT[:7]))
+    (docs / "nested" / "invalid.md").write_text("\n".join(DOCUMENT))
+    result = check_tree([docs], workers=workers)
+    assert result.files == 2
+    assert result.directives == 14
+    assert [(p.path.name, p.line) for p in result.problems] == [
+        ("invalid.md", line) for line, _ in PROBLEMS
+    ]
+
+
+def test_check_command(tmp_path, capsys):
+    """
+    Verify that the check command reports each problem and returns a
+    non-zero status if there are any problems.
+    """
+    valid = tmp_path / "valid.md"
+    valid.write_text("\n".join(DOCUMENT[:7]))
+    assert main(["check", str(valid), "--workers", "1"]) == 0
+    assert "Checked 2 blocks in 1 files" in capsys.readouterr().err
+
+    invalid = tmp_path / "invalid.md"
+    invalid.write_text("\n".join(DOCUMENT))
+    assert main(["check", str(tmp_path), "--workers", "1"]) == 1
+    output = capsys.readouterr().out.splitlines()
+    assert len(output) == len(PROBLEMS)
+    assert output[0].startswith(f"{invalid}:9: IncludePyError: ")
+    assert (
+        f"{invalid}:27: IncludePyError: Invalid only_lines: 1-2-3" in output
+    )
@@ -0,0 +1,82 @@
+import ast
+import pytest
+import sysconfig
+import textwrap
+from pathlib import Path
+from includepy import dedent_lines, index_symbols
+
+
+def reference(lines):
+    """
+    Dedent lines with :func:`textwrap.dedent`, and strip trailing whitespace.
+    """
+    return [
+        line.rstrip()
+        for line in textwrap.dedent("\n".join(lines)).split("\n")
+    ]
+
+
+def stdlib_files():
+    """
+    Return a sample of Python source files from the standard library.
+    """
+    stdlib = Path(sysconfig.get_paths()["stdlib"])
+    return sorted(stdlib.glob("*.py"))[:200]
+
+
+@pytest.mark.parametrize(
+    ("source", "name"),
+    [
+        (
+            "class A:\n    def f(self):\n        return '''\nraw\n'''\n",
+            "A.f",
+        ),
+        ("class A:\n\tdef f(self):\n\t\treturn 1\n\n  \n", "A.f"),
+        ("class A:\n    def f(self):\n\f        return 1\n", "A.f"),
+        ("class A:\n    def f(self):\n \t      return 1\n", "A.f"),
+        ("if True:\n    @decorator\n    def f():\n        pass\n", "f"),
+        ("def f():\n    pass", "f"),
+    ],
+)
+def test_dedent_edge_cases(source, name):
+    """
+    Verify that unusual indentation is removed in the same way as
+    :func:`textwrap.dedent`.
+    """
+    leaf = name.split(".")[-1]
+    node = next(
+        node
+        for node in ast.walk(ast.parse(source))
+        if getattr(node, "name", None) == leaf
+    )
+    lineno, end_lineno, col = node.lineno, node.end_lineno, node.col_offset
+    lines = source.split("\n")
+    for before in range(lineno):
+        obj_lines = lines[lineno - 1 - before : end_lineno + 1]
+        actual = dedent_lines(obj_lines, before, col)
+        assert [line.rstrip() for line in actual] == reference(obj_lines)
+
+
+def test_dedent_matches_textwrap():
+    """
+    Verify that objects in the standard library are dedented in the same
+    way as :func:`textwrap.dedent`.
+    """
+    count = 0
+    for path in stdlib_files():
+        source = path.read_text(encoding="utf-8", errors="replace")
+        try:
+            symbols = index_symbols(ast.parse(source))
+        except SyntaxError:
+            continue
+        lines = source.replace("\r\n", "\n").split("\n")
+        for locs in symbols.values():
+            for lineno, end_lineno, col in locs:
+                start_ix = max(0, lineno - 3)
+                obj_lines = lines[start_ix : end_lineno + 1]
+                actual = dedent_lines(obj_lines, lineno - 1 - start_ix, col)
+                assert [line.rstrip() for line in actual] == reference(
+                    obj_lines
+                )
+                count += 1
+    assert count > 1000
@@ -0,0 +1,236 @@
+import ast
+import includepy
+import io
+import markdown
+import os
+import tarfile
+import textwrap
+from includepy import (
+    IncludePy,
+    ModuleCache,
+    MODULE_CACHE,
+    SnippetCache,
+    extract_objects,
+)
+from includepy.__main__ import main
+from includepy.diskindex import DiskIndex
+
+
+SOURCE = """\
+class Greeter:
+    def greet(self, name):
+        return f"Hello {name}"
+"""
+
+
+def forbid_parsing(monkeypatch):
+    """
+    Raise an exception if any Python source code is parsed.
+    """
+
+    def parse(*args, **kwargs):
+        raise AssertionError("Source code was parsed")
+
+    monkeypatch.setattr(ast, "parse", parse)
+
+
+def load_text(cache, path, name):
+    """
+    Return the source code for a named object.
+    """
+    module = cache.get(path)
+    lineno, end_lineno, _ = module.lookup(name)
+    return module.text(lineno - 1, end_lineno)
+
+
+def test_index_warm_start(tmp_path, monkeypatch):
+    """
+    Verify that a new cache reuses the persistent index without parsing the
+    source file.
+    """
+    py_file = tmp_path / "greeter.py"
+    py_file.write_text(SOURCE)
+    index = DiskIndex(tmp_path / "cache")
+    expected = load_text(ModuleCache(index=index), py_file, "Greeter.greet")
+
+    forbid_parsing(monkeypatch)
+    cache = ModuleCache(index=DiskIndex(tmp_path / "cache"))
+    assert load_text(cache, py_file, "Greeter.greet") == expected
+    # NOTE: the source file contents are not retained on a warm start.
+    assert cache.get(py_file).data is None
+
+
+def test_index_unchanged_contents(tmp_path, monkeypatch):
+    """
+    Verify that the index is reused when the source file is modified but its
+    contents do not change.
+    """
+    py_file = tmp_path / "greeter.py"
+    py_file.write_text(SOURCE)
+    index = DiskIndex(tmp_path / "cache")
+    expected = load_text(ModuleCache(index=index), py_file, "Greeter")
+
+    stat = os.stat(py_file)
+    os.utime(py_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    forbid_parsing(monkeypatch)
+    cache = ModuleCache(index=index)
+    assert load_text(cache, py_file, "Greeter") == expected
+
+
+def test_index_ignores_corrupt_entries(tmp_path):
+    """
+    Verify that corrupt index entries are ignored and replaced.
+    """
+    py_file = tmp_path / "greeter.py"
+    py_file.write_text(SOURCE)
+    index = DiskIndex(tmp_path / "cache")
+    expected = load_text(ModuleCache(index=index), py_file, "Greeter.greet")
+
+    entries = list(index.root.rglob("*.json"))
+    assert len(entries) == 2
+    for entry in entries:
+        entry.write_text('{"format": 1, "python": "')
+
+    cache = ModuleCache(index=index)
+    assert load_text(cache, py_file, "Greeter.greet") == expected
+    assert cache.get(py_file).data is not None
+
+    # The corrupt entries should have been replaced.
+    cache = ModuleCache(index=index)
+    assert load_text(cache, py_file, "Greeter.greet") == expected
+    assert cache.get(py_file).data is None
+
+
+def test_index_cache_dir_option(tmp_path):
+    """
+    Verify that the ``cache_dir`` option creates a persistent index.
+    """
+    text = textwrap.dedent(
+        """
+        ```
+        -->includepy<-- example.py
+        -->pyobject<-- factorial
+        ```
+        """
+    )
+    cache_dir = tmp_path / "cache"
+    expected = markdown.markdown(
+        text, extensions=[IncludePy(), "fenced_code"]
+    )
+    MODULE_CACHE.clear()
+    try:
+        html = markdown.markdown(
+            text,
+            extensions=[IncludePy(cache_dir=str(cache_dir)), "fenced_code"],
+        )
+    finally:
+        MODULE_CACHE.configure(cache_dir="")
+    assert html == expected
+    assert list(cache_dir.rglob("modules/*.json"))
+
+
+def forbid_rendering(monkeypatch):
+    """
+    Raise an exception if any IncludePy block is rendered.
+    """
+
+    def render_snippet(*args, **kwargs):
+        raise AssertionError("Block was rendered")
+
+    monkeypatch.setattr(includepy, "render_snippet", render_snippet)
+
+
+def test_index_snippets(tmp_path, monkeypatch):
+    """
+    Verify that rendered blocks are recorded in the index, and are reused by
+    a new cache.
+    """
+    py_file = tmp_path / "greeter.py"
+    py_file.write_text(SOURCE)
+    index = DiskIndex(tmp_path / "cache")
+    names = ["Greeter", "Greeter.greet"]
+    expected = extract_objects(
+        py_file, names, ModuleCache(index=index), SnippetCache()
+    )
+    assert len(list(index.root.glob("snippets/*.json"))) == 2
+
+    forbid_parsing(monkeypatch)
+    forbid_rendering(monkeypatch)
+    cache = ModuleCache(index=DiskIndex(tmp_path / "cache"))
+    assert extract_objects(py_file, names, cache, SnippetCache()) == expected
+
+    # NOTE: blocks with different options are not reused.
+    key = (cache.get(py_file).digest, ("Greeter", 0, 0, 0, ""), "")
+    assert index.load_snippet(key) == expected["Greeter"]
+    assert index.load_snippet((*key[:2], "  ")) is None
+
+
+def test_index_export_import(tmp_path, monkeypatch, capsys):
+    """
+    Verify that an exported index can be imported into an empty index, and
+    that source files are not parsed again when their modification times
+    differ (e.g., on a fresh CI runner).
+    """
+    py_file = tmp_path / "greeter.py"
+    py_file.write_text(SOURCE)
+    cache_dir = tmp_path / "cache"
+    expected = extract_objects(
+        py_file,
+        ["Greeter.greet"],
+        ModuleCache(index=DiskIndex(cache_dir)),
+        SnippetCache(),
+    )
+    archive = tmp_path / "index.tar.gz"
+    assert (
+        main(["cache", "export", str(archive), "--cache-dir", str(cache_dir)])
+        == 0
+    )
+    assert "Exported 2 entries" in capsys.readouterr().out
+    with tarfile.open(archive) as tar:
+        assert not any("/paths/" in name for name in tar.getnames())
+
+    new_dir = tmp_path / "restored"
+    assert (
+        main(["cache", "import", str(archive), "--cache-dir", str(new_dir)])
+        == 0
+    )
+    assert "Imported 2 entries" in capsys.readouterr().out
+    stat = os.stat(py_file)
+    os.utime(py_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    forbid_parsing(monkeypatch)
+    forbid_rendering(monkeypatch)
+    cache = ModuleCache(index=DiskIndex(new_dir))
+    objects = extract_objects(
+        py_file, ["Greeter.greet"], cache, SnippetCache()
+    )
+    assert objects == expected
+
+
+def test_index_import_ignores_other_members(tmp_path):
+    """
+    Verify that archive members which are not module or snippet entries are
+    not imported.
+    """
+    archive = tmp_path / "index.tar.gz"
+    names = [
+        "../outside.json",
+        "v1/py3.11/paths/" + "0" * 32 + ".json",
+        "v1/py3.11/modules/notahash.json",
+        "v1/py3.11/modules/" + "0" * 32 + ".json",
+    ]
+    with tarfile.open(archive, "w:gz") as tar:
+        for name in names:
+            info = tarfile.TarInfo(name)
+            info.size = 2
+            tar.addfile(info, io.BytesIO(b"{}"))
+
+    cache_dir = tmp_path / "cache"
+    assert DiskIndex(cache_dir).import_archive(archive) == 1
+    assert [
+        p.relative_to(cache_dir).as_posix() for p in cache_dir.rglob("*.json")
+    ] == [names[-1]]
+    assert not (tmp_path / "outside.json").exists()
+    # NOTE: existing entries are not replaced.
+    assert DiskIndex(cache_dir).import_archive(archive) == 0
@@ -0,0 +1,126 @@
+import io
+import os
+import pytest
+import shutil
+from pathlib import Path
+from includepy import expand, pool
+from includepy.__main__ import main
+
+
+def example_names():
+    """
+    Return the name of each example input file.
+    """
+    return sorted(f.stem for f in Path("./examples").glob("*.in"))
+
+
+def copy_examples(tmp_path):
+    """
+    Copy the example input files into a directory tree of Markdown files.
+    """
+    input_dir = tmp_path / "input"
+    for ix, name in enumerate(example_names()):
+        md_file = input_dir / f"dir_{ix}" / f"{name}.md"
+        md_file.parent.mkdir(parents=True)
+        shutil.copy(Path("./examples") / f"{name}.in", md_file)
+    return input_dir
+
+
+@pytest.mark.parametrize("example_name", example_names())
+def test_expand_stdin(example_name, monkeypatch, capsys):
+    """
+    Verify that the expand command writes the expected output for each
+    example to standard output.
+    """
+    input_file = Path("./examples") / f"{example_name}.in"
+    output_file = Path("./examples") / f"{example_name}.out"
+    monkeypatch.setattr("sys.stdin", io.StringIO(input_file.read_text()))
+    assert main(["expand"]) == 0
+    assert capsys.readouterr().out == output_file.read_text()
+
+
+def test_expand_stream(tmp_path):
+    """
+    Verify that each output line is written before the rest of the input is
+    read, and that the output is identical to expanding the entire text.
+    """
+    py_file = tmp_path / "module.py"
+    py_file.write_text("def first():\n    return 1\n")
+    lines = [
+        "# Title\n",
+        f"-->includepy<-- {py_file}\n",
+        "-->pyobject<-- first\n",
+        "Text\n",
+        "End\n",
+    ]
+    output = io.StringIO()
+
+    def input_lines():
+        yield from lines[:-1]
+        # NOTE: the block has been written before the input is exhausted.
+        assert output.getvalue().endswith("    return 1\nText")
+        yield lines[-1]
+
+    pool.configure(pool.default_config())
+    expand.expand_stream(input_lines(), output)
+    assert output.getvalue() == expand.expand_text("".join(lines))
+
+    for text in ["", "\n", "No newline", "Two\nlines\n\n"]:
+        output = io.StringIO()
+        expand.expand_stream(io.StringIO(text), output)
+        assert output.getvalue() == text
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_expand_tree(tmp_path, workers):
+    """
+    Verify that expanding a directory writes the expected output for each
+    example, and skips outputs that are up to date.
+    """
+    input_dir = copy_examples(tmp_path)
+    output_dir = tmp_path / "output"
+    result = expand.expand_tree(input_dir, output_dir, workers=workers)
+    assert len(result.expanded) == len(example_names())
+    assert result.skipped == []
+    assert result.failed == []
+    for ix, name in enumerate(example_names()):
+        output = output_dir / f"dir_{ix}" / f"{name}.md"
+        expected = Path("./examples") / f"{name}.out"
+        assert output.read_text() == expected.read_text()
+
+    result = expand.expand_tree(input_dir, output_dir, workers=workers)
+    assert result.expanded == []
+    assert len(result.skipped) == len(example_names())
+
+    # NOTE: ensure the modification time changes on coarse filesystems.
+    md_file = input_dir / "dir_0" / f"{example_names()[0]}.md"
+    stat = os.stat(md_file)
+    os.utime(md_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    result = expand.expand_tree(input_dir, output_dir, workers=workers)
+    assert result.expanded == [md_file]
+
+
+def test_expand_tree_reports_errors(tmp_path, capsys):
+    """
+    Verify that the expand command reports files that cannot be expanded,
+    and still expands the other files.
+    """
+    input_dir = copy_examples(tmp_path)
+    bad_file = input_dir / "bad.md"
+    bad_file.write_text("-->includepy<-- example.py\n-->pyobject<-- nope\n")
+    output_dir = tmp_path / "output"
+    status = main(["expand", str(input_dir), "-o", str(output_dir)])
+    assert status == 1
+    errors = capsys.readouterr().err
+    assert f"{bad_file}: IncludePyError: Found 0 matches for nope" in errors
+    assert not (output_dir / "bad.md").exists()
+    assert len(list(output_dir.rglob("*.md"))) == len(example_names())
+    assert not [f for f in output_dir.rglob("*") if f.name.endswith(".tmp")]
+
+
+def test_expand_directory_requires_output(tmp_path, capsys):
+    """
+    Verify that expanding a directory requires an output directory.
+    """
+    assert main(["expand", str(tmp_path)]) == 2
+    assert "output directory is required" in capsys.readouterr().err
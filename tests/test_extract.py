@@ -0,0 +1,80 @@
+import pytest
+from includepy import (
+    IncludePyError,
+    IncludePyProc,
+    ModuleCache,
+    SnippetCache,
+    extract_objects,
+)
+
+
+def include(name, **options):
+    """
+    Return the output of an IncludePy block for an object in example.py.
+    """
+    lines = ["-->includepy<-- example.py", f"-->pyobject<-- {name}"]
+    lines.extend(f"-->{key}<-- {value}" for key, value in options.items())
+    return IncludePyProc(config={}, md=None).run(lines)
+
+
+@pytest.mark.parametrize(
+    "options",
+    [
+        {},
+        {"lines_before": 1, "lines_after": 1},
+        {"extra_indent": "4"},
+        {"only_lines": "1,3-"},
+    ],
+)
+def test_extract_matches_blocks(options):
+    """
+    Verify that extracted objects are identical to the output of IncludePy
+    blocks with the same options.
+    """
+    names = ["factorial", "MyClass.do_thing", "hello", "MyClass"]
+    objects = extract_objects("example.py", names, **options)
+    assert list(objects) == names
+    for name in names:
+        assert objects[name] == include(name, **options)
+
+
+def test_extract_loads_file_once(tmp_path):
+    """
+    Verify that a large file is loaded and parsed once, rather than scanned
+    for each object.
+    """
+    path = tmp_path / "module.py"
+    path.write_text(
+        "".join(f"def func_{i}():\n    return {i}\n\n\n" for i in range(300))
+    )
+    cache = ModuleCache(scan_threshold=1)
+    names = [f"func_{i}" for i in range(300)]
+    objects = extract_objects(
+        path, names, cache=cache, snippets=SnippetCache()
+    )
+    assert objects["func_42"] == ["def func_42():", "    return 42"]
+    assert cache.cache_info().loads == 1
+    module = cache.get(path)
+    assert module.scanner is None
+    assert module.scanned == set()
+
+
+def test_extract_returns_copies():
+    """
+    Verify that modifying extracted lines does not modify cached lines.
+    """
+    first = extract_objects("example.py", ["hello"])
+    first["hello"].clear()
+    assert extract_objects("example.py", ["hello"])["hello"]
+
+
+def test_extract_errors():
+    """
+    Verify that invalid options and missing objects raise an exception.
+    """
+    with pytest.raises(IncludePyError, match="Invalid option pyobject"):
+        extract_objects("example.py", ["hello"], pyobject="factorial")
+    with pytest.raises(IncludePyError, match="cannot be negative"):
+        extract_objects("example.py", ["hello"], lines_before=-1)
+    with pytest.raises(IncludePyError):
+        extract_objects("example.py", ["hello", "notdefined"])
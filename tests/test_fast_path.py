@@ -0,0 +1,249 @@
+import pytest
+from includepy import IncludePyError, IncludePyProc
+
+
+# Documents and their expected output (or the type and message of the
+# exception that they raise), which were produced by processing every line
+# of each document with the original state machine, so that the fast path
+# and the state machine are both compared to this baseline.
+CASES = [
+    pytest.param(
+        ["# Title", "", "x --> y", "    indented text"],
+        ["# Title", "", "x --> y", "    indented text"],
+        id="text only",
+    ),
+    pytest.param(
+        [
+            "```py",
+            "-->includepy<-- example.py",
+            "-->pyobject<-- hello",
+            "```",
+        ],
+        [
+            "```py",
+            "def hello(name: str) -> None:",
+            '    print(f"Hello {name}!")',
+            "```",
+        ],
+        id="single block",
+    ),
+    pytest.param(
+        [
+            "    -->includepy<-- example.py",
+            "    -->pyobject<-- something",
+            "\t-->includepy<-- example.py",
+            "\t-->pyobject<-- MyClass.do_thing",
+        ],
+        [
+            "    def something(arg1, arg2):",
+            '        return f"{arg1} and {arg2}"',
+            "\tdef do_thing(self, value: str) -> str:",
+            '\t    return f"MyClass: {value}"',
+        ],
+        id="indented blocks",
+    ),
+    pytest.param(
+        [
+            "-->includepy<-- example.py",
+            "-->pyobject<-- hello",
+            "-->includepy<-- example.py",
+            "-->pyobject<-- MyClass.do_thing",
+            "Text",
+        ],
+        [
+            "def hello(name: str) -> None:",
+            '    print(f"Hello {name}!")',
+            "def do_thing(self, value: str) -> str:",
+            '    return f"MyClass: {value}"',
+            "Text",
+        ],
+        id="adjacent blocks",
+    ),
+    pytest.param(
+        [
+            "-->includepy<-- example.py",
+            "-->pyobject<-- something",
+            "-->lines_before<-- 2",
+            "-->lines_after<-- 1",
+            "-->extra_indent<-- 4",
+        ],
+        [
+            "    ",
+            "    ",
+            "    def something(arg1, arg2):",
+            '        return f"{arg1} and {arg2}"',
+            "    ",
+        ],
+        id="options",
+    ),
+    pytest.param(
+        [
+            "-->includepy<-- example.py",
+            "-->pyobject<-- factorial",
+            "-->only_lines<-- 1,3-",
+        ],
+        [
+            "def factorial(n: int) -> int:",
+            "    while n > 1:",
+            "        n -= 1",
+            "        value *= n",
+            "    return value",
+        ],
+        id="only_lines",
+    ),
+    pytest.param(
+        ["-->includepy<-- example.py", "-->pyobject<-- hello  "],
+        ["def hello(name: str) -> None:", '    print(f"Hello {name}!")'],
+        id="trailing whitespace",
+    ),
+    pytest.param(
+        [
+            ";-->includepy<-- example.py",
+            ";;-->pyobject<-- factorial",
+            "  ;-->pyobject<-- hello",
+        ],
+        [
+            "-->includepy<-- example.py",
+            ";-->pyobject<-- factorial",
+            "  -->pyobject<-- hello",
+        ],
+        id="escaped lines",
+    ),
+    pytest.param(
+        [
+            "-->includepy<-- example.py",
+            "-->pyobject<-- hello",
+            ";-->pyobject<-- factorial",
+        ],
+        [
+            "def hello(name: str) -> None:",
+            '    print(f"Hello {name}!")',
+            "-->pyobject<-- factorial",
+        ],
+        id="escape ends block",
+    ),
+    pytest.param(
+        ["-->includepy<--example.py", "-->pyobject<-- hello"],
+        ["def hello(name: str) -> None:", '    print(f"Hello {name}!")'],
+        id="missing space",
+    ),
+    pytest.param(
+        [
+            "-->includepy<-- example.py\n-->pyobject<-- hello",
+            "-->includepy<-- example.py",
+            "-->pyobject<-- hello",
+            ";-->includepy<-- example.py",
+        ],
+        [
+            "-->includepy<-- example.py\n-->pyobject<-- hello",
+            "def hello(name: str) -> None:",
+            '    print(f"Hello {name}!")',
+            "-->includepy<-- example.py",
+        ],
+        id="embedded newline",
+    ),
+    pytest.param(
+        ["-->includepy<-- example.py", "Text"],
+        (IncludePyError, "No Python object specified"),
+        id="no object",
+    ),
+    pytest.param(
+        ["-->includepy<-- example.py", "-->pyobject<-- notdefined"],
+        (IncludePyError, "Found 0 matches for notdefined"),
+        id="unknown object",
+    ),
+    pytest.param(
+        ["-->includepy<-- missing.py", "-->pyobject<-- hello"],
+        (
+            FileNotFoundError,
+            "[Errno 2] No such file or directory: 'missing.py'",
+        ),
+        id="missing file",
+    ),
+    pytest.param(
+        [
+            "-->includepy<-- example.py",
+            "-->pyobject<-- hello",
+            "-->lines_after<-- -1",
+        ],
+        (IncludePyError, "lines_after cannot be negative"),
+        id="negative count",
+    ),
+    pytest.param(
+        [
+            "-->includepy<-- example.py",
+            "-->pyobject<-- hello",
+            "-->only_lines<-- 100",
+        ],
+        (IncludePyError, "Invalid only_lines: 100"),
+        id="line out of range",
+    ),
+    pytest.param(
+        [
+            "-->includepy<-- example.py",
+            "-->pyobject<-- hello",
+            "-->unknown_option<-- value",
+        ],
+        (IncludePyError, "Invalid option unknown_option"),
+        id="unknown option",
+    ),
+    pytest.param(
+        [
+            "-->includepy<-- example.py",
+            "-->pyobject<-- hello",
+            "-->pyobject<-- factorial",
+        ],
+        (IncludePyError, "Duplicate option pyobject"),
+        id="duplicate option",
+    ),
+    # NOTE: the original message only named 'includepy', before 'pymodule'
+    # blocks were supported.
+    pytest.param(
+        ["Text", "-->pyobject<-- hello"],
+        (
+            IncludePyError,
+            "Expected 'includepy' or 'pymodule' but found 'pyobject'",
+        ),
+        id="option outside block",
+    ),
+    pytest.param(
+        [
+            "-->includepy<-- example.py",
+            "-->pyobject<-- notdefined",
+            "-->includepy<-- missing.py",
+            "-->pyobject<-- hello",
+        ],
+        (IncludePyError, "Found 0 matches for notdefined"),
+        id="first error reported",
+    ),
+]
+
+
+def run_result(run, lines):
+    """
+    Return the output lines, or the type and message of the exception.
+    """
+    try:
+        return run(lines)
+    except Exception as e:
+        return (type(e), str(e))
+
+
+def test_no_directives_returns_input():
+    """
+    Verify that documents without directives are returned unchanged.
+    """
+    lines = ["# Heading", "", "Some text --- with dashes.", "a -> b"]
+    proc = IncludePyProc(config={}, md=None)
+    assert proc.run(lines) is lines
+
+
+@pytest.mark.parametrize(("lines", "expected"), CASES)
+def test_run_matches_baseline(lines, expected):
+    """
+    Verify that skipping lines without directives produces the baseline
+    output, and raises the baseline errors.
+    """
+    proc = IncludePyProc(config={}, md=None)
+    assert run_result(proc.run, list(lines)) == expected
+    assert run_result(lambda x: list(proc.iter_process(x)), lines) == expected
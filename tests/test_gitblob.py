@@ -0,0 +1,106 @@
+import pytest
+import subprocess
+from includepy import IncludePyProc, ModuleCache
+from includepy.gitblob import GitError, git_reader
+
+
+def git(repo, *args):
+    """
+    Run a git command in a repository.
+    """
+    subprocess.run(
+        ["git", "-c", "user.name=Test", "-c", "user.email=test@example.com"]
+        + list(args),
+        cwd=repo,
+        check=True,
+        capture_output=True,
+    )
+
+
+@pytest.fixture
+def repo(tmp_path):
+    """
+    Create a repository with two tagged releases, in which ``module.py``
+    changes and ``shared.py`` does not.
+    """
+    git(tmp_path, "init", "-q")
+    src = tmp_path / "src"
+    src.mkdir()
+    (src / "shared.py").write_text("def shared():\n    return 0\n")
+    for version in (1, 2):
+        (src / "module.py").write_text(f"def func():\n    return {version}\n")
+        git(tmp_path, "add", ".")
+        git(tmp_path, "commit", "-q", "-m", f"Release {version}")
+        git(tmp_path, "tag", f"v{version}")
+    (src / "module.py").write_text("def func():\n    return 3\n")
+    return tmp_path
+
+
+def include(proc, path, ref, name="func"):
+    """
+    Return the output of an IncludePy block for a file in a revision.
+    """
+    lines = [f"-->includepy<-- {path}", f"-->pyobject<-- {name}"]
+    if ref is not None:
+        lines.append(f"-->ref<-- {ref}")
+    return proc.run(lines)
+
+
+def test_include_from_revisions(repo):
+    """
+    Verify that the ``ref`` option includes code from a revision rather than
+    from the working tree.
+    """
+    proc = IncludePyProc(config={}, md=None)
+    proc.cache = ModuleCache()
+    path = repo / "src" / "module.py"
+    assert include(proc, path, "v1")[-1] == "    return 1"
+    assert include(proc, path, "v2")[-1] == "    return 2"
+    assert include(proc, path, None)[-1] == "    return 3"
+
+    # NOTE: files that were removed from the working tree can be included.
+    path.unlink()
+    assert include(proc, path, "v1")[-1] == "    return 1"
+
+
+def test_blobs_parsed_once(repo):
+    """
+    Verify that a file that is unchanged between revisions is only read and
+    parsed once, and that every lookup uses the same git process.
+    """
+    proc = IncludePyProc(config={}, md=None)
+    proc.cache = ModuleCache()
+    path = repo / "src" / "shared.py"
+    outputs = [include(proc, path, ref, "shared") for ref in ("v1", "v2")]
+    assert outputs[0] == outputs[1]
+    info = proc.cache.cache_info()
+    assert info.loads == 1
+    assert info.entries == 1
+
+    reader, relpath = git_reader(path)
+    assert relpath == "src/shared.py"
+    pid = reader._process.pid
+    for ref in ("v1", "v2", "HEAD"):
+        include(proc, repo / "src" / "module.py", ref)
+    assert reader._process.pid == pid
+    assert proc.cache.paths() == []
+
+
+def test_git_errors(repo, tmp_path_factory):
+    """
+    Verify that missing files and files outside a repository raise an
+    exception.
+    """
+    proc = IncludePyProc(config={}, md=None)
+    proc.cache = ModuleCache()
+    with pytest.raises(GitError, match="does not exist"):
+        include(proc, repo / "src" / "missing.py", "v1")
+    with pytest.raises(GitError, match="does not exist"):
+        include(proc, repo / "src" / "module.py", "v9")
+    with pytest.raises(GitError, match="is not a file"):
+        include(proc, repo / "src", "v1")
+
+    outside = tmp_path_factory.mktemp("outside") / "module.py"
+    outside.write_text("def func():\n    return 0\n")
+    with pytest.raises(GitError, match="not in a git repository"):
+        include(proc, outside, "v1")
@@ -0,0 +1,128 @@
+import markdown
+import pytest
+from includepy import (
+    DependencyManifest,
+    IncludePy,
+    IncludePyError,
+    IncludePyProc,
+    ModuleCache,
+)
+
+
+def build(proc, pages):
+    """
+    Process each named document, and record its dependencies.
+    """
+    for page, lines in pages.items():
+        proc.page = page
+        proc.run(lines)
+    proc.page = None
+
+
+def site(py_file):
+    """
+    Return documents that include different objects from a Python file.
+    """
+    return {
+        "first.md": [f"-->includepy<-- {py_file}", "-->pyobject<-- First"],
+        "second.md": [f"-->includepy<-- {py_file}", "-->pyobject<-- Second"],
+        "method.md": [
+            f"-->includepy<-- {py_file}",
+            "-->pyobject<-- First.value",
+        ],
+        "plain.md": ["No code here."],
+    }
+
+
+def test_manifest_object_level(tmp_path, write_module):
+    """
+    Verify that only documents that include a modified object are stale.
+    """
+    py_file = write_module(tmp_path / "module.py", 1)
+    manifest = DependencyManifest()
+    proc = IncludePyProc(config={"manifest": manifest}, md=None)
+    proc.cache = ModuleCache()
+    build(proc, site(py_file))
+    assert list(manifest.pages) == [
+        "first.md",
+        "second.md",
+        "method.md",
+        "plain.md",
+    ]
+    assert manifest.pages["plain.md"] == []
+    assert manifest.python_files("first.md") == {py_file.resolve()}
+
+    # An unchanged file does not make any document stale.
+    assert manifest.stale_pages([py_file], proc.cache) == []
+
+    write_module(py_file, 10)
+    stale = manifest.stale_pages([py_file], proc.cache)
+    assert stale == ["first.md", "method.md"]
+    assert manifest.stale_pages([tmp_path / "other.py"], proc.cache) == []
+
+    # Deleting the file makes every document that includes it stale.
+    py_file.unlink()
+    stale = manifest.stale_pages([py_file], proc.cache)
+    assert stale == ["first.md", "second.md", "method.md"]
+
+
+def test_manifest_records_errors(tmp_path, write_module):
+    """
+    Verify that a document with an invalid block becomes stale when the
+    block can be rendered.
+    """
+    py_file = tmp_path / "module.py"
+    py_file.write_text("x = 1\n")
+    manifest = DependencyManifest()
+    proc = IncludePyProc(config={"manifest": manifest}, md=None)
+    proc.cache = ModuleCache()
+    proc.page = "page.md"
+    lines = [f"-->includepy<-- {py_file}", "-->pyobject<-- First"]
+    with pytest.raises(IncludePyError):
+        proc.run(lines)
+    [dependency] = manifest.pages["page.md"]
+    assert dependency.digest is None
+    assert manifest.stale_pages([py_file], proc.cache) == []
+
+    write_module(py_file, 1)
+    assert manifest.stale_pages([py_file], proc.cache) == ["page.md"]
+
+
+def test_manifest_save_and_load(tmp_path, write_module):
+    """
+    Verify that a saved manifest can be loaded, and that invalid manifests
+    are ignored.
+    """
+    py_file = write_module(tmp_path / "module.py", 1)
+    manifest_file = tmp_path / "cache" / "manifest.json"
+    manifest = DependencyManifest(manifest_file)
+    proc = IncludePyProc(config={"manifest": manifest}, md=None)
+    proc.cache = ModuleCache()
+    build(proc, site(py_file))
+    manifest.save()
+
+    loaded = DependencyManifest(manifest_file)
+    assert loaded.pages == manifest.pages
+    write_module(py_file, 10)
+    assert loaded.stale_pages([py_file]) == ["first.md", "method.md"]
+
+    manifest_file.write_text("{not json")
+    assert DependencyManifest(manifest_file).pages == {}
+
+
+def test_manifest_extension_option(tmp_path, write_module):
+    """
+    Verify that a manifest given to the extension is used to record the
+    blocks in each named document.
+    """
+    py_file = write_module(tmp_path / "module.py", 1)
+    manifest = DependencyManifest()
+    md = markdown.Markdown(extensions=[IncludePy(manifest=manifest)])
+    proc = md.preprocessors["includepy"]
+    assert proc.manifest is manifest
+    proc.page = "index.md"
+    md.convert("\n".join(site(py_file)["first.md"]))
+    assert manifest.python_files("index.md") == {py_file.resolve()}
+
+    md = markdown.Markdown(extensions=[IncludePy()])
+    assert md.preprocessors["includepy"].manifest is None
@@ -0,0 +1,143 @@
+import pytest
+from includepy import IncludePyError, IncludePyProc, collect_directives
+from includepy.modindex import ModuleIndex, module_index
+
+
+def write_tree(root, files):
+    """
+    Write Python source files, given their paths relative to ``root``.
+    """
+    for name, text in files.items():
+        path = root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(text)
+
+
+def test_resolve_modules_and_packages(tmp_path):
+    """
+    Verify that modules, packages, and sub-modules are resolved, and that
+    packages take precedence over modules with the same name.
+    """
+    write_tree(
+        tmp_path,
+        {
+            "top.py": "",
+            "pkg/__init__.py": "",
+            "pkg/sub/__init__.py": "",
+            "pkg/sub/mod.py": "",
+            "pkg/sub.py": "",
+            "not-a-package/mod.py": "",
+        },
+    )
+    index = ModuleIndex([tmp_path])
+    root = tmp_path.resolve()
+    assert index.resolve("top") == root / "top.py"
+    assert index.resolve("pkg") == root / "pkg" / "__init__.py"
+    assert index.resolve("pkg.sub") == root / "pkg" / "sub" / "__init__.py"
+    assert index.resolve("pkg.sub.mod") == root / "pkg" / "sub" / "mod.py"
+    assert index.resolve("mod") is None
+    assert index.resolve("pkg.missing") is None
+
+
+def test_earlier_roots_take_precedence(tmp_path):
+    """
+    Verify that modules in earlier source roots take precedence.
+    """
+    write_tree(tmp_path, {"a/mod.py": "", "b/mod.py": "", "b/other.py": ""})
+    index = ModuleIndex([tmp_path / "a", tmp_path / "b"])
+    assert index.resolve("mod") == (tmp_path / "a" / "mod.py").resolve()
+    assert index.resolve("other") == (tmp_path / "b" / "other.py").resolve()
+
+
+def test_scan_once_and_rescan_on_miss(tmp_path):
+    """
+    Verify that the source roots are scanned once, and are scanned again
+    when a module cannot be found and a directory has changed.
+    """
+    write_tree(tmp_path, {"first.py": ""})
+    index = ModuleIndex([tmp_path])
+    for _ in range(10):
+        assert index.resolve("first") is not None
+    assert index.scans == 1
+
+    write_tree(tmp_path, {"second.py": ""})
+    assert index.resolve("second") == (tmp_path / "second.py").resolve()
+    assert index.scans == 2
+
+    # NOTE: invalid module names cannot be found by scanning again.
+    assert index.resolve("not a module") is None
+    assert index.scans == 2
+
+
+def test_no_rescan_for_missing_modules(tmp_path):
+    """
+    Verify that modules that cannot be found only cause another scan when a
+    directory in the source roots has changed.
+    """
+    write_tree(tmp_path, {"pkg/__init__.py": "", "pkg/first.py": ""})
+    index = ModuleIndex([tmp_path, tmp_path / "missing"])
+    for _ in range(10):
+        assert index.resolve("pkg.second") is None
+        assert index.resolve("other") is None
+    assert index.scans == 1
+
+    write_tree(tmp_path, {"pkg/second.py": ""})
+    expected = (tmp_path / "pkg" / "second.py").resolve()
+    assert index.resolve("pkg.second") == expected
+    assert index.scans == 2
+    assert index.resolve("other") is None
+    assert index.scans == 2
+
+    # Source roots that are created after a scan are also scanned.
+    write_tree(tmp_path / "missing", {"other.py": ""})
+    expected = (tmp_path / "missing" / "other.py").resolve()
+    assert index.resolve("other") == expected
+    assert index.scans == 3
+
+
+def test_shared_index(tmp_path):
+    """
+    Verify that each list of source roots has a single shared index.
+    """
+    assert module_index([tmp_path]) is module_index([str(tmp_path)])
+    assert module_index([tmp_path]) is not module_index([tmp_path / "x"])
+
+
+def test_pymodule_block(tmp_path):
+    """
+    Verify that a pymodule block produces the same output as an includepy
+    block for the same file.
+    """
+    source = "def hello():\n    return 'Hello'\n"
+    write_tree(tmp_path, {"pkg/__init__.py": "", "pkg/greet.py": source})
+    proc = IncludePyProc(config={"source_roots": [tmp_path]}, md=None)
+    by_name = proc.run(["-->pymodule<-- pkg.greet", "-->pyobject<-- hello"])
+    by_path = proc.run(
+        [
+            f"-->includepy<-- {tmp_path / 'pkg' / 'greet.py'}",
+            "-->pyobject<-- hello",
+        ]
+    )
+    assert by_name == ["def hello():", "    return 'Hello'"]
+    assert by_name == by_path
+
+    lines = ["-->pymodule<-- pkg.greet", "-->pyobject<-- hello", ""]
+    directives = collect_directives(lines, proc.module_index)
+    assert [d.python_file for d in directives] == [
+        (tmp_path / "pkg" / "greet.py").resolve()
+    ]
+
+
+def test_pymodule_errors(tmp_path):
+    """
+    Verify that unknown modules, and pymodule blocks without source roots,
+    raise an exception.
+    """
+    lines = ["-->pymodule<-- pkg.missing", "-->pyobject<-- hello"]
+    proc = IncludePyProc(config={"source_roots": [tmp_path]}, md=None)
+    with pytest.raises(IncludePyError, match="Could not find module"):
+        proc.run(lines)
+
+    proc = IncludePyProc(config={}, md=None)
+    with pytest.raises(IncludePyError, match="without any source roots"):
+        proc.run(lines)
@@ -0,0 +1,199 @@
+import logging
+import pytest
+from types import SimpleNamespace
+from includepy import (
+    DependencyManifest,
+    IncludePyError,
+    IncludePyProc,
+    ModuleCache,
+)
+from includepy.pages import PAGE_CACHE, PageCache
+
+
+def page_lines(py_file, pyobject):
+    """
+    Return a document that includes an object from a Python file.
+    """
+    return [
+        "# Title",
+        "",
+        "```py",
+        f"-->includepy<-- {py_file}",
+        f"-->pyobject<-- {pyobject}",
+        "```",
+    ]
+
+
+def processor(manifest=None):
+    """
+    Return a preprocessor with its own cache of parsed Python files.
+    """
+    proc = IncludePyProc(config={"manifest": manifest}, md=None)
+    proc.cache = ModuleCache()
+    return proc
+
+
+def test_page_cache_unchanged(tmp_path, write_module):
+    """
+    Verify that unchanged documents are returned from the cache, and that
+    the output is identical to processing the document.
+    """
+    py_file = write_module(tmp_path / "module.py", 1)
+    proc = processor()
+    pages = PageCache()
+    lines = page_lines(py_file, "First")
+    expected = proc.run(lines)
+
+    assert pages.lookup(proc, lines) is None
+    assert pages.run(proc, lines) == expected
+    assert pages.run(proc, lines) == expected
+    assert pages.run(proc, list(lines)) == expected
+    info = pages.cache_info()
+    assert info.hits == 2
+    assert info.misses == 2
+    assert info.entries == 1
+
+    # The cached lines cannot be modified by the caller.
+    output = pages.lookup(proc, lines)
+    output.clear()
+    assert pages.lookup(proc, lines) == expected
+
+    # Documents without any IncludePy blocks are also cached.
+    assert pages.run(proc, ["No code here."]) == ["No code here."]
+    assert pages.lookup(proc, ["No code here."]) == ["No code here."]
+
+
+def test_page_cache_changed_code(tmp_path, write_module):
+    """
+    Verify that documents are processed again when the code that they
+    include has changed, but not when other code in the same file changes.
+    """
+    py_file = write_module(tmp_path / "module.py", 1)
+    proc = processor()
+    pages = PageCache()
+    first = page_lines(py_file, "First")
+    second = page_lines(py_file, "Second")
+    pages.run(proc, first)
+    pages.run(proc, second)
+
+    write_module(py_file, 10)
+    assert pages.lookup(proc, second) is not None
+    assert pages.lookup(proc, first) is None
+    output = pages.run(proc, first)
+    assert "        return 10" in output
+    assert output == proc.run(first)
+    assert pages.lookup(proc, first) == output
+
+
+def test_page_cache_changed_page(tmp_path, write_module):
+    """
+    Verify that modified documents are processed again.
+    """
+    py_file = write_module(tmp_path / "module.py", 1)
+    proc = processor()
+    pages = PageCache()
+    lines = page_lines(py_file, "First")
+    pages.run(proc, lines)
+    lines[0] = "# New title"
+    assert pages.lookup(proc, lines) is None
+    assert pages.run(proc, lines)[0] == "# New title"
+
+
+def test_page_cache_invalid_block(tmp_path, write_module, write_source):
+    """
+    Verify that documents with invalid blocks raise an exception and are
+    not cached, and that cached documents are not used when their blocks can
+    no longer be rendered.
+    """
+    py_file = write_module(tmp_path / "module.py", 1)
+    proc = processor()
+    pages = PageCache()
+    lines = page_lines(py_file, "Third")
+    with pytest.raises(IncludePyError, match="Found 0 matches for Third"):
+        pages.run(proc, lines)
+    assert len(pages) == 0
+
+    lines = page_lines(py_file, "First")
+    pages.run(proc, lines)
+    write_source(py_file, "class Other:\n    pass\n")
+    assert pages.lookup(proc, lines) is None
+    with pytest.raises(IncludePyError, match="Found 0 matches for First"):
+        pages.run(proc, lines)
+
+
+def test_page_cache_manifest(tmp_path, write_module):
+    """
+    Verify that the blocks in a cached document are recorded in the
+    dependency manifest.
+    """
+    py_file = write_module(tmp_path / "module.py", 1)
+    manifest = DependencyManifest()
+    proc = processor(manifest)
+    pages = PageCache()
+    proc.page = "index.md"
+    lines = page_lines(py_file, "First")
+    pages.run(proc, lines)
+    recorded = manifest.pages["index.md"]
+    assert len(recorded) == 1
+
+    manifest.forget("index.md")
+    assert pages.lookup(proc, lines) is not None
+    assert manifest.pages["index.md"] == recorded
+
+
+def test_page_cache_evict(tmp_path):
+    """
+    Verify that the least-recently-used documents are discarded.
+    """
+    proc = processor()
+    pages = PageCache(max_entries=2)
+    for n in range(3):
+        pages.run(proc, [f"Document {n}"])
+    assert len(pages) == 2
+    assert pages.lookup(proc, ["Document 0"]) is None
+    assert pages.lookup(proc, ["Document 2"]) == ["Document 2"]
+
+    pages.configure(max_entries=1)
+    assert len(pages) == 1
+    pages.clear()
+    assert pages.cache_info() == (0, 0, 0, 1)
+
+
+def test_plugin(tmp_path, caplog, write_module):
+    """
+    Verify that the MkDocs plugin expands each page, and reports the pages
+    that were not processed again.
+    """
+    pytest.importorskip("mkdocs")
+    from mkdocs.config import load_config
+    from includepy.plugin import IncludePyPlugin
+
+    py_file = write_module(tmp_path / "module.py", 1)
+    (tmp_path / "docs").mkdir()
+    config_file = tmp_path / "mkdocs.yml"
+    config_file.write_text(
+        "site_name: Test\n"
+        "markdown_extensions:\n"
+        "  - includepy:\n"
+        "      executor: none\n"
+    )
+    lines = page_lines(py_file, "First")
+    expected = "\n".join(processor().run(lines))
+    page = SimpleNamespace(file=SimpleNamespace(src_uri="index.md"))
+    PAGE_CACHE.clear()
+
+    for skipped in (0, 1):
+        config = load_config(str(config_file))
+        plugin = IncludePyPlugin()
+        plugin.load_config({})
+        config = plugin.on_config(config)
+        assert "includepy" not in config.markdown_extensions
+        assert "includepy" not in config.mdx_configs
+        plugin.on_pre_build(config=config)
+        output = plugin.on_page_markdown(
+            "\n".join(lines), page=page, config=config, files=None
+        )
+        assert output == expected
+        with caplog.at_level(logging.INFO, "mkdocs.plugins.includepy"):
+            plugin.on_post_build(config=config)
+        assert f"skipped {skipped} unchanged pages out of 1" in caplog.text
@@ -0,0 +1,39 @@
+import os
+from includepy import pool
+
+
+def worker_settings():
+    """
+    Return the settings of the preprocessor used by a worker process.
+    """
+    proc = pool.processor()
+    return os.getpid(), proc.executor, proc.module_index is not None
+
+
+def test_worker_pool_in_process(tmp_path):
+    """
+    Verify that a single worker configures the preprocessor for this
+    process, and that worker processes never load files in parallel.
+    """
+    config = pool.default_config(source_roots=[str(tmp_path)])
+    with pool.worker_pool(config, 1) as executor:
+        assert executor is None
+        assert worker_settings() == (os.getpid(), None, True)
+    assert pool.worker_count(0) == (os.cpu_count() or 1)
+    assert pool.worker_count(3) == 3
+
+
+def test_worker_pool_processes(tmp_path):
+    """
+    Verify that each worker process uses a preprocessor with the given
+    settings.
+    """
+    config = pool.default_config(
+        executor="thread", workers=4, source_roots=[str(tmp_path)]
+    )
+    with pool.worker_pool(config, 2) as executor:
+        assert executor is not None
+        futures = [executor.submit(worker_settings) for _ in range(4)]
+        results = [future.result() for future in futures]
+    assert all(pid != os.getpid() for pid, _, _ in results)
+    assert [result[1:] for result in results] == [(None, True)] * 4
@@ -0,0 +1,72 @@
+import pytest
+from includepy import MODULE_CACHE, ModuleCache
+from includepy.prewarm import prewarm
+from includepy.__main__ import main
+from includepy.diskindex import DiskIndex
+
+
+def write_site(tmp_path):
+    """
+    Write a tree of Markdown files that include code from Python files.
+    """
+    src = tmp_path / "src"
+    src.mkdir()
+    (src / "first.py").write_text("def one():\n    return 1\n")
+    (src / "second.py").write_text(
+        "class Two:\n    def value(self):\n        return 2\n"
+    )
+    docs = tmp_path / "docs"
+    (docs / "nested").mkdir(parents=True)
+    (docs / "index.md").write_text(
+        "# Index\n\n```py\n-->includepy<-- src/first.py\n"
+        "-->pyobject<-- one\n```\n"
+    )
+    (docs / "nested" / "page.md").write_text(
+        "```py\n-->includepy<-- src/second.py\n-->pyobject<-- Two.value\n"
+        "-->includepy<-- src/first.py\n-->pyobject<-- one\n"
+        "-->includepy<-- src/first.py\n-->pyobject<-- missing\n```\n"
+    )
+    (docs / "notes.txt").write_text("-->includepy<-- src/missing.py\n")
+    return docs
+
+
+@pytest.mark.parametrize("executor", ["none", "thread", "process"])
+def test_prewarm_loads_included_files(tmp_path, monkeypatch, executor):
+    """
+    Verify that prewarming loads each included Python file once.
+    """
+    docs = write_site(tmp_path)
+    monkeypatch.chdir(tmp_path)
+    cache = ModuleCache()
+    result = prewarm([docs], cache=cache, executor=executor, workers=2)
+    assert result.markdown_files == 2
+    assert result.python_files == 2
+    assert result.objects == 2
+    assert result.errors == 1
+    assert cache.cache_info().misses == 2
+    assert len(cache) == 2
+
+
+def test_prewarm_command(tmp_path, monkeypatch, capsys):
+    """
+    Verify that the prewarm command records included Python files in the
+    persistent index.
+    """
+    docs = write_site(tmp_path)
+    cache_dir = tmp_path / "cache"
+    monkeypatch.chdir(tmp_path)
+    try:
+        status = main(["prewarm", str(docs), "--cache-dir", str(cache_dir)])
+    finally:
+        MODULE_CACHE.configure(cache_dir="")
+        MODULE_CACHE.clear()
+    assert status == 0
+    output = capsys.readouterr().out
+    assert output.startswith(
+        "Warmed 2 Python files and 2 objects from 2 Markdown files"
+    )
+    assert "Could not load 1 Python files or objects" in output
+
+    index = DiskIndex(cache_dir)
+    for name in ["first.py", "second.py"]:
+        assert index.load_path(tmp_path / "src" / name) is not None
@@ -0,0 +1,162 @@
+import ast
+import pytest
+import textwrap
+from itertools import accumulate
+from pathlib import Path
+from includepy import (
+    IncludePyError,
+    IncludePyProc,
+    ModuleCache,
+    find_object,
+    index_symbols,
+    lookup_symbol,
+)
+from includepy.scanner import Scanner
+
+
+def corpus_files():
+    """
+    Return the Python standard library modules, as a large corpus of source
+    files.
+    """
+    stdlib_dir = Path(ast.__file__).parent
+    return sorted(stdlib_dir.glob("*.py"))
+
+
+def scanner_for(data):
+    """
+    Return a scanner for the contents of a Python source file.
+    """
+    offsets = list(accumulate(map(len, data.splitlines(True)), initial=0))
+    return Scanner(data, offsets, "utf-8")
+
+
+def scan_lookup(scanner, name):
+    """
+    Return the location of a named object, as found by the scanner.
+    """
+    found = scanner.scan(name.split(".")[0])
+    assert found is not None
+    loc = lookup_symbol(name, found)
+    return (loc[0], loc[1], loc[2])
+
+
+@pytest.mark.parametrize("py_file", corpus_files(), ids=lambda p: p.name)
+def test_scanner_matches_find_object(py_file):
+    """
+    Verify that the scanner locates every named object at the same lines as
+    ``find_object``.
+    """
+    data = py_file.read_bytes()
+    try:
+        tree = ast.parse(data)
+    except SyntaxError:
+        pytest.skip("Invalid syntax")
+    if not Scanner.supports(data, "utf-8"):
+        pytest.skip("Unsupported line endings")
+
+    scanner = scanner_for(data)
+    scanned = {}
+    for name in index_symbols(tree):
+        top_name = name.split(".")[0]
+        if top_name not in scanned:
+            scanned[top_name] = scanner.scan(top_name)
+        found = scanned[top_name]
+        assert found is not None
+        try:
+            node = find_object(name, tree)
+        except IncludePyError as e:
+            with pytest.raises(IncludePyError, match=str(e)):
+                lookup_symbol(name, found)
+            continue
+        expected = (node.lineno, node.end_lineno, node.col_offset)
+        assert lookup_symbol(name, found) == expected
+
+
+def test_scanner_ignores_strings():
+    """
+    Verify that the scanner ignores definitions inside string literals.
+    """
+    data = textwrap.dedent(
+        '''\
+        """
+        def func():
+            pass
+        """
+        text = \'\'\'
+        def func(): \\\'\'\'
+        \'\'\'
+
+
+        def func():
+            return "def func():"  # def func():
+        '''
+    ).encode()
+    scanner = scanner_for(data)
+    assert scan_lookup(scanner, "func") == (10, 11, 0)
+
+
+def test_scanner_ambiguous_definitions():
+    """
+    Verify that the scanner declines to locate duplicate objects, and objects
+    that it cannot locate with certainty.
+    """
+    data = textwrap.dedent(
+        """\
+        def func():
+            pass
+
+
+        def func():
+            pass
+
+
+        class Other: pass
+        """
+    ).encode()
+    scanner = scanner_for(data)
+    assert scanner.scan("func") is None
+    assert scanner.scan("missing") is None
+    assert scan_lookup(scanner, "Other") == (9, 9, 0)
+
+
+def test_scanner_unterminated_string():
+    """
+    Verify that the scanner declines to locate objects after an unterminated
+    string literal.
+    """
+    data = b'x = "unterminated\n\ndef func():\n    pass\n'
+    scanner = Scanner(data, [0, 18, 19, 31, 40], "utf-8")
+    assert scanner.scan("func") is None
+
+
+def test_scan_threshold_avoids_parsing(tmp_path, monkeypatch):
+    """
+    Verify that large files are not parsed, and that files are parsed when
+    the scanner cannot locate an object.
+    """
+    py_file = tmp_path / "large.py"
+    py_file.write_text(
+        "".join(f"def func_{i}():\n    return {i}\n\n\n" for i in range(100))
+        + "class Twice:\n    pass\n\n\nclass Twice:\n    pass\n"
+    )
+    cache = ModuleCache(scan_threshold=1)
+    proc = IncludePyProc(config={}, md=None)
+    proc.cache = cache
+
+    real_parse = ast.parse
+    parsed = []
+
+    def parse(*args, **kwargs):
+        parsed.append(args)
+        return real_parse(*args, **kwargs)
+
+    monkeypatch.setattr(ast, "parse", parse)
+    lines = [f"-->includepy<-- {py_file}", "-->pyobject<-- func_42"]
+    assert proc.run(lines) == ["def func_42():", "    return 42"]
+    assert parsed == []
+
+    lines = [f"-->includepy<-- {py_file}", "-->pyobject<-- Twice"]
+    with pytest.raises(IncludePyError, match="Found 2 matches for Twice"):
+        proc.run(lines)
+    assert len(parsed) == 1
@@ -0,0 +1,79 @@
+import pytest
+from includepy import IncludePyError, IncludePyProc, SNIPPET_CACHE
+
+
+BLOCK = [
+    "-->includepy<-- example.py",
+    "-->pyobject<-- MyClass.do_thing",
+    "-->extra_indent<-- 2",
+]
+
+
+def test_snippets_shared_between_documents():
+    """
+    Verify that rendered blocks are reused by other documents.
+    """
+    SNIPPET_CACHE.clear()
+    proc = IncludePyProc(config={}, md=None)
+    first = proc.run(["Text", *BLOCK])
+    second = IncludePyProc(config={}, md=None).run([*BLOCK, "Text"])
+    assert first[1:] == second[:-1]
+
+    info = SNIPPET_CACHE.cache_info()
+    assert info.misses == 1
+    assert info.hits == 1
+    assert info.entries == 1
+
+
+def test_snippets_normalised_options():
+    """
+    Verify that equivalent option values share the same rendered block.
+    """
+    SNIPPET_CACHE.clear()
+    proc = IncludePyProc(config={}, md=None)
+    first = proc.run(BLOCK)
+    second = proc.run([*BLOCK[:2], "-->extra_indent<-- 02"])
+    assert first == second
+    assert SNIPPET_CACHE.cache_info().hits == 1
+
+
+def test_snippets_depend_on_indentation():
+    """
+    Verify that blocks with different indentation are rendered separately.
+    """
+    SNIPPET_CACHE.clear()
+    proc = IncludePyProc(config={}, md=None)
+    output = proc.run(BLOCK + ["    " + line for line in BLOCK])
+    n_lines = len(output) // 2
+    assert output[n_lines:] == ["    " + line for line in output[:n_lines]]
+    assert SNIPPET_CACHE.cache_info().misses == 2
+
+
+def test_duplicate_blocks_rendered_once():
+    """
+    Verify that identical blocks in the same document are only rendered
+    once.
+    """
+    SNIPPET_CACHE.clear()
+    proc = IncludePyProc(config={}, md=None)
+    output = proc.run(BLOCK + ["Text"] + BLOCK + BLOCK)
+    n_lines = (len(output) - 1) // 3
+    assert output[:n_lines] == output[n_lines + 1 : 2 * n_lines + 1]
+    assert output[:n_lines] == output[2 * n_lines + 1 :]
+
+    info = SNIPPET_CACHE.cache_info()
+    assert info.misses == 1
+    assert info.hits == 0
+
+
+def test_snippets_invalid_options():
+    """
+    Verify that invalid option values raise exceptions, and are not cached.
+    """
+    SNIPPET_CACHE.clear()
+    proc = IncludePyProc(config={}, md=None)
+    with pytest.raises(
+        IncludePyError, match="extra_indent cannot be negative"
+    ):
+        proc.run([*BLOCK[:2], "-->extra_indent<-- -2"])
+    assert len(SNIPPET_CACHE) == 0
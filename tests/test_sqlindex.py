@@ -0,0 +1,138 @@
+import ast
+import multiprocessing
+import pytest
+import threading
+from includepy import IncludePyError, ModuleCache, SourceModule
+from includepy.diskindex import DiskIndex
+from includepy.sqlindex import SqliteIndex
+from includepy.stats import STATS
+
+
+N_PROCESSES = 4
+N_FILES = 3
+
+
+def write_modules(tmp_path):
+    """
+    Write several Python source files with different contents.
+    """
+    paths = []
+    for i in range(N_FILES):
+        path = tmp_path / f"module_{i}.py"
+        path.write_text(
+            "".join(
+                f"def func_{j}(x):\n    return x * {i} + {j}\n\n\n"
+                for j in range(2000)
+            )
+        )
+        paths.append(path)
+    return paths
+
+
+def test_sqlite_warm_start(tmp_path, monkeypatch):
+    """
+    Verify that a new cache reuses the SQLite index without parsing the
+    source file.
+    """
+    (path,) = write_modules(tmp_path)[:1]
+    module = ModuleCache(index=SqliteIndex(tmp_path / "cache")).get(path)
+    expected = module.lookup("func_42")
+
+    def parse(*args, **kwargs):
+        raise AssertionError("Source code was parsed")
+
+    monkeypatch.setattr(ast, "parse", parse)
+    cache = ModuleCache(index=SqliteIndex(tmp_path / "cache"))
+    assert cache.get(path).lookup("func_42") == expected
+    assert (tmp_path / "cache" / "index.sqlite3").exists()
+    assert not list((tmp_path / "cache").glob("v*"))
+
+
+def test_sqlite_claims(tmp_path):
+    """
+    Verify that only one caller can claim a content hash, that other callers
+    wait for its entry, and that abandoned claims can be taken over.
+    """
+    (path,) = write_modules(tmp_path)[:1]
+    module = SourceModule.load(path.resolve())
+    first = SqliteIndex(tmp_path / "cache")
+    second = SqliteIndex(tmp_path / "cache")
+    assert first.claim(module.digest)
+    assert not second.claim(module.digest)
+
+    def publish():
+        first.store_module(module.entry())
+        first.release(module.digest)
+
+    timer = threading.Timer(0.05, publish)
+    timer.start()
+    entry = second.wait_module(module.digest)
+    timer.join()
+    assert entry is not None
+    assert entry["digest"] == module.digest
+
+    # NOTE: released claims can be claimed again.
+    assert second.claim(module.digest)
+    second.release(module.digest)
+
+    assert first.claim("abandoned")
+    assert not second.claim("abandoned")
+    assert SqliteIndex(tmp_path / "cache", claim_timeout=0).claim("abandoned")
+
+
+def test_sqlite_export(tmp_path):
+    """
+    Verify that a SQLite index can be exported and imported into an index
+    that is stored as files.
+    """
+    (path,) = write_modules(tmp_path)[:1]
+    ModuleCache(index=SqliteIndex(tmp_path / "cache")).get(path)
+    archive = tmp_path / "index.tar.gz"
+    assert SqliteIndex(tmp_path / "cache").export_archive(archive) == 1
+    index = DiskIndex(tmp_path / "files")
+    assert index.import_archive(archive) == 1
+    assert len(list(index.root.glob("modules/*.json"))) == 1
+
+
+def test_cache_backend_option(tmp_path):
+    """
+    Verify that the cache backend can be selected, and that invalid backends
+    raise an exception.
+    """
+    cache = ModuleCache()
+    cache.configure(cache_dir=tmp_path, cache_backend="sqlite")
+    assert type(cache.index) is SqliteIndex
+    cache.configure(cache_backend="files")
+    assert type(cache.index) is DiskIndex
+    assert cache.index.cache_dir == tmp_path
+    with pytest.raises(IncludePyError, match="Invalid cache backend"):
+        cache.configure(cache_backend="redis")
+
+
+def test_sqlite_parse_once(tmp_path):
+    """
+    Verify that when several processes load the same source files at the
+    same time, each source file is only parsed once.
+    """
+    paths = write_modules(tmp_path)
+    cache_dir = tmp_path / "cache"
+    ctx = multiprocessing.get_context("fork")
+    barrier = ctx.Barrier(N_PROCESSES)
+    results = ctx.Queue()
+
+    def worker():
+        STATS.reset()
+        STATS.enabled = True
+        cache = ModuleCache(index=SqliteIndex(cache_dir))
+        barrier.wait()
+        for path in paths:
+            cache.get(path).lookup("func_1")
+        results.put(STATS.snapshot().counts["parses"])
+
+    processes = [ctx.Process(target=worker) for _ in range(N_PROCESSES)]
+    for process in processes:
+        process.start()
+    parses = [results.get(timeout=60) for _ in processes]
+    for process in processes:
+        process.join()
+    assert sum(parses) == N_FILES
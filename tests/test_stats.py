@@ -0,0 +1,140 @@
+import logging
+import markdown
+import pytest
+import textwrap
+from includepy import (
+    IncludePy,
+    IncludePyProc,
+    ModuleCache,
+    SnippetCache,
+    log_stats,
+)
+from includepy.pages import PAGE_CACHE
+from includepy.stats import COUNTERS, STATS, TIMERS
+
+
+@pytest.fixture
+def stats():
+    """
+    Enable build statistics for a single test.
+    """
+    STATS.reset()
+    yield STATS
+    STATS.enabled = False
+    STATS.reset()
+
+
+def test_stats_disabled_by_default():
+    """
+    Verify that no statistics are collected unless they are enabled.
+    """
+    STATS.reset()
+    proc = IncludePyProc(config={}, md=None)
+    proc.run(["-->includepy<-- example.py", "-->pyobject<-- factorial"])
+    snapshot = IncludePy.stats()
+    assert set(snapshot.counts) == set(COUNTERS)
+    assert set(snapshot.times) == set(TIMERS)
+    assert not any(snapshot.counts.values())
+    assert not any(snapshot.times.values())
+
+
+def test_stats_count_build_events(stats, tmp_path):
+    """
+    Verify that enabling statistics records each event and operation.
+    """
+    py_file = tmp_path / "module.py"
+    py_file.write_text(
+        "def first():\n    return 1\n\n\ndef second():\n    pass\n"
+    )
+    text = textwrap.dedent(
+        f"""
+        ```py
+        -->includepy<-- {py_file}
+        -->pyobject<-- first
+        -->includepy<-- {py_file}
+        -->pyobject<-- second
+        -->includepy<-- {py_file}
+        -->pyobject<-- first
+        ```
+        """
+    )
+    md = markdown.Markdown(extensions=[IncludePy(stats=True), "fenced_code"])
+    proc = md.preprocessors["includepy"]
+    proc.cache = ModuleCache()
+    proc.snippets = SnippetCache()
+    md.convert(text)
+    md.reset()
+    md.convert("No code here.")
+
+    snapshot = IncludePy.stats()
+    counts = snapshot.counts
+    assert counts["documents"] == 2
+    assert counts["directives"] == 3
+    assert counts["files_opened"] == 1
+    assert counts["bytes_read"] == py_file.stat().st_size
+    assert counts["parses"] == 1
+    assert counts["scans"] == 0
+    assert counts["module_misses"] == 1
+    assert counts["module_hits"] == 1
+    assert counts["snippet_misses"] == 2
+    assert counts["snippet_hits"] == 0
+    assert all(snapshot.times[name] > 0 for name in TIMERS)
+    assert snapshot.summary().startswith("includepy: documents=2,")
+
+
+def test_log_stats(stats, caplog):
+    """
+    Verify that the statistics summary is logged.
+    """
+    stats.enabled = True
+    stats.count("directives", 5)
+    with caplog.at_level(logging.INFO, logger="includepy"):
+        log_stats()
+    assert "directives=5" in caplog.text
+
+    # Nothing is logged when no statistics have been recorded.
+    caplog.clear()
+    stats.reset()
+    with caplog.at_level(logging.INFO, logger="includepy"):
+        log_stats()
+    assert caplog.text == ""
+
+
+def test_log_stats_after_build(stats, tmp_path, caplog, build_site):
+    """
+    Verify that the MkDocs plugin logs the statistics summary after each
+    build, and resets the statistics for the next build.
+    """
+    PAGE_CACHE.clear()
+    py_file = tmp_path / "module.py"
+    py_file.write_text("def first():\n    return 1\n")
+    pages = {
+        "index.md": [
+            "# Title",
+            "",
+            "```py",
+            f"-->includepy<-- {py_file}",
+            "-->pyobject<-- first",
+            "```",
+        ],
+        "other.md": ["No code here."],
+    }
+    # Statistics recorded before the build are not included.
+    stats.count("directives", 5)
+    # The second build uses the cached pages, so no documents are processed.
+    for expected in (
+        "documents=2, directives=1,",
+        "documents=0, directives=0,",
+    ):
+        caplog.clear()
+        with caplog.at_level(logging.INFO, "mkdocs.plugins.includepy"):
+            build_site(pages, log_stats=True, executor="none")
+        summaries = [
+            record.getMessage()
+            for record in caplog.records
+            if record.name == "mkdocs.plugins.includepy"
+            and record.getMessage().startswith("includepy: documents=")
+        ]
+        assert len(summaries) == 1
+        assert expected in summaries[0]
+        assert not any(STATS.snapshot().counts.values())
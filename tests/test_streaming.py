@@ -0,0 +1,91 @@
+import pytest
+from includepy import DependencyManifest, IncludePyError, IncludePyProc
+
+
+def document(n_blocks):
+    """
+    Return a document with text and code blocks that include functions from
+    the example file.
+    """
+    lines = []
+    for ix in range(n_blocks):
+        lines.extend(
+            [
+                f"Paragraph {ix}.",
+                "",
+                "```py",
+                "-->includepy<-- example.py",
+                "-->pyobject<-- factorial"
+                if ix % 2
+                else "-->pyobject<-- hello",
+                "```",
+                "",
+            ]
+        )
+    return lines
+
+
+def test_iter_process_matches_run(process_each_line):
+    """
+    Verify that streaming produces the same output as :meth:`run`.
+    """
+    lines = document(10)
+    proc = IncludePyProc(config={}, md=None)
+    assert list(proc.iter_process(lines)) == proc.run(lines)
+    assert list(proc.iter_process(iter(lines))) == process_each_line(lines)
+
+
+def test_iter_process_is_lazy():
+    """
+    Verify that lines are yielded before the entire input has been read.
+    """
+    consumed = []
+
+    def source():
+        for line in document(1000):
+            consumed.append(line)
+            yield line
+        raise AssertionError("The entire document was read")
+
+    proc = IncludePyProc(config={}, md=None)
+    output = proc.iter_process(source())
+    first = [next(output) for _ in range(4)]
+    assert first[:3] == ["Paragraph 0.", "", "```py"]
+    assert first[3].startswith("def hello")
+    # NOTE: the first block ends when the closing fence is read.
+    assert len(consumed) == 6
+    output.close()
+
+
+def test_iter_process_does_not_retain_blocks():
+    """
+    Verify that the default renderer does not retain rendered blocks, and
+    still records the dependencies of each block.
+    """
+    lines = document(4)
+    memo_manifest = DependencyManifest()
+    proc = IncludePyProc(config={"manifest": memo_manifest}, md=None)
+    proc.page = "page.md"
+    proc.run(lines)
+
+    stream_manifest = DependencyManifest()
+    proc.manifest = stream_manifest
+    renderer = proc.renderer()
+    renderer.memo = False
+    list(proc.iter_process(lines, renderer))
+    assert renderer.rendered == {}
+    assert stream_manifest.pages == memo_manifest.pages
+    assert len(stream_manifest.pages["page.md"]) == 2
+
+
+def test_iter_process_raises_in_order(process_each_line):
+    """
+    Verify that errors are raised when the invalid block is reached.
+    """
+    lines = [*document(2), "-->includepy<-- example.py", "-->bad<-- x"]
+    proc = IncludePyProc(config={}, md=None)
+    output = proc.iter_process(lines)
+    expected = process_each_line(document(2))
+    assert [next(output) for _ in expected] == expected
+    with pytest.raises(IncludePyError, match="Invalid option bad"):
+        next(output)
@@ -0,0 +1,80 @@
+import ast
+import pytest
+from includepy import (
+    IncludePyError,
+    find_object,
+    index_symbols,
+    lookup_symbol,
+)
+
+
+SOURCE = """\
+def outer():
+    def inner():
+        pass
+
+    return inner
+
+
+class Outer:
+    class Inner:
+        def method(self):
+            pass
+
+    async def method(self):
+        pass
+
+
+if True:
+    def hidden():
+        pass
+
+
+class Twice:
+    def unique(self):
+        pass
+
+
+class Twice:
+    pass
+"""
+
+
+def test_symbol_table_matches_find_object():
+    """
+    Verify that symbol table lookups return the same location as
+    ``find_object`` for every named object.
+    """
+    tree = ast.parse(SOURCE)
+    symbols = index_symbols(tree)
+    names = ["outer", "outer.inner", "Outer", "Outer.Inner"]
+    names += ["Outer.Inner.method", "Outer.method"]
+    for name in names:
+        node = find_object(name, tree)
+        loc = lookup_symbol(name, symbols)
+        assert loc == (node.lineno, node.end_lineno, node.col_offset)
+
+
+@pytest.mark.parametrize(
+    "name",
+    ["hidden", "Twice", "Twice.unique", "missing", "Outer.missing", "a..b"],
+)
+def test_symbol_table_errors_match_find_object(name):
+    """
+    Verify that symbol table lookups raise the same errors as
+    ``find_object``.
+    """
+    tree = ast.parse(SOURCE)
+    symbols = index_symbols(tree)
+    with pytest.raises(IncludePyError) as expected:
+        find_object(name, tree)
+    with pytest.raises(IncludePyError, match=str(expected.value)):
+        lookup_symbol(name, symbols)
+
+
+def test_symbol_table_no_object():
+    """
+    Verify that a missing object name raises an exception.
+    """
+    with pytest.raises(IncludePyError, match="No Python object specified"):
+        lookup_symbol(None, {})
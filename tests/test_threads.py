@@ -0,0 +1,78 @@
+import threading
+from includepy import IncludePyProc, ModuleCache, SnippetCache
+
+
+N_THREADS = 16
+N_FILES = 4
+
+# The functions that are included from each source file.
+NAMES = [f"func_{j}" for j in range(0, 200, 20)]
+
+
+def hammer(proc, lines, n_rounds):
+    """
+    Process a document from many threads at once, and return the outputs.
+    """
+    barrier = threading.Barrier(N_THREADS)
+    outputs = []
+    errors = []
+
+    def worker():
+        try:
+            barrier.wait()
+            for _ in range(n_rounds):
+                outputs.append(proc.run(lines))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker) for _ in range(N_THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    return outputs
+
+
+def test_concurrent_rendering_loads_once(write_modules, include_document):
+    """
+    Verify that concurrent requests for the same source files only load
+    each version of each file once.
+    """
+    paths = write_modules(N_FILES, functions=200, value=1)
+    lines = include_document(paths, NAMES)
+    proc = IncludePyProc(config={}, md=None)
+    proc.cache = ModuleCache()
+    proc.snippets = SnippetCache()
+
+    outputs = hammer(proc, lines, n_rounds=5)
+    assert len(outputs) == N_THREADS * 5
+    assert all(output == outputs[0] for output in outputs)
+    assert proc.cache.cache_info().loads == N_FILES
+
+    # When every file changes, each new version is only loaded once.
+    write_modules(N_FILES, functions=200, value=2)
+    new_outputs = hammer(proc, lines, n_rounds=5)
+    assert all(output == new_outputs[0] for output in new_outputs)
+    assert new_outputs[0] != outputs[0]
+    assert proc.cache.cache_info().loads == 2 * N_FILES
+
+
+def test_concurrent_scanning(
+    write_modules, include_document, process_each_line
+):
+    """
+    Verify that concurrent lookups in a large source file, which locate
+    objects on demand, return the correct objects.
+    """
+    (path,) = write_modules(1, functions=200)
+    proc = IncludePyProc(config={}, md=None)
+    proc.cache = ModuleCache(scan_threshold=100)
+    proc.snippets = SnippetCache()
+    lines = include_document([path], NAMES)
+    outputs = hammer(proc, lines, n_rounds=3)
+    module = proc.cache.get(path)
+    assert module.scanner is not None
+    expected = process_each_line(lines)
+    assert all(output == expected for output in outputs)
+    assert proc.cache.cache_info().loads == 1
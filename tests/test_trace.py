@@ -0,0 +1,123 @@
+import json
+import os
+import pytest
+import threading
+from includepy import IncludePyProc, ModuleCache, SnippetCache
+from includepy.pages import PAGE_CACHE
+from includepy.trace import TRACER
+
+
+@pytest.fixture
+def tracer():
+    """
+    Ensure that tracing is disabled after a single test.
+    """
+    yield TRACER
+    TRACER.stop()
+    TRACER.path = None
+
+
+def test_trace_spans(tracer, tmp_path):
+    """
+    Verify that the trace contains spans for documents, directives, and
+    source files, across multiple threads.
+    """
+    py_file = tmp_path / "module.py"
+    py_file.write_text("def first():\n    return 1\n")
+    trace_file = tmp_path / "trace-{pid}.json"
+    proc = IncludePyProc(config={"trace_file": str(trace_file)}, md=None)
+    proc.cache = ModuleCache()
+    proc.snippets = SnippetCache()
+    proc.page = "index.md"
+    lines = [f"-->includepy<-- {py_file}", "-->pyobject<-- first"]
+
+    thread = threading.Thread(target=proc.run, args=(lines,), name="worker")
+    thread.start()
+    thread.join()
+    proc.run(lines)
+    tracer.write()
+
+    trace_path = tmp_path / f"trace-{os.getpid()}.json"
+    trace = json.loads(trace_path.read_text())
+    events = trace["traceEvents"]
+    spans = [event for event in events if event["ph"] == "X"]
+    names = [span["name"] for span in spans]
+    assert names.count("run") == 2
+    assert names.count("directive") == 2
+    assert names.count("read") == 1
+    assert names.count("parse") == 1
+
+    [read] = [span for span in spans if span["name"] == "read"]
+    assert read["args"]["path"] == str(py_file.resolve())
+    directive = next(span for span in spans if span["name"] == "directive")
+    assert directive["args"] == {
+        "page": "index.md",
+        "path": str(py_file),
+        "pyobject": "first",
+    }
+    run = next(span for span in spans if span["name"] == "run")
+    assert run["args"] == {"page": "index.md"}
+    assert run["dur"] >= directive["dur"] >= 0
+
+    thread_names = {
+        event["args"]["name"] for event in events if event["ph"] == "M"
+    }
+    assert "worker" in thread_names
+    assert len({span["tid"] for span in spans}) == 2
+
+
+def test_trace_environment_variable(tracer, tmp_path, monkeypatch):
+    """
+    Verify that tracing can be enabled with an environment variable, and is
+    disabled by default.
+    """
+    IncludePyProc(config={}, md=None)
+    assert not tracer.enabled
+    with tracer.span("run", "document"):
+        pass
+    assert tracer.events == []
+
+    trace_file = tmp_path / "trace.json"
+    monkeypatch.setenv("INCLUDEPY_TRACE", str(trace_file))
+    IncludePyProc(config={}, md=None)
+    assert tracer.enabled
+    assert tracer.path == trace_file
+
+
+def test_trace_each_build(tracer, tmp_path, build_site):
+    """
+    Verify that the MkDocs plugin records the name of each page, and writes
+    and discards the spans after each build.
+    """
+    PAGE_CACHE.clear()
+    py_file = tmp_path / "module.py"
+    py_file.write_text("def first():\n    return 1\n")
+    trace_file = tmp_path / "trace.json"
+    index = [
+        "# Title",
+        "",
+        "```py",
+        f"-->includepy<-- {py_file}",
+        "-->pyobject<-- first",
+        "```",
+    ]
+    pages = {"index.md": index, "other.md": ["No code here."]}
+
+    # The second build only processes the page that has changed.
+    for expected in (["index.md", "other.md"], ["index.md"]):
+        build_site(pages, trace_file=str(trace_file), executor="none")
+        assert tracer.events == []
+        spans = [
+            event
+            for event in json.loads(trace_file.read_text())["traceEvents"]
+            if event["ph"] == "X"
+        ]
+        runs = [
+            span["args"]["page"] for span in spans if span["name"] == "run"
+        ]
+        assert sorted(runs) == expected
+        directive = next(
+            span for span in spans if span["name"] == "directive"
+        )
+        assert directive["args"]["page"] == "index.md"
+        pages["index.md"] = ["# New title"] + index[1:]
@@ -0,0 +1,181 @@
+import logging
+import pytest
+import time
+from includepy import IncludePyError, ModuleCache
+from includepy.watch import Watcher, shared_watcher
+
+
+@pytest.fixture
+def write_func(write_source):
+    """
+    Return a function that writes a Python source file in which ``func``
+    returns ``value``.
+    """
+
+    def write(path, value):
+        return write_source(path, f"def func():\n    return {value}\n")
+
+    return write
+
+
+def returned_value(cache, path):
+    """
+    Return the value returned by ``func`` in the cached source file.
+    """
+    module = cache.get(path)
+    lineno, end_lineno, _ = module.lookup("func")
+    return module.text(lineno - 1, end_lineno).split()[-1]
+
+
+def test_poll_reloads_changed_files(tmp_path, write_func):
+    """
+    Verify that changed files are reloaded, so that the next lookup is a
+    cache hit for the new version.
+    """
+    path = tmp_path / "module.py"
+    write_func(path, 1)
+    cache = ModuleCache()
+    watcher = Watcher(cache)
+    assert returned_value(cache, path) == "1"
+    assert watcher.poll() == []
+
+    write_func(path, 2)
+    assert watcher.poll() == [path.resolve()]
+    info = cache.cache_info()
+    assert returned_value(cache, path) == "2"
+    assert cache.cache_info().misses == info.misses
+    assert cache.cache_info().loads == 2
+    assert watcher.polls == 2
+    assert watcher.reloads == 1
+
+
+def test_poll_rescans_objects(tmp_path, write_func):
+    """
+    Verify that objects that were located by scanning are located again.
+    """
+    path = tmp_path / "module.py"
+    write_func(path, 1)
+    cache = ModuleCache(scan_threshold=1)
+    assert returned_value(cache, path) == "1"
+    write_func(path, 2)
+    Watcher(cache).poll()
+    assert cache.get(path).scanned == {"func"}
+
+
+def test_poll_skips_invalid_files(tmp_path, write_func):
+    """
+    Verify that files which cannot be parsed are not reloaded again until
+    they change, and that the error is raised when the file is retrieved.
+    """
+    path = tmp_path / "module.py"
+    write_func(path, 1)
+    cache = ModuleCache()
+    cache.get(path)
+    watcher = Watcher(cache)
+
+    write_func(path, "(")
+    assert watcher.poll() == []
+    assert path.resolve() in watcher.failed
+    assert watcher.poll() == []
+    assert cache.cache_info().loads == 1
+    with pytest.raises(SyntaxError):
+        cache.get(path)
+
+    write_func(path, 3)
+    assert watcher.poll() == [path.resolve()]
+    assert not watcher.failed
+    assert returned_value(cache, path) == "3"
+
+
+class FailingCache:
+    """
+    A cache that cannot reload some of its source files.
+    """
+
+    def __init__(self, errors):
+        self.errors = errors
+        self.refreshed = []
+
+    def paths(self):
+        return list(self.errors)
+
+    def refresh(self, path):
+        error = self.errors[path]
+        if error is not None:
+            raise error
+        self.refreshed.append(path)
+        return True
+
+
+def test_poll_survives_unexpected_errors(tmp_path, caplog):
+    """
+    Verify that unexpected errors while reloading a file are logged, and do
+    not stop the watcher from reloading other files.
+    """
+    paths = [tmp_path / f"module_{i}.py" for i in range(3)]
+    for path in paths:
+        path.write_text("")
+    cache = FailingCache(
+        {
+            paths[0]: RecursionError("maximum recursion depth exceeded"),
+            paths[1]: IncludePyError("Invalid file"),
+            paths[2]: None,
+        }
+    )
+    with caplog.at_level(logging.WARNING, "includepy.watch"):
+        with Watcher(cache, interval=0.01) as watcher:
+            deadline = time.monotonic() + 10
+            while watcher.polls < 3 and time.monotonic() < deadline:
+                time.sleep(0.01)
+            assert watcher.running
+    assert watcher.polls >= 3
+    assert set(watcher.failed) == set(paths[:2])
+    assert cache.refreshed == [paths[2]] * watcher.polls
+    # Each file that fails is only reported once until it changes.
+    assert caplog.text.count("Could not reload") == 2
+    assert "RecursionError" in caplog.text
+
+
+def test_background_thread(tmp_path, write_func):
+    """
+    Verify that the background thread reloads changed files, and stops
+    cleanly.
+    """
+    path = tmp_path / "module.py"
+    write_func(path, 1)
+    cache = ModuleCache()
+    cache.get(path)
+    with Watcher(cache, interval=0.01) as watcher:
+        assert watcher.running
+        write_func(path, 2)
+        deadline = time.monotonic() + 10
+        while watcher.reloads == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+    assert not watcher.running
+    assert watcher.reloads == 1
+    assert returned_value(cache, path) == "2"
+    assert cache.cache_info().loads == 2
+
+
+def test_shared_watcher():
+    """
+    Verify that each cache has a single shared watcher.
+    """
+    cache = ModuleCache()
+    watcher = shared_watcher(cache)
+    try:
+        assert watcher.running
+        assert shared_watcher(cache) is watcher
+    finally:
+        watcher.stop()
+    assert not watcher.running
+
+
+def test_invalid_settings():
+    """
+    Verify that invalid watcher settings raise an exception.
+    """
+    with pytest.raises(ValueError, match="interval must be positive"):
+        Watcher(ModuleCache(), interval=0)
+    with pytest.raises(ValueError, match="between 0 and 1"):
+        Watcher(ModuleCache(), max_cpu=0)